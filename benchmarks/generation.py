@@ -0,0 +1,62 @@
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+from typing import Optional
+
+from src.consts import SIZES, Difficulty
+from src.game.generator import generate_puzzle
+
+DIFFICULTIES = [d for d in Difficulty if d != Difficulty.INHUMAN]
+
+
+def time_generation(length: int, difficulty: Difficulty, count: int) -> dict:
+    timings = []
+    empty = []
+    for _ in range(count):
+        start = time.perf_counter()
+        puzzle = generate_puzzle(difficulty, length)
+        timings.append(time.perf_counter() - start)
+        empty.append(len(puzzle.empty_cells))
+
+    return {
+        'size': length,
+        'difficulty': difficulty.value,
+        'count': count,
+        'mean_seconds': statistics.fmean(timings),
+        'max_seconds': max(timings),
+        'mean_empty_cells': statistics.fmean(empty),
+    }
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Time puzzle generation per board size and difficulty')
+    parser.add_argument('--sizes', type=int, nargs='+', choices=SIZES, default=list(SIZES))
+    parser.add_argument('--difficulties', nargs='+', choices=[d.value for d in DIFFICULTIES],
+                        default=[d.value for d in DIFFICULTIES])
+    parser.add_argument('--count', type=int, default=5, help='puzzles per size and difficulty (default: 5)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', action='store_true', help='print the results as JSON')
+    args = parser.parse_args(argv)
+
+    random.seed(args.seed)
+    results = []
+    for length in args.sizes:
+        for difficulty in map(Difficulty, args.difficulties):
+            result = time_generation(length, difficulty, args.count)
+            results.append(result)
+            if not args.json:
+                print(f"{length:>2}x{length:<2} {difficulty.value:<7} "
+                      f"mean {result['mean_seconds']:7.3f}s  max {result['max_seconds']:7.3f}s  "
+                      f"empty {result['mean_empty_cells']:.0f}", flush=True)
+
+    if args.json:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
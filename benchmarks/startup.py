@@ -0,0 +1,120 @@
+import argparse
+import json
+import os
+import pty
+import select
+import signal
+import statistics
+import sys
+import tempfile
+import time
+from typing import Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MENU_MARKER = b'MAIN MENU'
+BOARD_MARKER = b'Moves:'
+DEFAULT_MENU_BUDGET = 0.5
+DEFAULT_BOARD_BUDGET = 3.0
+DEFAULT_RUNS = 5
+TIMEOUT = 30.0
+
+
+def _wait_for(fd: int, marker: bytes, deadline: float, output: bytearray) -> Optional[float]:
+    while time.perf_counter() < deadline:
+        ready, _, _ = select.select([fd], [], [], 0.01)
+        if not ready:
+            continue
+        try:
+            chunk = os.read(fd, 65536)
+        except OSError:
+            return None
+        if not chunk:
+            return None
+        output += chunk
+        if marker in output:
+            return time.perf_counter()
+    return None
+
+
+def measure_once(command: list[str]) -> dict:
+    # a throwaway data directory keeps the library, caches and calibration out of the timing
+    with tempfile.TemporaryDirectory() as data_dir:
+        start = time.perf_counter()
+        pid, fd = pty.fork()
+        if pid == 0:
+            os.chdir(ROOT)
+            os.environ.update({'TERM': 'xterm', 'LINES': '50', 'COLUMNS': '120', 'VI_SUDOKU_DATA_DIR': data_dir})
+            os.environ.pop('VI_SUDOKU_LIBRARY', None)
+            os.execvp(command[0], command)
+
+        try:
+            output = bytearray()
+            menu = _wait_for(fd, MENU_MARKER, start + TIMEOUT, output)
+            board = None
+            if menu is not None:
+                output.clear()
+                os.write(fd, b'\r')
+                board = _wait_for(fd, BOARD_MARKER, menu + TIMEOUT, output)
+        finally:
+            os.kill(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+            os.close(fd)
+
+    return {
+        'menu_seconds': None if menu is None else menu - start,
+        'board_seconds': None if board is None or menu is None else board - start,
+    }
+
+
+def measure(command: list[str], runs: int) -> dict:
+    samples = [measure_once(command) for _ in range(runs)]
+    result = {'command': command, 'runs': runs}
+    for key in ('menu_seconds', 'board_seconds'):
+        values = [sample[key] for sample in samples]
+        result[key] = None if None in values else statistics.median(values)
+    return result
+
+
+def check_budgets(result: dict, menu_budget: float, board_budget: float) -> list[str]:
+    failures = []
+    for key, budget in (('menu_seconds', menu_budget), ('board_seconds', board_budget)):
+        value = result[key]
+        if value is None:
+            failures.append(f"{key}: never reached")
+        elif value > budget:
+            failures.append(f"{key}: {value:.3f}s > {budget:.3f}s")
+    return failures
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Measure time to menu and time to first board in a pseudo-terminal')
+    parser.add_argument('--binary', help='time a frozen build (e.g. dist/vi-sudoku) instead of main.py')
+    parser.add_argument('--runs', type=int, default=DEFAULT_RUNS,
+                        help=f'runs per measurement, the median is kept (default: {DEFAULT_RUNS})')
+    parser.add_argument('--menu-budget', type=float, default=DEFAULT_MENU_BUDGET,
+                        help=f'seconds allowed until the menu is drawn (default: {DEFAULT_MENU_BUDGET})')
+    parser.add_argument('--board-budget', type=float, default=DEFAULT_BOARD_BUDGET,
+                        help=f'seconds allowed until the first board is drawn (default: {DEFAULT_BOARD_BUDGET})')
+    parser.add_argument('--json', action='store_true', help='print the results as JSON')
+    args = parser.parse_args(argv)
+
+    command = [os.path.abspath(args.binary)] if args.binary else [sys.executable, os.path.join(ROOT, 'main.py')]
+    result = measure(command, args.runs)
+    failures = check_budgets(result, args.menu_budget, args.board_budget)
+
+    if args.json:
+        json.dump({**result, 'failures': failures}, sys.stdout, indent=2)
+        print()
+    else:
+        for key in ('menu_seconds', 'board_seconds'):
+            value = result[key]
+            print(f"{key.split('_')[0]:<6} {'n/a' if value is None else f'{value:.3f}s'}")
+
+    for failure in failures:
+        print(f"OVER BUDGET {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
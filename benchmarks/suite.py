@@ -0,0 +1,289 @@
+import argparse
+import curses
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+from typing import Callable, Optional
+from unittest import mock
+
+from src.consts import Difficulty
+from src.game.board import Board
+from src.game.generator import calculate_difficulty_score, generate_puzzle
+from src.game.solver import count_solutions, solve_board
+from src.game.state import GameState
+from src.game.validator import is_valid_board
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+CORPORA_DIR = os.path.join(BENCHMARKS_DIR, 'corpora')
+BASELINE_PATH = os.path.join(BENCHMARKS_DIR, 'baseline.json')
+
+DEFAULT_TOLERANCE = 0.5
+DEFAULT_ROUNDS = 5
+MIN_ROUND_SECONDS = 0.05
+SCREEN_SIZE = (50, 120)
+
+Case = Callable[[], None]
+
+
+def load_corpus(name: str) -> dict[str, list[Board]]:
+    groups: dict[str, list[Board]] = {}
+    with open(os.path.join(CORPORA_DIR, name + '.txt')) as f:
+        for line in f:
+            fields = line.split()
+            if not fields or fields[0].startswith('#'):
+                continue
+            label = fields[1] if len(fields) > 1 else 'unlabelled'
+            groups.setdefault(label, []).append(Board.from_line(fields[0]))
+    return groups
+
+
+class FakeScreen:
+    def __init__(self, lines: int, cols: int):
+        self.lines = lines
+        self.cols = cols
+        self.writes = 0
+
+    def getmaxyx(self) -> tuple[int, int]:
+        return self.lines, self.cols
+
+    def addstr(self, row: int, col: int, text: str, attr: int = 0):
+        if not 0 <= row < self.lines or not 0 <= col < self.cols:
+            raise curses.error('addstr() returned ERR')
+        self.writes += 1
+
+    def erase(self):
+        pass
+
+    def clear(self):
+        pass
+
+    def refresh(self):
+        pass
+
+
+def _solved_pairs(boards: list[Board]) -> list[tuple[Board, Board]]:
+    return [(board, solve_board(board)) for board in boards]
+
+
+def _solve_case(boards: list[Board]) -> Case:
+    def run():
+        for board in boards:
+            solve_board(board)
+    return run
+
+
+def _count_case(boards: list[Board]) -> Case:
+    def run():
+        for board in boards:
+            count_solutions(board)
+    return run
+
+
+def _score_case(boards: list[Board]) -> Case:
+    def run():
+        for board in boards:
+            calculate_difficulty_score(board)
+    return run
+
+
+def _generate_case(difficulty: Difficulty, length: int) -> Case:
+    def run():
+        random.seed(length * 100 + list(Difficulty).index(difficulty))
+        generate_puzzle(difficulty, length)
+    return run
+
+
+def _validate_case(solutions: list[Board]) -> Case:
+    def run():
+        for solution in solutions:
+            is_valid_board(solution)
+    return run
+
+
+def _state_case(pairs: list[tuple[Board, Board]]) -> Case:
+    def run():
+        for puzzle, solution in pairs:
+            state = GameState(puzzle, solution)
+            empty = [(i, j) for i in range(puzzle.length) for j in range(puzzle.length)
+                     if puzzle.is_empty(i, j)]
+            for row, col in empty:
+                state.set_value(row, col, solution.get_cell(row, col))
+            state.undo(len(empty))
+            state.redo(len(empty))
+    return run
+
+
+def _render_case(pair: tuple[Board, Board]) -> Case:
+    from src.cli.renderer import Renderer
+
+    state = GameState(*pair)
+    renderer = Renderer(FakeScreen(*SCREEN_SIZE), state)
+    renderer.show_candidates = True
+    renderer.show_conflicts = True
+    moves = [(0, 1), (1, 0), (0, -1), (-1, 0)]
+
+    def run():
+        for step in range(pair[0].length):
+            state.move_cursor(*moves[step % len(moves)])
+            renderer.render()
+    return run
+
+
+def build_cases() -> dict[str, Case]:
+    nine = load_corpus('9x9')
+    sixteen = load_corpus('16x16')
+    cases: dict[str, Case] = {}
+
+    for label, boards in nine.items():
+        cases[f'solve_board/9x9-{label}'] = _solve_case(boards)
+        cases[f'count_solutions/9x9-{label}'] = _count_case(boards)
+        cases[f'calculate_difficulty_score/9x9-{label}'] = _score_case(boards)
+    for label, boards in sixteen.items():
+        cases[f'solve_board/16x16-{label}'] = _solve_case(boards)
+        cases[f'count_solutions/16x16-{label}'] = _count_case(boards)
+
+    for difficulty in Difficulty:
+        if difficulty != Difficulty.INHUMAN:
+            cases[f'generate_puzzle/9x9-{difficulty.value}'] = _generate_case(difficulty, 9)
+    cases['generate_puzzle/16x16-medium'] = _generate_case(Difficulty.MEDIUM, 16)
+
+    pairs = _solved_pairs([board for boards in nine.values() for board in boards])
+    pairs16 = _solved_pairs([board for boards in sixteen.values() for board in boards])
+    cases['is_valid_board/9x9'] = _validate_case([solution for _, solution in pairs])
+    cases['is_valid_board/16x16'] = _validate_case([solution for _, solution in pairs16])
+    cases['game_state/9x9-fill-undo-redo'] = _state_case(pairs)
+    cases['game_state/16x16-fill-undo-redo'] = _state_case(pairs16)
+    cases['renderer/9x9'] = _render_case(pairs[0])
+    cases['renderer/16x16'] = _render_case(pairs16[0])
+    return cases
+
+
+def time_case(case: Case, rounds: int) -> dict:
+    # calibrate so each round lasts long enough for the clock, then keep the best rounds
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            case()
+        elapsed = time.perf_counter() - start
+        if elapsed >= MIN_ROUND_SECONDS or number >= 1 << 16:
+            break
+        number *= 2
+
+    timings = [elapsed / number]
+    for _ in range(rounds - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            case()
+        timings.append((time.perf_counter() - start) / number)
+
+    return {
+        'min_seconds': min(timings),
+        'median_seconds': statistics.median(timings),
+        'rounds': rounds,
+        'number': number,
+    }
+
+
+def run_suite(pattern: Optional[str] = None, rounds: int = DEFAULT_ROUNDS, verbose: bool = True) -> dict:
+    results = {}
+    with mock.patch.object(curses, 'color_pair', lambda pair: pair << 8):
+        for name, case in build_cases().items():
+            if pattern and pattern not in name:
+                continue
+            results[name] = time_case(case, rounds)
+            if verbose:
+                print(f"{name:<45} min {results[name]['min_seconds'] * 1000:10.3f}ms  "
+                      f"median {results[name]['median_seconds'] * 1000:10.3f}ms", file=sys.stderr, flush=True)
+
+    return {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'results': results,
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    regressions = []
+    for name, result in results['results'].items():
+        reference = baseline['results'].get(name)
+        if reference is None:
+            continue
+        limit = reference['min_seconds'] * (1 + tolerance)
+        if result['min_seconds'] > limit:
+            regressions.append(f"{name}: {result['min_seconds'] * 1000:.3f}ms > "
+                               f"{reference['min_seconds'] * 1000:.3f}ms +{tolerance:.0%}")
+    return regressions
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Time the hot paths against fixed corpora and a stored baseline')
+    parser.add_argument('-k', dest='pattern', help='only run cases whose name contains this text')
+    parser.add_argument('--rounds', type=int, default=DEFAULT_ROUNDS,
+                        help=f'timed rounds per case (default: {DEFAULT_ROUNDS})')
+    parser.add_argument('--baseline', default=BASELINE_PATH, help='baseline JSON to compare against')
+    parser.add_argument('--tolerance', type=float,
+                        default=float(os.environ.get('VI_SUDOKU_BENCH_TOLERANCE', DEFAULT_TOLERANCE)),
+                        help=f'allowed slowdown as a fraction of the baseline (default: {DEFAULT_TOLERANCE})')
+    parser.add_argument('--save-baseline', action='store_true', help='write the results as the new baseline')
+    parser.add_argument('-o', '--output', help='write the results as JSON to this file')
+    parser.add_argument('--startup', action='store_true',
+                        help='also time the start-up and fail when it is over the start-up budgets')
+    parser.add_argument('--binary', help='time the start-up of a frozen build instead of main.py')
+    args = parser.parse_args(argv)
+
+    results = run_suite(args.pattern, args.rounds)
+
+    over_budget = []
+    if args.startup:
+        # pty and termios are POSIX-only, so the rest of the suite still runs on Windows
+        from benchmarks import startup
+
+        command = [os.path.abspath(args.binary)] if args.binary else \
+            [sys.executable, os.path.join(startup.ROOT, 'main.py')]
+        results['startup'] = startup.measure(command, startup.DEFAULT_RUNS)
+        over_budget = startup.check_budgets(results['startup'], startup.DEFAULT_MENU_BUDGET,
+                                            startup.DEFAULT_BOARD_BUDGET)
+        for line in over_budget:
+            print(f"OVER BUDGET {line}", file=sys.stderr)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+            f.write('\n')
+
+    if args.save_baseline:
+        if args.pattern and os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                merged = json.load(f)
+            merged['results'].update(results['results'])
+            results = merged
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f"Saved {len(results['results'])} results to {args.baseline}", file=sys.stderr)
+        return 1 if over_budget else 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save-baseline first", file=sys.stderr)
+        return 1 if over_budget else 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+
+    regressions = compare(results, baseline, args.tolerance)
+    for line in regressions:
+        print(f"REGRESSION {line}", file=sys.stderr)
+    if regressions or over_budget:
+        return 1
+
+    print(f"{len(results['results'])} cases within {args.tolerance:.0%} of the baseline", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,59 +1,74 @@
 import curses
+import importlib
 import sys
-from typing import Union, Literal, cast
+import threading
+from typing import TYPE_CHECKING, Optional, Union, Literal, cast
 
 from src.cli.colors import init_colors
-from src.cli.input_handler import InputHandler
-from src.cli.renderer import Renderer
-from src.game.board import Board
-from src.game.generator import generate_puzzle, Difficulty, calculate_difficulty_score
-from src.game.state import GameState
-
-
-def solve_puzzle(puzzle: Board) -> Board:
-    from src.game.utils import is_valid_placement, find_empty_cell
-
-    solution = puzzle.copy()
+from src.config import PROFILE_MODE
+from src.consts import SIZES, Difficulty
+
+if TYPE_CHECKING:
+    from src.cli.profiler import Profiler
+    from src.game.board import Board
+
+# the game modules load in the background while the menu waits for a key
+WARM_MODULES = (
+    'asyncio',
+    'src.cli.event_loop',
+    'src.cli.input_handler',
+    'src.cli.profiler',
+    'src.cli.renderer',
+    'src.cli.replay',
+    'src.game.generator',
+    'src.game.library',
+    'src.game.solver',
+    'src.game.state',
+)
+
+
+def warm_up(length: int = 9):
+    for name in WARM_MODULES:
+        try:
+            importlib.import_module(name)
+        except Exception:
+            # the game imports it again and reports the error there
+            return
 
-    def solve_recursive(board: Board) -> bool:
-        empty = find_empty_cell(board)
-        if empty is None:
-            return True
+    from src.game.backends import get_backend
+    get_backend(length)
 
-        row, col = empty
-        for num in range(1, board.length + 1):
-            if is_valid_placement(board, row, col, num):
-                board.set_cell(row, col, num)
-                if solve_recursive(board):
-                    return True
-                board.set_cell(row, col, None)
 
-        return False
+def solve_puzzle(puzzle: 'Board') -> 'Board':
+    from src.game.solver import solve_board
 
-    solve_recursive(solution)
+    solution = solve_board(puzzle, use_cache=True)
+    if solution is None:
+        raise ValueError("puzzle has no solution")
     return solution
 
 
-def main_menu(stdscr) -> Union[Difficulty, Literal['load'], None]:
+def main_menu(stdscr, length: int = 9) -> tuple[Union[Difficulty, Literal['load'], None], int]:
     curses.curs_set(0)
     init_colors()
 
-    menu_items = [
-        "1. New Game - Easy",
-        "2. New Game - Medium",
-        "3. New Game - Hard",
-        "4. New Game - Expert",
-        "5. Load Saved Game",
-        "6. Exit"
-    ]
-
     current_selection = 0
 
     while True:
+        menu_items = [
+            "1. New Game - Easy",
+            "2. New Game - Medium",
+            "3. New Game - Hard",
+            "4. New Game - Expert",
+            f"5. Board Size: {length}x{length}",
+            "6. Load Saved Game",
+            "7. Exit"
+        ]
+
         stdscr.clear()
 
         stdscr.addstr(1, 2, "=== VI SUDOKU - MAIN MENU ===", curses.A_BOLD)
-        stdscr.addstr(2, 2, "Use j/k or arrows to navigate, Enter to select", curses.A_DIM)
+        stdscr.addstr(2, 2, "Use j/k or arrows to navigate, Enter to select, h/l to change size", curses.A_DIM)
 
         for idx, item in enumerate(menu_items):
             y = 4 + idx
@@ -70,24 +85,58 @@ def main_menu(stdscr) -> Union[Difficulty, Literal['load'], None]:
             current_selection = (current_selection + 1) % len(menu_items)
         elif key in [ord('k'), curses.KEY_UP]:
             current_selection = (current_selection - 1) % len(menu_items)
+        elif key in [ord('l'), curses.KEY_RIGHT, ord('h'), curses.KEY_LEFT] and current_selection == 4:
+            step = -1 if key in [ord('h'), curses.KEY_LEFT] else 1
+            length = SIZES[(SIZES.index(length) + step) % len(SIZES)]
         elif key in [curses.KEY_ENTER, 10, 13]:
             if current_selection == 0:
-                return Difficulty.EASY
+                return Difficulty.EASY, length
             elif current_selection == 1:
-                return Difficulty.MEDIUM
+                return Difficulty.MEDIUM, length
             elif current_selection == 2:
-                return Difficulty.HARD
+                return Difficulty.HARD, length
             elif current_selection == 3:
-                return Difficulty.EXPERT
+                return Difficulty.EXPERT, length
             elif current_selection == 4:
-                return 'load'
+                length = SIZES[(SIZES.index(length) + 1) % len(SIZES)]
             elif current_selection == 5:
-                return None
+                return 'load', length
+            elif current_selection == 6:
+                return None, length
         elif key == ord('q'):
-            return None
+            return None, length
+
+
+def game_loop(stdscr, difficulty: Union[Difficulty, Literal['load']], length: int = 9,
+              profile_mode: str = PROFILE_MODE):
+    import asyncio
+    from src.cli.profiler import profiler_from_mode
+    from src.config import PROFILE_DIR
 
+    profiler = profiler_from_mode(profile_mode, PROFILE_DIR)
+    asyncio.run(_game_session(stdscr, difficulty, length, profiler))
+
+    if profiler is not None:
+        try:
+            profiler.write_summary()
+        except OSError:
+            pass
+
+
+async def _game_session(stdscr, difficulty: Union[Difficulty, Literal['load']], length: int = 9,
+                        profiler: Optional['Profiler'] = None):
+    import asyncio
+    from src.cli.event_loop import GameLoop, run_in_background
+    from src.cli.input_handler import InputHandler
+    from src.cli.profiler import profiled
+    from src.cli.renderer import Renderer
+    from src.cli.replay import KeyLog, save_key_log, new_key_log_path
+    from src.config import KEYLOG_DIR, LIBRARY_PATH
+    from src.game.board import Board
+    from src.game.generator import generate_puzzle, calculate_difficulty_score
+    from src.game.library import open_library
+    from src.game.state import GameState
 
-def game_loop(stdscr, difficulty: Union[Difficulty, Literal['load']]):
     curses.curs_set(0)
     stdscr.nodelay(False)
     stdscr.timeout(-1)
@@ -97,12 +146,15 @@ def game_loop(stdscr, difficulty: Union[Difficulty, Literal['load']]):
     stdscr.addstr(1, 2, "Generating puzzle...", curses.A_BOLD)
     stdscr.refresh()
 
+    library = None
+    library_entry = None
+
     if difficulty == 'load':
         try:
             puzzle = Board.load_compact('~save')
             stdscr.addstr(2, 2, "Solving puzzle to verify...", curses.A_DIM)
             stdscr.refresh()
-            solution = solve_puzzle(puzzle)
+            solution = await run_in_background(profiled(profiler, 'solving', solve_puzzle), puzzle)
         except Exception as e:
             stdscr.addstr(3, 2, f"Failed to load game: {e}", curses.color_pair(4))
             stdscr.addstr(4, 2, "Press any key to return to menu...")
@@ -111,66 +163,85 @@ def game_loop(stdscr, difficulty: Union[Difficulty, Literal['load']]):
             return
     else:
         difficulty_level = cast(Difficulty, difficulty)
-        puzzle = generate_puzzle(difficulty_level)
-
-        stdscr.addstr(2, 2, "Calculating difficulty...", curses.A_DIM)
-        stdscr.refresh()
+        library = open_library(LIBRARY_PATH)
+        if library is not None:
+            library_entry = library.pick_unplayed(difficulty_level, length)
+
+        if library_entry is not None:
+            puzzle = library_entry.puzzle
+            scores = library_entry.score
+            library.record_started(library_entry.id)
+        else:
+            puzzle = await run_in_background(profiled(profiler, 'generation', generate_puzzle),
+                                             difficulty_level, length)
+
+            stdscr.addstr(2, 2, "Calculating difficulty...", curses.A_DIM)
+            stdscr.refresh()
 
-        scores = calculate_difficulty_score(puzzle)
+            scores = await run_in_background(profiled(profiler, 'scoring', calculate_difficulty_score), puzzle)
 
         stdscr.addstr(3, 2, f"Difficulty score: {scores.total_score} ({scores.difficulty.value})",
                       curses.A_DIM)
         stdscr.addstr(4, 2, f"Empty cells: {scores.empty_cells}", curses.A_DIM)
         stdscr.refresh()
 
-        stdscr.addstr(6, 2, "Solving puzzle...", curses.A_DIM)
-        stdscr.refresh()
+        if library_entry is not None and library_entry.solution is not None:
+            solution = library_entry.solution
+        else:
+            stdscr.addstr(6, 2, "Solving puzzle...", curses.A_DIM)
+            stdscr.refresh()
 
-        solution = solve_puzzle(puzzle)
+            solution = await run_in_background(profiled(profiler, 'solving', solve_puzzle), puzzle)
 
     stdscr.addstr(7, 2, "Starting game...", curses.A_BOLD)
     stdscr.refresh()
-    curses.napms(500)
+    await asyncio.sleep(0.5)
 
     state = GameState(puzzle, solution)
-    renderer = Renderer(stdscr, state)
+    renderer = Renderer(stdscr, state, profiler)
     input_handler = InputHandler(state, renderer)
+    key_log = [] if KEYLOG_DIR else None
 
-    renderer.render()
+    await GameLoop(stdscr, state, renderer, input_handler, key_log).run()
 
-    while input_handler.is_running():
-        cmd_buffer = input_handler.get_command_buffer()
-        if cmd_buffer:
-            try:
-                stdscr.addstr(curses.LINES - 1, 0, cmd_buffer)
-            except curses.error:
-                pass
+    if key_log is not None:
+        save_key_log(new_key_log_path(KEYLOG_DIR), KeyLog(puzzle, solution, key_log))
 
-        stdscr.refresh()
+    if library is not None:
+        if library_entry is not None and state.is_won():
+            library.record_won(library_entry.id, state.get_elapsed_time().total_seconds())
+        library.close()
 
-        try:
-            key = stdscr.getch()
-        except:
-            continue
-
-        if key != -1:
-            input_handler.handle_input(key)
-            renderer.render()
 
+def main(stdscr, profile_mode: str = PROFILE_MODE):
+    length = 9
+    threading.Thread(target=warm_up, args=(length,), daemon=True).start()
 
-def main(stdscr):
     while True:
-        difficulty = main_menu(stdscr)
+        difficulty, length = main_menu(stdscr, length)
 
         if difficulty is None:
             break
 
-        game_loop(stdscr, difficulty)
+        game_loop(stdscr, difficulty, length, profile_mode)
 
 
 if __name__ == '__main__':
+    if getattr(sys, 'frozen', False):
+        # frozen Windows builds start pool workers through this entry point
+        import multiprocessing
+        multiprocessing.freeze_support()
+
+    profile_mode = PROFILE_MODE
+    if len(sys.argv) > 1 and sys.argv[1] in ('--profile', '--profile=deep'):
+        profile_mode = 'deep' if sys.argv.pop(1).endswith('deep') else '1'
+
+    if len(sys.argv) > 1:
+        from src.cli.batch import main as batch_main
+        sys.exit(batch_main(sys.argv[1:]))
+
     try:
-        curses.wrapper(main)
+        curses.wrapper(main, profile_mode)
     except KeyboardInterrupt:
         print("\nGame terminated by user")
         sys.exit(0)
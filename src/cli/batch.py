@@ -0,0 +1,367 @@
+import argparse
+import os
+import random
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from itertools import islice
+from typing import BinaryIO, Callable, Iterable, Iterator, Optional, TextIO
+
+from src.config import LIBRARY_PATH
+from src.consts import SIZES, Difficulty, Symmetry
+from src.game.backends import recalibrate
+from src.game.board import Board
+from src.game.generator import generate_puzzle, generate_puzzle_symmetric, calculate_difficulty_score, minimize
+from src.game.model import SearchStats
+from src.game.solver import solve_board
+from src.game.validator import is_valid_board
+from src.server import loadgen, service
+
+FORMATS = ('line', 'bytes')
+CHUNK_SIZE = 64
+CHUNKS_IN_FLIGHT_PER_JOB = 4
+
+
+class InputError(ValueError):
+    pass
+
+
+def read_boards(stream: BinaryIO, fmt: str) -> Iterator[Board]:
+    if fmt == 'bytes':
+        record = 0
+        while True:
+            header = stream.read(1)
+            if not header:
+                return
+            record += 1
+            body = stream.read(header[0] ** 2)
+            if len(body) != header[0] ** 2:
+                raise InputError(f"record {record}: truncated compact board record")
+            try:
+                board = Board.from_compact_bytes(header + body)
+            except ValueError as exc:
+                raise InputError(f"record {record}: {exc}") from None
+            yield board
+    else:
+        for number, raw in enumerate(stream, 1):
+            line = raw.decode('ascii', errors='replace').strip()
+            if line and not line.startswith('#'):
+                try:
+                    board = Board.from_line(line)
+                except ValueError as exc:
+                    raise InputError(f"line {number}: {exc}") from None
+                yield board
+
+
+def write_board(stream: BinaryIO, board: Board, fmt: str) -> None:
+    if fmt == 'bytes':
+        stream.write(board.to_compact_bytes())
+    else:
+        stream.write(board.to_line().encode('ascii') + b'\n')
+
+
+def bounded_map(func: Callable, items: Iterable, jobs: int = 1) -> Iterator:
+    if jobs <= 1:
+        yield from map(func, items)
+        return
+
+    chunks = _chunked(items, CHUNK_SIZE)
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_reseed) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(_apply_chunk, func, chunk))
+            if len(pending) >= jobs * CHUNKS_IN_FLIGHT_PER_JOB:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def _chunked(items: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(items)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def _apply_chunk(func: Callable, chunk: list) -> list:
+    return [func(item) for item in chunk]
+
+
+def _reseed():
+    random.seed(os.urandom(16))
+
+
+def _generate_one(task: tuple[Difficulty, Symmetry, int, Optional[int]]) -> Board:
+    difficulty, symmetry, length, seed = task
+    if seed is not None:
+        random.seed(seed)
+    if symmetry != Symmetry.NONE:
+        return generate_puzzle_symmetric(difficulty, symmetry, length=length)
+    return generate_puzzle(difficulty, length)
+
+
+def _solve_one(board: Board) -> Optional[Board]:
+    return solve_board(board)
+
+
+def _solve_one_with_stats(board: Board) -> tuple[Optional[Board], SearchStats]:
+    stats = SearchStats()
+    return solve_board(board, stats=stats), stats
+
+
+def format_stats(stats: SearchStats) -> str:
+    return (f"nodes {stats.nodes}, backtracks {stats.backtracks}, max depth {stats.max_depth}, "
+            f"placements tested {stats.placements}, propagations {stats.propagations}, "
+            f"search time {stats.elapsed:.3f}s")
+
+
+def _minimize_one(task: tuple[Board, Symmetry]) -> Optional[Board]:
+    board, symmetry = task
+    try:
+        return minimize(board, symmetry)
+    except ValueError:
+        return None
+
+
+def _grade_one(board: Board, runs: int = 1) -> str:
+    score = calculate_difficulty_score(board, runs=runs)
+    line = f"{board.to_line()}\t{score.total_score}\t{score.difficulty.value}\t{score.empty_cells}"
+    if runs > 1:
+        line += f"\t{score.score_variance ** 0.5:.1f}\t{score.runs}"
+    return line
+
+
+def _validate_one(board: Board) -> str:
+    return f"{board.to_line()}\t{'valid' if is_valid_board(board) else 'invalid'}"
+
+
+def cmd_generate(args, stdin: BinaryIO, stdout: BinaryIO) -> int:
+    difficulty = Difficulty(args.difficulty)
+    symmetry = Symmetry(args.symmetry)
+    tasks = ((difficulty, symmetry, args.size, None if args.seed is None else args.seed + i)
+             for i in range(args.count))
+
+    for board in bounded_map(_generate_one, tasks, args.jobs):
+        write_board(stdout, board, args.format)
+        args.processed += 1
+
+    return 0
+
+
+def cmd_solve(args, stdin: BinaryIO, stdout: BinaryIO) -> int:
+    failures = 0
+    total = SearchStats()
+    solve = _solve_one_with_stats if args.stats else _solve_one
+
+    for index, solution in enumerate(bounded_map(solve, read_boards(stdin, args.format), args.jobs)):
+        args.processed += 1
+        if args.stats:
+            solution, stats = solution
+            total.merge(stats)
+        if solution is None:
+            failures += 1
+            print(f"puzzle #{index} has no solution", file=args.stderr)
+            continue
+        write_board(stdout, solution, args.format)
+
+    if args.stats:
+        print(f"solve: {format_stats(total)}", file=args.stderr)
+    return 1 if failures else 0
+
+
+def cmd_minimize(args, stdin: BinaryIO, stdout: BinaryIO) -> int:
+    symmetry = Symmetry(args.symmetry)
+    tasks = ((board, symmetry) for board in read_boards(stdin, args.format))
+    failures = 0
+
+    for index, board in enumerate(bounded_map(_minimize_one, tasks, args.jobs)):
+        args.processed += 1
+        if board is None:
+            failures += 1
+            print(f"puzzle #{index} does not have a unique solution", file=args.stderr)
+            continue
+        write_board(stdout, board, args.format)
+
+    return 1 if failures else 0
+
+
+def cmd_grade(args, stdin: BinaryIO, stdout: BinaryIO) -> int:
+    # with --runs each worker grades its own puzzles, so every process stays busy
+    for line in bounded_map(partial(_grade_one, runs=args.runs), read_boards(stdin, args.format), args.jobs):
+        args.processed += 1
+        stdout.write(line.encode('ascii') + b'\n')
+
+    return 0
+
+
+def cmd_validate(args, stdin: BinaryIO, stdout: BinaryIO) -> int:
+    invalid = 0
+
+    for line in bounded_map(_validate_one, read_boards(stdin, args.format), args.jobs):
+        args.processed += 1
+        if line.endswith('invalid'):
+            invalid += 1
+        stdout.write(line.encode('ascii') + b'\n')
+
+    return 1 if invalid else 0
+
+
+def cmd_pack(args, stdin: BinaryIO, stdout: BinaryIO) -> int:
+    from src.game.collection import pack_collection
+    args.processed = pack_collection(args.source, args.destination)
+    return 0
+
+
+def _library_row(record: bytes) -> tuple:
+    from src.game.library import library_row
+    return library_row((record, None, None))
+
+
+def _graded_library_row(record: bytes, runs: int = 1) -> tuple:
+    from src.game.library import library_row
+
+    board = Board.from_compact_bytes(record)
+    solution = solve_board(board)
+    score = calculate_difficulty_score(board, runs=runs)
+    return library_row((record, solution.to_compact_bytes() if solution else None, score))
+
+
+def cmd_import(args, stdin: BinaryIO, stdout: BinaryIO) -> int:
+    from src.game.collection import open_collection
+    from src.game.library import PuzzleLibrary
+
+    collection = open_collection(args.source)
+    try:
+        rows = bounded_map(partial(_graded_library_row, runs=args.runs) if args.grade else _library_row,
+                           collection.records(), args.jobs)
+
+        def counted(items):
+            for item in items:
+                args.processed += 1
+                yield item
+
+        with PuzzleLibrary(args.library) as library:
+            inserted = library.add_rows(counted(rows))
+    finally:
+        collection.close()
+
+    print(f"import: {inserted} new puzzles in {args.library}", file=args.stderr)
+    return 0
+
+
+def cmd_replay(args, stdin: BinaryIO, stdout: BinaryIO) -> int:
+    from src.cli.replay import main as replay_main
+    return replay_main(args.replay_args)
+
+
+def cmd_serve(args, stdin: BinaryIO, stdout: BinaryIO) -> int:
+    return service.run(args)
+
+
+def cmd_loadgen(args, stdin: BinaryIO, stdout: BinaryIO) -> int:
+    return loadgen.run(args)
+
+
+def cmd_calibrate(args, stdin: BinaryIO, stdout: BinaryIO) -> int:
+    for length, result in recalibrate(tuple(args.sizes)).items():
+        timings = ', '.join(f"{name} {'out' if seconds is None else f'{seconds * 1000:.1f}ms'}"
+                            for name, seconds in result['seconds'].items())
+        stdout.write(f"{length}x{length}: {result['backend']} ({timings})\n".encode())
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='vi-sudoku',
+                                     description='Sudoku CLI game with user interactions based on Vim. '
+                                                 'Run without arguments to play.')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    def add_command(name: str, handler: Callable, help_text: str) -> argparse.ArgumentParser:
+        sub = commands.add_parser(name, help=help_text)
+        sub.set_defaults(handler=handler)
+        sub.add_argument('--format', choices=FORMATS, default='line',
+                         help='one puzzle per line (1-9, A-P) or Board.to_compact_bytes records (default: line)')
+        sub.add_argument('--jobs', type=int, default=1, help='worker processes (default: 1)')
+        sub.add_argument('--quiet', action='store_true', help='do not print the throughput summary')
+        return sub
+
+    generate = add_command('generate', cmd_generate, 'write new puzzles to stdout')
+    generate.add_argument('--count', type=int, default=1)
+    generate.add_argument('--difficulty', choices=[d.value for d in Difficulty if d != Difficulty.INHUMAN],
+                          default=Difficulty.MEDIUM.value)
+    generate.add_argument('--seed', type=int, help='seed puzzle i with SEED + i for reproducible output')
+    generate.add_argument('--size', type=int, choices=SIZES, default=9, help='board length (default: 9)')
+    generate.add_argument('--symmetry', choices=[s.value for s in Symmetry], default=Symmetry.NONE.value,
+                          help='keep the clue pattern symmetric (default: none)')
+
+    solve = add_command('solve', cmd_solve, 'solve puzzles read from stdin')
+    solve.add_argument('--stats', action='store_true', help='print search statistics for the whole run to stderr')
+    reduce = add_command('minimize', cmd_minimize, 'strip every redundant clue from puzzles read from stdin')
+    reduce.add_argument('--symmetry', choices=[s.value for s in Symmetry], default=Symmetry.NONE.value,
+                        help='remove clues in symmetric groups so the pattern is kept (default: none)')
+
+    grade = add_command('grade', cmd_grade, 'print score, difficulty and empty cells for puzzles from stdin')
+    grade.add_argument('--runs', type=int, default=1,
+                       help='average up to RUNS randomized searches per puzzle and add the score '
+                            'deviation and the runs used (default: 1)')
+    add_command('validate', cmd_validate, 'check completed boards read from stdin')
+
+    pack = commands.add_parser('pack', help='convert a puzzle collection into a fixed-stride binary pack')
+    pack.set_defaults(handler=cmd_pack, quiet=False)
+    pack.add_argument('source', help='81-character lines, .sdm or .sdk collection')
+    pack.add_argument('destination')
+
+    library = add_command('import', cmd_import, 'add a puzzle collection to the local puzzle library')
+    library.add_argument('source', help='81-character lines, .sdm/.sdk collection or binary pack')
+    library.add_argument('--library', default=LIBRARY_PATH, help=f'library file (default: {LIBRARY_PATH})')
+    library.add_argument('--grade', action='store_true',
+                         help='solve and grade every puzzle so it can be picked by difficulty')
+    library.add_argument('--runs', type=int, default=1,
+                         help='average up to RUNS randomized searches per graded puzzle (default: 1)')
+
+    calibrate = commands.add_parser('calibrate', help='time the solver backends and save the fastest per board size')
+    calibrate.set_defaults(handler=cmd_calibrate, quiet=True)
+    calibrate.add_argument('--sizes', type=int, nargs='+', choices=SIZES, default=list(SIZES))
+
+    replay = commands.add_parser('replay', help='replay recorded key logs without a terminal')
+    replay.set_defaults(handler=cmd_replay, quiet=True)
+    replay.add_argument('replay_args', nargs=argparse.REMAINDER)
+
+    serve = commands.add_parser('serve', help='serve puzzles and game sessions over a local socket')
+    serve.set_defaults(handler=cmd_serve, quiet=True)
+    service.add_arguments(serve)
+
+    loadgen_command = commands.add_parser('loadgen', help='drive a running puzzle service with concurrent sessions')
+    loadgen_command.set_defaults(handler=cmd_loadgen, quiet=True)
+    loadgen.add_arguments(loadgen_command)
+
+    return parser
+
+
+def main(argv: Optional[list[str]] = None, stdin: Optional[BinaryIO] = None,
+         stdout: Optional[BinaryIO] = None, stderr: Optional[TextIO] = None) -> int:
+    args = build_parser().parse_args(argv)
+    args.processed = 0
+
+    stdin = stdin or sys.stdin.buffer
+    stdout = stdout or sys.stdout.buffer
+    stderr = stderr or sys.stderr
+    args.stderr = stderr
+
+    start = time.perf_counter()
+    try:
+        status = args.handler(args, stdin, stdout)
+    except InputError as exc:
+        print(f"{args.command}: {exc}", file=stderr)
+        return 1
+    finally:
+        stdout.flush()
+    elapsed = time.perf_counter() - start
+
+    if not args.quiet:
+        rate = args.processed / elapsed if elapsed > 0 else float('inf')
+        print(f"{args.command}: {args.processed} puzzles in {elapsed:.2f}s ({rate:.1f} puzzles/s)",
+              file=stderr)
+
+    return status
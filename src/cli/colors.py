@@ -10,6 +10,7 @@ class ColorPairs:
     HEADER = 6
     INFO = 7
     CANDIDATE = 8
+    HINT = 9
 
 
 def init_colors():
@@ -31,3 +32,5 @@ def init_colors():
     curses.init_pair(ColorPairs.INFO, curses.COLOR_CYAN, -1)
 
     curses.init_pair(ColorPairs.CANDIDATE, curses.COLOR_YELLOW, -1)
+
+    curses.init_pair(ColorPairs.HINT, curses.COLOR_BLACK, curses.COLOR_GREEN)
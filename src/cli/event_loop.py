@@ -0,0 +1,215 @@
+import asyncio
+import curses
+import functools
+import os
+import signal
+import sys
+import time
+from typing import Any, Callable, Optional
+
+from src.cli.input_handler import InputHandler
+from src.cli.renderer import Renderer
+from src.game.checker import SolvabilityCheck
+from src.game.logic import find_hint
+from src.game.state import GameState
+
+# used only where the loop can't watch stdin (e.g. the Windows proactor loop)
+FALLBACK_POLL_INTERVAL = 0.05
+
+
+async def run_in_background(func: Callable, *args) -> Any:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, functools.partial(func, *args))
+
+
+class GameLoop:
+    def __init__(self, stdscr, state: GameState, renderer: Renderer, input_handler: InputHandler,
+                 key_log: Optional[list[int]] = None):
+        self.stdscr = stdscr
+        self.state = state
+        self.renderer = renderer
+        self.input_handler = input_handler
+        self.key_log = key_log
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._finished: Optional[asyncio.Event] = None
+        self._hint_key: Optional[int] = None
+        self._check: Optional[SolvabilityCheck] = None
+
+    async def run(self):
+        self._loop = asyncio.get_running_loop()
+        self._finished = asyncio.Event()
+
+        self.stdscr.nodelay(True)
+        if self.renderer.profiler is not None:
+            with self.renderer.profiler.phase('first render'):
+                self.draw()
+        else:
+            self.draw()
+        self._prefetch_hint()
+        self._check_solvability()
+
+        fd = sys.stdin.fileno()
+        watching_stdin = self._watch_stdin(fd)
+        watching_resize = self._watch_resize()
+        tasks = [asyncio.create_task(self._tick_clock())]
+        if not watching_stdin:
+            tasks.append(asyncio.create_task(self._poll_input()))
+
+        try:
+            await self._finished.wait()
+        finally:
+            if self._check is not None:
+                self._check.cancel()
+            for task in tasks:
+                task.cancel()
+            if watching_stdin:
+                self._loop.remove_reader(fd)
+            if watching_resize:
+                self._loop.remove_signal_handler(signal.SIGWINCH)
+            self.stdscr.nodelay(False)
+
+    def submit(self, func: Callable, *args, on_done: Optional[Callable[[Any], None]] = None,
+               redraw: bool = True) -> asyncio.Future:
+        future = self._loop.run_in_executor(None, functools.partial(func, *args))
+
+        def _done(f: asyncio.Future):
+            if f.cancelled() or f.exception() is not None:
+                return
+            if on_done is not None:
+                on_done(f.result())
+            if redraw and not self._finished.is_set():
+                self.draw()
+
+        future.add_done_callback(_done)
+        return future
+
+    def draw(self):
+        status = self.input_handler.get_command_buffer()
+        recording = self.input_handler.is_recording()
+        if not status and recording is not None:
+            status = f"recording @{recording}"
+
+        profiler = self.renderer.profiler
+        if profiler is None:
+            self.renderer.render(status)
+        else:
+            start = time.perf_counter()
+            self.renderer.render(status)
+            profiler.record_render(time.perf_counter() - start)
+
+    def _watch_stdin(self, fd: int) -> bool:
+        try:
+            self._loop.add_reader(fd, self._on_input_ready)
+        except (NotImplementedError, ValueError, OSError):
+            return False
+        return True
+
+    def _watch_resize(self) -> bool:
+        # stdin stays quiet when only the window changes, so the resize has to wake the loop itself
+        if not hasattr(signal, 'SIGWINCH'):
+            return False
+        try:
+            self._loop.add_signal_handler(signal.SIGWINCH, self._on_resize)
+        except (NotImplementedError, ValueError, RuntimeError):
+            return False
+        return True
+
+    def _on_resize(self):
+        # this handler replaces the one curses installed, so tell curses the new size;
+        # resizeterm queues a KEY_RESIZE that the drain below picks up
+        try:
+            size = os.get_terminal_size(sys.stdout.fileno())
+            curses.resizeterm(size.lines, size.columns)
+        except (OSError, curses.error):
+            return
+        self._on_input_ready()
+
+    def _on_input_ready(self):
+        profiler = self.renderer.profiler
+        if profiler is None:
+            handled = self._drain_keys()
+        else:
+            start = time.perf_counter()
+            handled = self._drain_keys()
+            if handled:
+                profiler.record_input(time.perf_counter() - start)
+
+        if not self.input_handler.is_running():
+            self._finished.set()
+        elif handled:
+            self.draw()
+            self._prefetch_hint()
+            self._check_solvability()
+
+    def _prefetch_hint(self):
+        # work out the next deduction while the player thinks, so H is instant
+        key = self.state.current.state_key
+        if key == self._hint_key or key in self.state.hint_cache:
+            return
+
+        self._hint_key = key
+        self.submit(find_hint, self.state.current.copy(),
+                    on_done=functools.partial(self.state.hint_cache.put, key), redraw=False)
+
+    def _check_solvability(self):
+        # a move that leaves the solution starts a search in the background; the
+        # previous one is stopped, since its position is already out of date
+        node = self.state.current_node
+        if self._check is not None:
+            if self._check.node is node:
+                return
+            self._check.cancel()
+            self._check = None
+
+        if self.state.solvability_known():
+            return
+
+        check = SolvabilityCheck(self.state)
+        self._check = check
+
+        def record(culprit):
+            if not check.cancelled:
+                self.state.record_solvability(check.node, culprit)
+
+        self.submit(check.run, on_done=record)
+
+    def _drain_keys(self) -> bool:
+        handled = False
+
+        while self.input_handler.is_running():
+            try:
+                key = self.stdscr.getch()
+            except curses.error:
+                break
+
+            if key == -1:
+                break
+
+            if key == curses.KEY_RESIZE:
+                self.renderer.resize()
+                handled = True
+                continue
+
+            if self.key_log is not None:
+                self.key_log.append(key)
+            self.input_handler.handle_input(key)
+            handled = True
+
+        return handled
+
+    async def _poll_input(self):
+        while True:
+            self._on_input_ready()
+            await asyncio.sleep(FALLBACK_POLL_INTERVAL)
+
+    async def _tick_clock(self):
+        while True:
+            elapsed = self.state.get_elapsed_time().total_seconds()
+            await asyncio.sleep(1.0 - elapsed % 1.0)
+
+            if self.state.paused:
+                continue
+
+            self.renderer.render_clock()
+            self.stdscr.refresh()
@@ -1,118 +1,295 @@
 import curses
+from typing import Callable, Optional
+
+from src.config import PROFILE_DIR
+from src.game.board import SYMBOLS
 from src.game.state import GameState
+from src.cli.profiler import Profiler
 from src.cli.renderer import Renderer
 
+DIGIT_KEYS = {ord(str(i)): i for i in range(1, 10)}
+SYMBOL_KEYS = {**{ord(symbol): value for value, symbol in enumerate(SYMBOLS, start=1)},
+               **{ord(symbol.lower()): value for value, symbol in enumerate(SYMBOLS, start=1)}}
+ENTER_KEYS = (curses.KEY_ENTER, 10, 13)
+BACKSPACE_KEYS = (curses.KEY_BACKSPACE, 127, 8)
+CLEAR_KEYS = (ord('x'), ord('X'), curses.KEY_DC, curses.KEY_BACKSPACE, 127)
+REGISTER_KEYS = {ord(c): c for c in 'abcdefghijklmnopqrstuvwxyz'}
+ESCAPE = 27
+CTRL_R = 18
+MAX_REPLAY_DEPTH = 16
+# commands that change the board, so . repeats them
+CHANGE_COMMANDS = (':hint', ':fill')
+
 
 class InputHandler:
-    def __init__(self, state: GameState, renderer: Renderer):
+    def __init__(self, state: GameState, renderer: Optional[Renderer] = None):
         self.state = state
         self.renderer = renderer
         self.running = True
         self.command_mode = False
         self.command_buffer = ""
 
+        self._count = ""
+        self._pending: Optional[Callable[[int], bool]] = None
+
+        self.registers: dict[str, list[int]] = {}
+        self._recording: Optional[str] = None
+        self._record_buffer: list[int] = []
+        self._last_register: Optional[str] = None
+        self._last_change: list[int] = []
+        self._replay_depth = 0
+
+        self._keymap: dict[int, tuple[Callable[[int], bool], bool, bool]] = {}
+        self._build_keymap()
+
+    def _build_keymap(self):
+        self._bind(ord('q'), self._start_recording)
+        self._bind(ord('@'), self._play_register, countable=True)
+        self._bind(ord('.'), self._repeat_change, countable=True)
+        self._bind(ord(':'), self._enter_command_mode)
+
+        self._bind((ord('h'), curses.KEY_LEFT), self._motion(0, -1), countable=True)
+        self._bind((ord('j'), curses.KEY_DOWN), self._motion(1, 0), countable=True)
+        self._bind((ord('k'), curses.KEY_UP), self._motion(-1, 0), countable=True)
+        self._bind((ord('l'), curses.KEY_RIGHT), self._motion(0, 1), countable=True)
+
+        self._bind(ord('w'), lambda n: self.state.jump_cursor(self.state.next_empty_cell(True, n)),
+                   countable=True)
+        self._bind(ord('b'), lambda n: self.state.jump_cursor(self.state.next_empty_cell(False, n)),
+                   countable=True)
+        self._bind(ord(']'), lambda n: self.state.jump_cursor(self.state.next_error_cell(True, n)),
+                   countable=True)
+        self._bind(ord('['), lambda n: self.state.jump_cursor(self.state.next_error_cell(False, n)),
+                   countable=True)
+        self._bind(ord('f'), self._find_value(True), countable=True)
+        self._bind(ord('F'), self._find_value(False), countable=True)
+
+        for key, value in DIGIT_KEYS.items():
+            self._bind(key, self._enter_value(value), change=True)
+        self._bind(CLEAR_KEYS, self._clear_cell, change=True)
+        self._bind(ord('r'), self._replace_cell, change=True)
+        self._bind(ord('u'), lambda n: self.state.undo(n), countable=True)
+        self._bind(CTRL_R, lambda n: self.state.redo(n), countable=True)
+        self._bind(ord('g'), self._travel, countable=True)
+
+        self._bind((ord('H'), ord('h') | curses.A_ALTCHARSET), lambda _: self.state.get_hint(),
+                   change=True)
+        self._bind(ord('='), lambda _: self.state.fill_forced_cells() > 0, change=True)
+        self._bind(ord('c'), self._toggle_conflicts)
+        self._bind(ord('n'), self._toggle_candidates)
+        self._bind(ord('p'), self._toggle_pause)
+
+    def _bind(self, keys, command: Callable[[int], bool], countable: bool = False, change: bool = False):
+        if isinstance(keys, int):
+            keys = (keys,)
+        for key in keys:
+            self._keymap[key] = (command, countable, change)
+
     def handle_input(self, key: int) -> bool:
         if self.state.is_won():
-            if key in [ord('q'), curses.KEY_ENTER, 10, 13]:
+            if key in (ord('q'), *ENTER_KEYS):
                 self.running = False
                 return True
             return False
 
+        if self.renderer is not None:
+            self.renderer.clear_message()
+
+        if self._replay_depth == 0 and self._recording is not None:
+            if key == ord('q') and self._pending is None and not self.command_mode:
+                return self._stop_recording()
+            self._record_buffer.append(key)
+
         if self.command_mode:
             return self._handle_command_mode(key)
 
-        if key == ord('q'):
-            self.running = False
-            return True
+        if self._pending is not None:
+            pending, self._pending = self._pending, None
+            return pending(key)
 
-        elif key == ord(':'):
-            self.command_mode = True
-            self.command_buffer = ":"
+        # digits enter values, so a count starts with 0 (05j, 012l)
+        if key == ord('0') or (self._count and key in DIGIT_KEYS):
+            self._count += chr(key)
             return True
 
-        elif key == ord('h'):
-            self.state.move_cursor(0, -1)
-            return True
+        count = max(1, int(self._count)) if self._count else 1
+        self._count = ""
 
-        elif key == ord('j'):
-            self.state.move_cursor(1, 0)
-            return True
+        binding = self._keymap.get(key)
+        if binding is None:
+            return False
 
-        elif key == ord('k'):
-            self.state.move_cursor(-1, 0)
-            return True
+        command, countable, change = binding
+        if change and self._replay_depth == 0:
+            self._last_change = [key]
 
-        elif key == ord('l'):
-            self.state.move_cursor(0, 1)
-            return True
+        return command(count if countable else 1)
 
-        elif key == curses.KEY_LEFT:
-            self.state.move_cursor(0, -1)
-            return True
+    def replay(self, keys: list[int], times: int = 1) -> bool:
+        if self._replay_depth >= MAX_REPLAY_DEPTH:
+            return False
 
-        elif key == curses.KEY_DOWN:
-            self.state.move_cursor(1, 0)
+        self._commit_pending()
+        self._replay_depth += 1
+        try:
+            for _ in range(times):
+                for key in keys:
+                    if not self.running:
+                        return True
+                    self.handle_input(key)
+                self._commit_pending()
+        finally:
+            self._replay_depth -= 1
+
+        return True
+
+    def _commit_pending(self):
+        self._count = ""
+        self._pending = None
+
+    def _start_recording(self, _: int) -> bool:
+        def on_register(key: int) -> bool:
+            if key not in REGISTER_KEYS:
+                return False
+            self._recording = REGISTER_KEYS[key]
+            self._record_buffer = []
             return True
 
-        elif key == curses.KEY_UP:
-            self.state.move_cursor(-1, 0)
-            return True
+        self._pending = on_register
+        return True
 
-        elif key == curses.KEY_RIGHT:
-            self.state.move_cursor(0, 1)
-            return True
+    def _stop_recording(self) -> bool:
+        self.registers[self._recording] = self._record_buffer
+        self._recording = None
+        self._record_buffer = []
+        self._commit_pending()
+        return True
 
-        elif key in [ord(str(i)) for i in range(1, 10)]:
-            value = key - ord('0')
-            self.state.set_value(self.state.cursor_row, self.state.cursor_col, value)
-            return True
+    def _play_register(self, count: int) -> bool:
+        def on_register(key: int) -> bool:
+            if key == ord('@'):
+                register = self._last_register
+            else:
+                register = REGISTER_KEYS.get(key)
 
-        elif key in [ord('x'), ord('X'), curses.KEY_DC, curses.KEY_BACKSPACE, 127]:
-            self.state.set_value(self.state.cursor_row, self.state.cursor_col, None)
-            return True
+            if register not in self.registers:
+                return False
 
-        elif key == ord('u'):
-            self.state.undo()
-            return True
+            self._last_register = register
+            return self.replay(self.registers[register], count)
 
-        elif key == 18:
-            self.state.redo()
+        self._pending = on_register
+        return True
+
+    def _repeat_change(self, count: int) -> bool:
+        if not self._last_change:
+            return False
+        return self.replay(self._last_change, count)
+
+    def is_recording(self) -> Optional[str]:
+        return self._recording
+
+    def _motion(self, delta_row: int, delta_col: int) -> Callable[[int], bool]:
+        def command(count: int) -> bool:
+            self.state.move_cursor(delta_row * count, delta_col * count)
             return True
 
-        elif key in [ord('H'), ord('h') | curses.A_ALTCHARSET]:
-            self.state.get_hint()
+        return command
+
+    def _find_value(self, forward: bool) -> Callable[[int], bool]:
+        def command(count: int) -> bool:
+            def on_target(key: int) -> bool:
+                value = self._symbol_value(key)
+                if value is None:
+                    return False
+                target = self.state.next_cell_with_value(value, forward, count)
+                return self.state.jump_cursor(target)
+
+            self._pending = on_target
             return True
 
-        elif key == ord('c'):
+        return command
+
+    def _travel(self, count: int) -> bool:
+        # g- and g+ step through states in the order they were made, across branches
+        def on_direction(key: int) -> bool:
+            if key == ord('-'):
+                return self.state.earlier(count)
+            if key == ord('+'):
+                return self.state.later(count)
+            return False
+
+        self._pending = on_direction
+        return True
+
+    def _enter_command_mode(self, _: int) -> bool:
+        self.command_mode = True
+        self.command_buffer = ":"
+        return True
+
+    def _enter_value(self, value: int) -> Callable[[int], bool]:
+        def command(_: int) -> bool:
+            if value > self.state.current.length:
+                return False
+            return self.state.set_value(self.state.cursor_row, self.state.cursor_col, value)
+
+        return command
+
+    def _clear_cell(self, _: int) -> bool:
+        self.state.set_value(self.state.cursor_row, self.state.cursor_col, None)
+        return True
+
+    def _replace_cell(self, _: int) -> bool:
+        # r{symbol} enters any value, including the letters of 16x16 and 25x25 boards
+        def on_symbol(key: int) -> bool:
+            value = self._symbol_value(key)
+            if value is None:
+                return False
+            if self._replay_depth == 0:
+                self._last_change = [ord('r'), key]
+            return self.state.set_value(self.state.cursor_row, self.state.cursor_col, value)
+
+        self._pending = on_symbol
+        return True
+
+    def _symbol_value(self, key: int) -> Optional[int]:
+        value = SYMBOL_KEYS.get(key)
+        if value is None or value > self.state.current.length:
+            return None
+        return value
+
+    def _toggle_conflicts(self, _: int) -> bool:
+        if self.renderer is not None:
             self.renderer.toggle_conflicts()
-            return True
+        return True
 
-        elif key == ord('n'):
+    def _toggle_candidates(self, _: int) -> bool:
+        if self.renderer is not None:
             self.renderer.toggle_candidates()
-            return True
-
-        elif key == ord('p'):
-            if self.state.paused:
-                self.state.resume()
-            else:
-                self.state.pause()
-            return True
+        return True
 
-        return False
+    def _toggle_pause(self, _: int) -> bool:
+        if self.state.paused:
+            self.state.resume()
+        else:
+            self.state.pause()
+        return True
 
     def _handle_command_mode(self, key: int) -> bool:
-        if key == 27:
+        if key == ESCAPE:
             self.command_mode = False
             self.command_buffer = ""
             return True
 
-        elif key in [curses.KEY_ENTER, 10, 13]:
+        elif key in ENTER_KEYS:
+            if self._replay_depth == 0 and self.command_buffer.strip() in CHANGE_COMMANDS:
+                self._last_change = [*map(ord, self.command_buffer), key]
             self._execute_command()
             self.command_mode = False
             self.command_buffer = ""
             return True
 
-        elif key in [curses.KEY_BACKSPACE, 127, 8]:
+        elif key in BACKSPACE_KEYS:
             if len(self.command_buffer) > 1:
                 self.command_buffer = self.command_buffer[:-1]
             else:
@@ -142,12 +319,65 @@ class InputHandler:
         elif cmd == ':hint':
             self.state.get_hint()
 
+        elif cmd == ':fill':
+            self.state.fill_forced_cells()
+
         elif cmd == ':undo':
             self.state.undo()
 
         elif cmd == ':redo':
             self.state.redo()
 
+        elif cmd.split()[0] in [':earlier', ':later']:
+            self._travel_command(cmd.split())
+
+        elif cmd == ':undolist':
+            self._show_undo_list()
+
+        elif cmd in [':profile', ':profile dump']:
+            self._profile(dump=cmd.endswith('dump'))
+
+    def _travel_command(self, parts: list[str]):
+        count = parts[1] if len(parts) > 1 else '1'
+        if len(parts) > 2 or not count.isdigit():
+            return
+
+        if parts[0] == ':earlier':
+            self.state.earlier(int(count))
+        else:
+            self.state.later(int(count))
+
+    def _show_undo_list(self):
+        if self.renderer is None:
+            return
+
+        leaves = self.state.undo_leaves()
+        if not leaves:
+            self.renderer.show_message(["Nothing to undo"])
+            return
+
+        # newest first, so the branches that fit on screen are the recent ones
+        lines = ["change  moves  time"]
+        for node in reversed(leaves):
+            lines.append(f"{node.seq:>6} {node.depth:>6}  {node.entry.timestamp:%H:%M:%S}")
+        self.renderer.show_message(lines)
+
+    def _profile(self, dump: bool):
+        if self.renderer is None:
+            return
+
+        profiler = self.renderer.profiler
+        if dump:
+            if profiler is None:
+                profiler = Profiler(PROFILE_DIR)
+                self.renderer.set_profiler(profiler)
+            try:
+                profiler.write_summary()
+            except OSError:
+                pass
+        else:
+            self.renderer.set_profiler(Profiler(PROFILE_DIR) if profiler is None else None)
+
     def _save_game(self):
         try:
             self.state.current.save_compact('~save')
@@ -158,4 +388,4 @@ class InputHandler:
         return self.command_buffer if self.command_mode else ""
 
     def is_running(self) -> bool:
-        return self.running
\ No newline at end of file
+        return self.running
@@ -0,0 +1,107 @@
+import cProfile
+import json
+import os
+import time
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Iterator, Optional
+
+FRAME_WINDOW = 60
+TRACEMALLOC_TOP = 25
+
+
+class Profiler:
+    def __init__(self, output_dir: str, deep: bool = False):
+        self.output_dir = output_dir
+        self.deep = deep
+        self.phases: dict[str, float] = {}
+        self.render_times: deque[float] = deque(maxlen=FRAME_WINDOW)
+        self.input_times: deque[float] = deque(maxlen=FRAME_WINDOW)
+        self.dumps: list[str] = []
+        self.last_summary: Optional[str] = None
+
+    @contextmanager
+    def phase(self, name: str, deep: Optional[bool] = None) -> Iterator[None]:
+        deep = self.deep if deep is None else deep
+        profile = cProfile.Profile() if deep else None
+        tracing = deep and not tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.start()
+        if profile is not None:
+            profile.enable()
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start
+            if profile is not None:
+                profile.disable()
+                self._dump(name, profile, tracemalloc.take_snapshot() if tracing else None)
+            if tracing:
+                tracemalloc.stop()
+
+    def wrap(self, name: str, func: Callable) -> Callable:
+        # the phase has to start inside the worker thread for cProfile to see it
+        def run(*args, **kwargs):
+            with self.phase(name):
+                return func(*args, **kwargs)
+        return run
+
+    def record_render(self, seconds: float):
+        self.render_times.append(seconds)
+
+    def record_input(self, seconds: float):
+        self.input_times.append(seconds)
+
+    def status(self) -> str:
+        parts = [f"{name} {seconds * 1000:.0f}ms" for name, seconds in self.phases.items()]
+        if self.render_times:
+            parts.append(f"render {self.render_times[-1] * 1000:.1f}/{max(self.render_times) * 1000:.1f}ms")
+        if self.input_times:
+            parts.append(f"input {self.input_times[-1] * 1000:.1f}/{max(self.input_times) * 1000:.1f}ms")
+        if self.last_summary:
+            parts.append(f"saved {os.path.basename(self.last_summary)}")
+        return "Profile: " + (", ".join(parts) if parts else "waiting for a frame")
+
+    def write_summary(self) -> str:
+        path = self._new_path('summary', 'json')
+        with open(path, 'w') as f:
+            json.dump({
+                'phases': self.phases,
+                'render_seconds': list(self.render_times),
+                'input_seconds': list(self.input_times),
+                'dumps': self.dumps,
+            }, f, indent=2)
+        self.last_summary = path
+        return path
+
+    def _dump(self, name: str, profile: cProfile.Profile, snapshot: Optional[tracemalloc.Snapshot]):
+        path = self._new_path(name, 'prof')
+        profile.dump_stats(path)
+        self.dumps.append(path)
+
+        if snapshot is None:
+            return
+        path = self._new_path(name, 'mem.txt')
+        with open(path, 'w') as f:
+            for stat in snapshot.statistics('lineno')[:TRACEMALLOC_TOP]:
+                f.write(f"{stat}\n")
+        self.dumps.append(path)
+
+    def _new_path(self, name: str, extension: str) -> str:
+        os.makedirs(self.output_dir, exist_ok=True)
+        slug = name.replace(' ', '-')
+        return os.path.join(self.output_dir, f"{slug}-{datetime.now():%Y%m%d-%H%M%S-%f}.{extension}")
+
+
+def profiler_from_mode(mode: str, output_dir: str) -> Optional[Profiler]:
+    if not mode or mode == '0':
+        return None
+    return Profiler(output_dir, deep=mode == 'deep')
+
+
+def profiled(profiler: Optional[Profiler], name: str, func: Callable) -> Callable:
+    return func if profiler is None else profiler.wrap(name, func)
@@ -1,14 +1,34 @@
 import curses
-from src.game.state import GameState
+from typing import Optional
+from src.cli.profiler import Profiler
+from src.game.board import SYMBOLS
+from src.game.model import Deduction
+from src.game.state import GameState, UndoNode
 from src.cli.colors import ColorPairs
 
+HELP_TEXT = [
+    "Navigation: h/j/k/l (vim style), counts start with 0 like 05j",
+    "Jump: w/b=next/prev empty, ]/[=next/prev error, f/F{symbol}=find",
+    "Input: 1-9 to set value, r{symbol} for any value (A-P), x/Delete to clear",
+    "Actions: u=undo, Ctrl+r=redo, H=hint (twice to fill), ==fill singles (:fill)",
+    "Undo tree: g-/g+=older/newer state, :earlier N, :later N, :undolist",
+    "View: c=toggle conflicts, n=toggle candidates",
+    "Macros: q{a-z}=record, @{a-z}=play, .=repeat change",
+    "Quit: :q, Save: :w"
+]
+
+# info lines, the hint line and the gaps around them stay visible under the board
+PANEL_HEIGHT = 8
+
 
 class Renderer:
-    def __init__(self, stdscr, state: GameState):
+    def __init__(self, stdscr, state: GameState, profiler: Optional[Profiler] = None):
         self.stdscr = stdscr
         self.state = state
+        self.profiler = profiler
         self.show_candidates = False
         self.show_conflicts = False
+        self.message: list[str] = []
 
         self.board_start_row = 3
         self.board_start_col = 2
@@ -16,51 +36,114 @@ class Renderer:
         self.cell_width = 4
         self.cell_height = 2
 
-    def render(self):
+        self.top_row = 0
+        self.left_col = 0
+        self._layout()
+
+    def resize(self):
+        curses.update_lines_cols()
+        self._layout()
         self.stdscr.clear()
 
+    def set_profiler(self, profiler: Optional[Profiler]):
+        self.profiler = profiler
+        self._layout()
+
+    def _layout(self):
+        self.lines, self.cols = self.stdscr.getmaxyx()
+        length = self.state.current.length
+        self.panel_height = PANEL_HEIGHT + (self.profiler is not None)
+
+        # the last line is left to the command buffer
+        board_lines = self.lines - 1 - self.board_start_row - self.panel_height
+        self.visible_rows = max(1, min(length, board_lines // self.cell_height))
+        self.visible_cols = max(1, min(length, (self.cols - self.board_start_col - 1) // self.cell_width))
+
+        self.top_row = min(self.top_row, length - self.visible_rows)
+        self.left_col = min(self.left_col, length - self.visible_cols)
+
+    def _scroll_to_cursor(self):
+        row, col = self.state.cursor_row, self.state.cursor_col
+
+        if row < self.top_row:
+            self.top_row = row
+        elif row >= self.top_row + self.visible_rows:
+            self.top_row = row - self.visible_rows + 1
+
+        if col < self.left_col:
+            self.left_col = col
+        elif col >= self.left_col + self.visible_cols:
+            self.left_col = col - self.visible_cols + 1
+
+    def put(self, row: int, col: int, text: str, attr: int = curses.A_NORMAL):
+        # never touch the last column so the cursor can't wrap past the screen
+        if row < 0 or row >= self.lines or col >= self.cols - 1:
+            return
+        self.stdscr.addstr(row, col, text[:self.cols - 1 - col], attr)
+
+    def render(self, status: str = ""):
+        self.stdscr.erase()
+        self._scroll_to_cursor()
+
         self._render_header()
         self._render_board()
         self._render_info_panel()
         self._render_help()
+        if status:
+            self.put(self.lines - 1, 0, status)
 
         self.stdscr.refresh()
 
     def _render_header(self):
         header = "=== VI SUDOKU ==="
-        self.stdscr.addstr(0, 2, header, curses.color_pair(ColorPairs.HEADER) | curses.A_BOLD)
+        self.put(0, 2, header, curses.color_pair(ColorPairs.HEADER) | curses.A_BOLD)
 
+        self.render_clock()
+
+    def render_clock(self):
         elapsed = self.state.get_elapsed_time()
         time_str = f"Time: {int(elapsed.total_seconds() // 60):02d}:{int(elapsed.total_seconds() % 60):02d}"
-        self.stdscr.addstr(0, 30, time_str, curses.color_pair(ColorPairs.INFO))
+        self.put(0, 30, time_str, curses.color_pair(ColorPairs.INFO))
 
     def _render_board(self):
-        board = self.state.current
         conflicts_set = set()
 
         if self.show_conflicts:
             conflicts = self.state.get_conflicts(self.state.cursor_row, self.state.cursor_col)
             conflicts_set = set(conflicts)
 
-        for i in range(board.length):
-            for j in range(board.length):
-                self._render_cell(i, j, conflicts_set)
+        hint = self.state.current_hint()
+        hint_cells = set(hint[-1].cells) if hint else set()
+
+        culprit = self.state.unsolvable_since()
+        culprit_cells = set() if culprit is None else {
+            (move.row, move.col) for move in culprit.moves
+            if move.new_value is not None and self.state.current.get_cell(move.row, move.col) == move.new_value}
+
+        for i in range(self.top_row, self.top_row + self.visible_rows):
+            for j in range(self.left_col, self.left_col + self.visible_cols):
+                self._render_cell(i, j, conflicts_set, hint_cells, culprit_cells)
 
         self._render_board_grid()
 
-    def _render_cell(self, row: int, col: int, conflicts_set: set):
-        cell_row = self.board_start_row + row * self.cell_height
-        cell_col = self.board_start_col + col * self.cell_width
+    def _render_cell(self, row: int, col: int, conflicts_set: set, hint_cells: set, culprit_cells: set):
+        cell_row = self.board_start_row + (row - self.top_row) * self.cell_height
+        cell_col = self.board_start_col + (col - self.left_col) * self.cell_width
 
         value = self.state.current.get_cell(row, col)
         is_cursor = (row == self.state.cursor_row and col == self.state.cursor_col)
         is_fixed = self.state.is_cell_fixed(row, col)
         is_error = self.state.is_cell_error(row, col)
         is_conflict = (row, col) in conflicts_set
+        is_hint = (row, col) in hint_cells
+        is_culprit = (row, col) in culprit_cells
 
-        if is_error:
+        if is_error or is_culprit:
             color_pair = ColorPairs.ERROR
             bold = True
+        elif is_hint:
+            color_pair = ColorPairs.HINT
+            bold = False
         elif is_conflict:
             color_pair = ColorPairs.CONFLICT
             bold = False
@@ -77,60 +160,53 @@ class Renderer:
             attr = curses.color_pair(color_pair)
             if bold:
                 attr |= curses.A_BOLD
+            if is_culprit:
+                attr |= curses.A_UNDERLINE
 
         if value is not None:
-            display = str(value)
+            display = SYMBOLS[value - 1]
         else:
             display = '.'
 
-        self.stdscr.addstr(cell_row, cell_col + 1, display, attr)
+        self.put(cell_row, cell_col + 1, display, attr)
 
         if self.show_candidates and value is None and not is_cursor:
             candidates = self.state.get_candidates(row, col)
             if candidates:
-                cand_str = ''.join(str(c) for c in candidates[:3])
-                self.stdscr.addstr(cell_row + 1, cell_col, cand_str[:3],
-                                   curses.color_pair(ColorPairs.CANDIDATE))
+                cand_str = ''.join(SYMBOLS[c - 1] for c in candidates[:3])
+                self.put(cell_row + 1, cell_col, cand_str[:3], curses.color_pair(ColorPairs.CANDIDATE))
 
     def _render_board_grid(self):
-        board = self.state.current
+        chunk_size = self.state.current.chunk_size
+        line_length = self.visible_cols * self.cell_width
 
-        for i in range(board.length + 1):
-            row = self.board_start_row + i * self.cell_height
+        for i in range(self.top_row, self.top_row + self.visible_rows + 1):
+            row = self.board_start_row + (i - self.top_row) * self.cell_height
 
-            if i % board.chunk_size == 0:
+            if i % chunk_size == 0:
                 line_char = '═'
                 attr = curses.A_NORMAL
             else:
                 line_char = '-'
                 attr = curses.A_DIM
 
-            line_length = board.length * self.cell_width
-            line = line_char * line_length
-            try:
-                self.stdscr.addstr(row - 1, self.board_start_col, line, attr)
-            except curses.error:
-                pass
+            self.put(row - 1, self.board_start_col, line_char * line_length, attr)
 
-        for j in range(board.length + 1):
-            col = self.board_start_col + j * self.cell_width
+        for j in range(self.left_col, self.left_col + self.visible_cols + 1):
+            col = self.board_start_col + (j - self.left_col) * self.cell_width
 
-            if j % board.chunk_size == 0:
+            if j % chunk_size == 0:
                 line_char = '║'
                 attr = curses.A_NORMAL
             else:
                 line_char = '│'
                 attr = curses.A_DIM
 
-            for i in range(board.length):
-                row = self.board_start_row + i * self.cell_height
-                try:
-                    self.stdscr.addstr(row, col - 1, line_char, attr)
-                except curses.error:
-                    pass
+            for i in range(self.visible_rows):
+                self.put(self.board_start_row + i * self.cell_height, col - 1, line_char, attr)
 
     def _render_info_panel(self):
-        info_row = self.board_start_row + self.state.current.length * self.cell_height + 2
+        info_row = self.board_start_row + self.visible_rows * self.cell_height + 1
 
         progress = self.state.get_progress_percentage()
         elapsed = self.state.get_elapsed_time()
@@ -139,12 +215,29 @@ class Renderer:
             f"Progress: {progress:.1f}%",
             f"Errors: {self.state.errors_count}",
             f"Hints: {self.state.hints_used}",
-            f"Moves: {len(self.state.history)}",
+            f"Moves: {self.state.move_count}",
         ]
+        culprit = self.state.unsolvable_since()
+        if culprit is not None:
+            info_lines[1] += f"  (no solution since move {culprit.depth}{_describe_move(culprit)})"
+        if self.state.change_count != self.state.move_count:
+            info_lines[-1] += f" (change {self.state.change_number} of {self.state.change_count})"
+
+        length = self.state.current.length
+        if self.visible_rows < length or self.visible_cols < length:
+            info_lines.append(f"View: rows {self.top_row + 1}-{self.top_row + self.visible_rows}, "
+                              f"cols {self.left_col + 1}-{self.left_col + self.visible_cols} of {length}")
+
+        if self.profiler is not None:
+            info_lines.append(self.profiler.status())
 
         for i, line in enumerate(info_lines):
-            self.stdscr.addstr(info_row + i, self.board_start_col, line,
-                               curses.color_pair(ColorPairs.INFO))
+            self.put(info_row + i, self.board_start_col, line, curses.color_pair(ColorPairs.INFO))
+
+        hint = self.state.current_hint()
+        if hint:
+            self.put(info_row + len(info_lines), self.board_start_col, _describe_hint(hint),
+                      curses.color_pair(ColorPairs.HEADER))
 
         if self.state.is_won():
             win_msg = "*** CONGRATULATIONS! YOU WON! ***"
@@ -152,32 +245,29 @@ class Renderer:
             exit_msg = "Press 'q' or Enter to exit"
 
             msg_row = info_row + len(info_lines) + 2
-            self.stdscr.addstr(msg_row, self.board_start_col, win_msg,
-                               curses.color_pair(ColorPairs.HEADER) | curses.A_BOLD | curses.A_BLINK)
-            self.stdscr.addstr(msg_row + 1, self.board_start_col, time_msg,
-                               curses.color_pair(ColorPairs.INFO) | curses.A_BOLD)
-            self.stdscr.addstr(msg_row + 2, self.board_start_col, exit_msg,
-                               curses.color_pair(ColorPairs.HEADER) | curses.A_DIM)
+            self.put(msg_row, self.board_start_col, win_msg,
+                      curses.color_pair(ColorPairs.HEADER) | curses.A_BOLD | curses.A_BLINK)
+            self.put(msg_row + 1, self.board_start_col, time_msg,
+                      curses.color_pair(ColorPairs.INFO) | curses.A_BOLD)
+            self.put(msg_row + 2, self.board_start_col, exit_msg,
+                      curses.color_pair(ColorPairs.HEADER) | curses.A_DIM)
 
     def _render_help(self):
         if self.state.is_won():
             return
 
-        help_row = self.board_start_row + self.state.current.length * self.cell_height + 8
+        help_row = self.board_start_row + self.visible_rows * self.cell_height + self.panel_height - 1
 
-        help_text = [
-            "Navigation: h/j/k/l (vim style)",
-            "Input: 1-9 to set value, x/Delete to clear",
-            "Actions: u=undo, Ctrl+r=redo, H=hint",
-            "View: c=toggle conflicts, n=toggle candidates",
-            "Quit: q or :q, Save: w or :w"
-        ]
+        # help is dropped line by line when the terminal is too short for it
+        lines = self.message or HELP_TEXT
+        for i, line in enumerate(lines[:max(0, self.lines - 1 - help_row)]):
+            self.put(help_row + i, self.board_start_col, line)
+
+    def show_message(self, lines: list[str]):
+        self.message = lines
 
-        for i, line in enumerate(help_text):
-            try:
-                self.stdscr.addstr(help_row + i, self.board_start_col, line)
-            except curses.error:
-                pass
+    def clear_message(self):
+        self.message = []
 
     def toggle_candidates(self):
         self.show_candidates = not self.show_candidates
@@ -186,3 +276,18 @@ class Renderer:
         self.show_conflicts = not self.show_conflicts
 
 
+def _describe_move(node: UndoNode) -> str:
+    if len(node.moves) != 1 or node.moves[0].new_value is None:
+        return ""
+    move = node.moves[0]
+    return f": r{move.row + 1}c{move.col + 1}={SYMBOLS[move.new_value - 1]}"
+
+
+def _describe_hint(chain: list[Deduction]) -> str:
+    row, col, value = chain[-1].placements[0]
+    message = f"Hint: {chain[-1].technique.value} puts {SYMBOLS[value - 1]} at r{row + 1}c{col + 1}"
+
+    steps = list(dict.fromkeys(deduction.technique.value for deduction in chain[:-1]))
+    if steps:
+        message += f" after {', '.join(steps)}"
+    return message + " (H to fill)"
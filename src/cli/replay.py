@@ -0,0 +1,114 @@
+import argparse
+import os
+import sys
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+from src.cli.input_handler import InputHandler
+from src.game.board import Board
+from src.game.state import GameState
+
+KEYLOG_HEADER = 'vi-sudoku keylog 1'
+
+
+@dataclass
+class KeyLog:
+    puzzle: Board
+    solution: Board
+    keys: list[int]
+
+
+@dataclass
+class ReplayStats:
+    sessions: int
+    keys: int
+    moves: int
+    seconds: float
+
+
+def save_key_log(filepath: str, log: KeyLog) -> None:
+    with open(filepath, 'w') as f:
+        f.write(f"{KEYLOG_HEADER}\n")
+        f.write(f"puzzle {log.puzzle.to_line()}\n")
+        f.write(f"solution {log.solution.to_line()}\n")
+        f.write(f"keys {' '.join(str(key) for key in log.keys)}\n")
+
+
+def load_key_log(filepath: str) -> KeyLog:
+    with open(filepath) as f:
+        lines = f.read().splitlines()
+
+    if not lines or lines[0] != KEYLOG_HEADER:
+        raise ValueError(f"{filepath}: not a vi-sudoku key log")
+
+    fields = {}
+    for line in lines[1:]:
+        name, _, value = line.partition(' ')
+        fields[name] = value
+
+    return KeyLog(
+        puzzle=Board.from_line(fields['puzzle']),
+        solution=Board.from_line(fields['solution']),
+        keys=[int(key) for key in fields.get('keys', '').split()]
+    )
+
+
+def new_key_log_path(directory: str) -> str:
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, f"session-{datetime.now():%Y%m%d-%H%M%S-%f}.keylog")
+
+
+def replay_keys(puzzle: Board, solution: Board, keys: list[int]) -> GameState:
+    state = GameState(puzzle, solution)
+    handler = InputHandler(state)
+
+    for key in keys:
+        if not handler.is_running():
+            break
+        handler.handle_input(key)
+
+    return state
+
+
+def replay_logs(logs: list[KeyLog], rounds: int = 1) -> ReplayStats:
+    keys = 0
+    moves = 0
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for log in logs:
+            state = replay_keys(log.puzzle, log.solution, log.keys)
+            keys += len(log.keys)
+            moves += state.move_count
+    elapsed = time.perf_counter() - start
+
+    return ReplayStats(sessions=len(logs) * rounds, keys=keys, moves=moves, seconds=elapsed)
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='vi-sudoku replay',
+                                     description='Replay recorded key logs without a terminal')
+    parser.add_argument('logs', nargs='+', help='key log files')
+    parser.add_argument('--rounds', type=int, default=1, help='replay every log this many times')
+    parser.add_argument('--show', action='store_true', help='print the final board of each log')
+    args = parser.parse_args(argv)
+
+    logs = [load_key_log(path) for path in args.logs]
+
+    if args.show:
+        for path, log in zip(args.logs, logs):
+            state = replay_keys(log.puzzle, log.solution, log.keys)
+            print(f"{path}: won={state.is_won()} moves={state.move_count}")
+            print(state.current)
+
+    stats = replay_logs(logs, args.rounds)
+    rate = stats.keys / stats.seconds if stats.seconds > 0 else float('inf')
+    print(f"replayed {stats.sessions} sessions, {stats.keys} keys, {stats.moves} moves "
+          f"in {stats.seconds:.3f}s ({rate:,.0f} keys/s)", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
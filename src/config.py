@@ -0,0 +1,24 @@
+import os
+
+DATA_DIR = os.environ.get('VI_SUDOKU_DATA_DIR', os.path.join(os.path.expanduser('~'), '.vi-sudoku'))
+
+LIBRARY_PATH = os.environ.get('VI_SUDOKU_LIBRARY', os.path.join(DATA_DIR, 'library.sqlite3'))
+
+# set VI_SUDOKU_SOLUTION_CACHE to an empty string to disable the cache
+SOLUTION_CACHE_PATH = os.environ.get('VI_SUDOKU_SOLUTION_CACHE', os.path.join(DATA_DIR, 'solutions.cache'))
+SOLUTION_CACHE_MAX_ENTRIES = int(os.environ.get('VI_SUDOKU_SOLUTION_CACHE_SIZE', '10000'))
+
+# directory where finished sessions are written as key logs (disabled when unset)
+KEYLOG_DIR = os.environ.get('VI_SUDOKU_KEYLOG_DIR')
+
+# "1" times game phases and frames, "deep" also writes cProfile/tracemalloc dumps for each phase
+PROFILE_MODE = os.environ.get('VI_SUDOKU_PROFILE', '')
+PROFILE_DIR = os.environ.get('VI_SUDOKU_PROFILE_DIR', os.path.join(DATA_DIR, 'profiles'))
+
+# count calls to the naive board helpers in src.game.utils (off by default)
+HOT_PATH_COUNTERS = os.environ.get('VI_SUDOKU_COUNTERS', '') not in ('', '0')
+
+# per-board-size solver backend picked by calibration (empty string: calibrate every run)
+BACKEND_CONFIG_PATH = os.environ.get('VI_SUDOKU_BACKENDS', os.path.join(DATA_DIR, 'backends.json'))
+# force a registered backend by name instead of the calibrated choice
+SOLVER_BACKEND = os.environ.get('VI_SUDOKU_SOLVER', '')
@@ -1,5 +1,7 @@
 from enum import Enum
 
+SIZES = (9, 16, 25)
+
 
 class Difficulty(Enum):
     EASY = 'easy'
@@ -7,3 +9,24 @@ class Difficulty(Enum):
     HARD = 'hard'
     EXPERT = 'expert'
     INHUMAN = 'inhuman'
+
+
+class Symmetry(Enum):
+    NONE = 'none'
+    ROTATIONAL = 'rotational'
+    QUARTER_TURN = 'quarter-turn'
+    DIAGONAL = 'diagonal'
+    ANTI_DIAGONAL = 'anti-diagonal'
+    HORIZONTAL = 'horizontal'
+    VERTICAL = 'vertical'
+    DIHEDRAL = 'dihedral'
+
+
+class Technique(Enum):
+    NAKED_SINGLE = 'naked single'
+    HIDDEN_SINGLE = 'hidden single'
+    POINTING = 'pointing pair'
+    BOX_LINE = 'box/line reduction'
+    NAKED_PAIR = 'naked pair'
+    NAKED_TRIPLE = 'naked triple'
+    X_WING = 'x-wing'
@@ -0,0 +1,122 @@
+import mmap
+import struct
+import zlib
+from typing import Iterator, Optional
+
+from src.game.board import Board
+from src.game.codec import LAYOUT_CLUES, LAYOUT_FULL, decode_cells, encode_cells, packed_size
+
+ARCHIVE_MAGIC = b'VSAR'
+ARCHIVE_VERSION = 1
+_HEADER = struct.Struct('<4sBBBxIQI')
+
+
+class ArchiveWriter:
+    def __init__(self, filepath: str, length: int = 9, layout: int = LAYOUT_FULL,
+                 max_clues: Optional[int] = None):
+        self.filepath = filepath
+        self.length = length
+        self.layout = layout
+        self.max_clues = length * length if max_clues is None else max_clues
+        self.stride = packed_size(length, layout, self.max_clues)
+
+        self.count = 0
+        self._crc = 0
+        self._file = open(filepath, 'wb')
+        self._file.write(self._header())
+
+    def __enter__(self) -> 'ArchiveWriter':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def write_cells(self, cells: bytes):
+        if len(cells) != self.length * self.length:
+            raise ValueError(f"Expected {self.length * self.length} cells, got {len(cells)}")
+        if self.layout == LAYOUT_CLUES and len(cells) - cells.count(0) > self.max_clues:
+            raise ValueError(f"Board has more than {self.max_clues} clues")
+
+        record = encode_cells(self.length, cells, self.layout).ljust(self.stride, b'\0')
+        self._crc = zlib.crc32(record, self._crc)
+        self._file.write(record)
+        self.count += 1
+
+    def write_board(self, board: Board):
+        self.write_cells(board.to_compact_bytes()[1:])
+
+    def close(self):
+        if self._file.closed:
+            return
+        self._file.seek(0)
+        self._file.write(self._header())
+        self._file.close()
+
+    def _header(self) -> bytes:
+        return _HEADER.pack(ARCHIVE_MAGIC, ARCHIVE_VERSION, self.length, self.layout,
+                            self.stride, self.count, self._crc)
+
+
+class BoardArchive:
+    def __init__(self, filepath: str):
+        self.filepath = filepath
+        self._file = open(filepath, 'rb')
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        try:
+            header = self._mm[:_HEADER.size]
+            if len(header) != _HEADER.size:
+                raise ValueError(f"{filepath}: truncated archive header")
+
+            magic, version, self.length, self.layout, self.stride, self.count, self.crc = \
+                _HEADER.unpack(header)
+            if magic != ARCHIVE_MAGIC or version != ARCHIVE_VERSION:
+                raise ValueError(f"{filepath}: not a version {ARCHIVE_VERSION} board archive")
+            if len(self._mm) != _HEADER.size + self.stride * self.count:
+                raise ValueError(f"{filepath}: archive size does not match {self.count} records")
+        except ValueError:
+            self.close()
+            raise
+
+    def __enter__(self) -> 'BoardArchive':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._mm.close()
+        self._file.close()
+
+    def __len__(self) -> int:
+        return self.count
+
+    def cells(self, index: int) -> bytes:
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError('board index out of range')
+        start = _HEADER.size + index * self.stride
+        return decode_cells(self.length, self._mm[start:start + self.stride], self.layout)
+
+    def record(self, index: int) -> bytes:
+        return bytes((self.length,)) + self.cells(index)
+
+    def records(self) -> Iterator[bytes]:
+        for index in range(self.count):
+            yield self.record(index)
+
+    def __getitem__(self, index: int) -> Board:
+        return Board.from_compact_bytes(self.record(index))
+
+    def __iter__(self) -> Iterator[Board]:
+        for record in self.records():
+            yield Board.from_compact_bytes(record)
+
+    def verify(self) -> bool:
+        return zlib.crc32(self._mm[_HEADER.size:]) == self.crc
+
+
+def is_archive(filepath: str) -> bool:
+    with open(filepath, 'rb') as f:
+        return f.read(len(ARCHIVE_MAGIC)) == ARCHIVE_MAGIC
@@ -0,0 +1,272 @@
+import json
+import math
+import os
+import random
+import threading
+import time
+from abc import ABC, abstractmethod
+from itertools import islice
+from typing import Iterator, Optional
+
+from src.config import BACKEND_CONFIG_PATH, SOLVER_BACKEND
+from src.game.board import Board
+from src.game.engine import BitmaskSearch
+from src.game.model import SearchStats
+from src.game.utils import find_empty_cell, is_valid_placement
+
+CALIBRATION_PUZZLES = 3
+CALIBRATION_BUDGET = 20_000
+SAMPLE_GRID_BUDGET = 100_000
+# fraction of each sample grid that is blanked before timing the backends
+CALIBRATION_BLANKS = {9: 0.55, 16: 0.45, 25: 0.35}
+
+
+class SolverBackend(ABC):
+    name = ''
+    max_length = 25
+
+    def supports(self, length: int) -> bool:
+        return length <= self.max_length
+
+    @abstractmethod
+    def iter_solutions(self, length: int, cells: bytes, budget: Optional[int] = None,
+                       stats: Optional[SearchStats] = None,
+                       exclude: Optional[dict[int, int]] = None) -> Iterator[bytes]:
+        ...
+
+    def solve(self, board: Board, stats: Optional[SearchStats] = None) -> Optional[Board]:
+        cells = next(self.iter_solutions(board.length, board.to_compact_bytes()[1:], stats=stats), None)
+        if cells is None:
+            return None
+        return Board.from_compact_bytes(bytes((board.length,)) + cells)
+
+    def count(self, board: Board, limit: int = 2, budget: Optional[int] = None,
+              stats: Optional[SearchStats] = None) -> int:
+        solutions = self.iter_solutions(board.length, board.to_compact_bytes()[1:], budget, stats)
+        return sum(1 for _ in islice(solutions, limit))
+
+
+class BitmaskBackend(SolverBackend):
+    name = 'bitmask'
+
+    def iter_solutions(self, length: int, cells: bytes, budget: Optional[int] = None,
+                       stats: Optional[SearchStats] = None,
+                       exclude: Optional[dict[int, int]] = None) -> Iterator[bytes]:
+        search = BitmaskSearch(length, cells, budget, stats)
+        for index, value in (exclude or {}).items():
+            search.exclude(index, value)
+        return search.solutions()
+
+
+class NaiveBackend(SolverBackend):
+    name = 'naive'
+    max_length = 9
+
+    def iter_solutions(self, length: int, cells: bytes, budget: Optional[int] = None,
+                       stats: Optional[SearchStats] = None,
+                       exclude: Optional[dict[int, int]] = None) -> Iterator[bytes]:
+        board = Board.from_compact_bytes(bytes((length,)) + bytes(cells))
+        stats = stats if stats is not None else SearchStats()
+        if not _givens_consistent(board):
+            return iter(())
+        return self._timed(board, budget, stats, exclude or {})
+
+    def _timed(self, board: Board, budget: Optional[int], stats: SearchStats,
+               exclude: dict[int, int]) -> Iterator[bytes]:
+        start = time.perf_counter()
+        try:
+            yield from self._search(board, budget, stats, exclude, 0)
+        finally:
+            stats.elapsed += time.perf_counter() - start
+
+    def _search(self, board: Board, budget: Optional[int], stats: SearchStats,
+                exclude: dict[int, int], depth: int) -> Iterator[bytes]:
+        empty_cell = find_empty_cell(board)
+        if empty_cell is None:
+            stats.solutions += 1
+            yield board.to_compact_bytes()[1:]
+            return
+
+        if depth > stats.max_depth:
+            stats.max_depth = depth
+        row, col = empty_cell
+        excluded = exclude.get(row * board.length + col)
+
+        for num in range(1, board.length + 1):
+            if budget is not None and stats.nodes >= budget:
+                stats.exhausted = True
+                return
+
+            stats.placements += 1
+            if num == excluded or not is_valid_placement(board, row, col, num):
+                continue
+
+            board.set_cell(row, col, num)
+            stats.nodes += 1
+            yield from self._search(board, budget, stats, exclude, depth + 1)
+            board.set_cell(row, col, None)
+
+            if stats.exhausted:
+                return
+
+        stats.backtracks += 1
+
+
+def _givens_consistent(board: Board) -> bool:
+    for row in range(board.length):
+        for col in range(board.length):
+            value = board.get_cell(row, col)
+            if value is None:
+                continue
+            board.set_cell(row, col, None)
+            valid = is_valid_placement(board, row, col, value)
+            board.set_cell(row, col, value)
+            if not valid:
+                return False
+    return True
+
+
+_backends: dict[str, SolverBackend] = {}
+_chosen: dict[int, SolverBackend] = {}
+_lock = threading.Lock()
+
+
+def register_backend(backend: SolverBackend):
+    with _lock:
+        _backends[backend.name] = backend
+        _chosen.clear()
+
+
+def available_backends(length: Optional[int] = None) -> list[SolverBackend]:
+    return [backend for backend in _backends.values() if length is None or backend.supports(length)]
+
+
+def get_backend(length: int) -> SolverBackend:
+    backend = _chosen.get(length)
+    if backend is not None:
+        return backend
+
+    with _lock:
+        if length not in _chosen:
+            _chosen[length] = _choose(length)
+        return _chosen[length]
+
+
+def _choose(length: int) -> SolverBackend:
+    forced = _backends.get(SOLVER_BACKEND)
+    if forced is not None and forced.supports(length):
+        return forced
+
+    candidates = available_backends(length)
+    if len(candidates) == 1:
+        return candidates[0]
+
+    # a saved choice only counts if it was made between the backends registered now
+    names = sorted(backend.name for backend in candidates)
+    saved = _load_choices().get(str(length), {})
+    if saved.get('candidates') == names and saved.get('backend') in names:
+        return _backends[saved['backend']]
+
+    result = calibrate(length)
+    _save_choice(length, result)
+    return _backends[result['backend']]
+
+
+def calibrate(length: int) -> dict:
+    samples = _calibration_samples(length)
+    candidates = available_backends(length)
+    seconds: dict[str, Optional[float]] = {}
+
+    best: Optional[float] = None
+
+    for backend in candidates:
+        start = time.perf_counter()
+        elapsed: Optional[float] = None
+        for cells in samples:
+            stats = SearchStats()
+            solutions = backend.iter_solutions(length, cells, CALIBRATION_BUDGET, stats)
+            sum(1 for _ in islice(solutions, 2))
+            elapsed = time.perf_counter() - start
+            # running out of budget, or falling behind the fastest so far, rules a backend out
+            if stats.exhausted or (best is not None and elapsed > best):
+                elapsed = None
+                break
+
+        seconds[backend.name] = elapsed
+        if elapsed is not None and (best is None or elapsed < best):
+            best = elapsed
+
+    timed = {name: elapsed for name, elapsed in seconds.items() if elapsed is not None}
+    return {
+        'backend': min(timed, key=timed.get) if timed else BitmaskBackend.name,
+        'candidates': sorted(backend.name for backend in candidates),
+        'seconds': seconds,
+    }
+
+
+def _calibration_samples(length: int) -> list[bytes]:
+    # a private generator keeps the global random state (and seeded runs) untouched
+    rng = random.Random(length)
+    size = math.isqrt(length)
+    blanks = round(CALIBRATION_BLANKS.get(length, 0.4) * length * length)
+    samples = []
+
+    while len(samples) < CALIBRATION_PUZZLES:
+        cells = bytearray(length * length)
+        for box in range(size):
+            values = iter(rng.sample(range(1, length + 1), length))
+            for row in range(box * size, (box + 1) * size):
+                for col in range(box * size, (box + 1) * size):
+                    cells[row * length + col] = next(values)
+
+        grid = next(BitmaskSearch(length, cells, SAMPLE_GRID_BUDGET).solutions(), None)
+        if grid is None:
+            continue
+
+        cells = bytearray(grid)
+        for index in rng.sample(range(length * length), blanks):
+            cells[index] = 0
+        samples.append(bytes(cells))
+
+    return samples
+
+
+def _load_choices() -> dict:
+    if not BACKEND_CONFIG_PATH:
+        return {}
+    try:
+        with open(BACKEND_CONFIG_PATH) as f:
+            choices = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return choices if isinstance(choices, dict) else {}
+
+
+def _save_choice(length: int, result: dict):
+    if not BACKEND_CONFIG_PATH:
+        return
+    choices = _load_choices()
+    choices[str(length)] = result
+    # pool workers calibrate on their own, so readers must never see a half-written file
+    tmp_path = f"{BACKEND_CONFIG_PATH}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(BACKEND_CONFIG_PATH) or '.', exist_ok=True)
+        with open(tmp_path, 'w') as f:
+            json.dump(choices, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, BACKEND_CONFIG_PATH)
+    except OSError:
+        pass
+
+
+def recalibrate(lengths: tuple[int, ...]) -> dict[int, dict]:
+    results = {}
+    with _lock:
+        for length in lengths:
+            results[length] = calibrate(length)
+            _save_choice(length, results[length])
+            _chosen.pop(length, None)
+    return results
+
+
+register_backend(BitmaskBackend())
+register_backend(NaiveBackend())
@@ -1,6 +1,23 @@
 import math
+import random
+from functools import lru_cache
 from typing import Optional
 
+from src.game.codec import LAYOUTS, encode_packed, is_packed, decode_packed
+
+SYMBOLS = '123456789ABCDEFGHIJKLMNOP'
+EMPTY_SYMBOLS = '.0'
+
+ZOBRIST_SEED = 0x5D0C0
+
+
+@lru_cache(maxsize=None)
+def zobrist_table(length: int) -> tuple[tuple[int, ...], ...]:
+    rng = random.Random(ZOBRIST_SEED + length)
+    # an empty cell contributes nothing, so an empty board hashes to 0
+    return tuple(tuple([0] + [rng.getrandbits(64) for _ in range(length)])
+                 for _ in range(length * length))
+
 
 class Board:
     def __init__(self, length: int = 9, board: list[list[Optional[int]]] = None):
@@ -13,12 +30,29 @@ class Board:
         if board is not None:
             self._board = board
 
+        self._zobrist = zobrist_table(self.length)
+        self._hash = self._compute_hash()
+
+    def _compute_hash(self) -> int:
+        h = 0
+        for i, row in enumerate(self._board):
+            for j, cell in enumerate(row):
+                if cell is not None:
+                    h ^= self._zobrist[i * self.length + j][cell]
+        return h
+
     def get_cell(self, row: int, col: int) -> Optional[int]:
         return self._board[row][col]
 
     def set_cell(self, row: int, col: int, value: Optional[int]) -> None:
+        keys = self._zobrist[row * self.length + col]
+        self._hash ^= keys[self._board[row][col] or 0] ^ keys[value or 0]
         self._board[row][col] = value
 
+    @property
+    def state_key(self) -> int:
+        return self._hash
+
     def is_empty(self, row: int, col: int) -> bool:
         return self._board[row][col] is None
 
@@ -36,8 +70,17 @@ class Board:
 
         return bytes(result)
 
+    def to_packed_bytes(self, layout: str = 'full') -> bytes:
+        cells = bytes(cell if cell is not None else 0 for row in self._board for cell in row)
+        return encode_packed(self.length, cells, LAYOUTS[layout])
+
     @classmethod
     def from_compact_bytes(cls, data: bytes) -> 'Board':
+        if is_packed(data):
+            length, cells = decode_packed(data)
+            return cls(length=length, board=[[cell or None for cell in cells[i:i + length]]
+                                             for i in range(0, length * length, length)])
+
         length = data[0]
         board = [[None for _ in range(length)] for _ in range(length)]
 
@@ -50,9 +93,31 @@ class Board:
 
         return cls(length=length, board=board)
 
+    def to_line(self) -> str:
+        return ''.join(SYMBOLS[cell - 1] if cell is not None else '.'
+                       for row in self._board for cell in row)
+
+    @classmethod
+    def from_line(cls, line: str) -> 'Board':
+        line = line.strip()
+        length = math.isqrt(len(line))
+        if length * length != len(line) or math.isqrt(length) ** 2 != length:
+            raise ValueError(f"Invalid board line of {len(line)} characters")
+
+        board: list[list[Optional[int]]] = [[None for _ in range(length)] for _ in range(length)]
+        for idx, char in enumerate(line.upper()):
+            if char in EMPTY_SYMBOLS:
+                continue
+            value = SYMBOLS.find(char) + 1
+            if not 0 < value <= length:
+                raise ValueError(f"Invalid symbol {char!r} for a {length}x{length} board")
+            board[idx // length][idx % length] = value
+
+        return cls(length=length, board=board)
+
     def save_compact(self, filepath: str) -> None:
         with open(filepath, 'wb') as f:
-            f.write(self.to_compact_bytes())
+            f.write(self.to_packed_bytes())
 
     @classmethod
     def load_compact(cls, filepath: str) -> 'Board':
@@ -143,6 +208,15 @@ class Board:
 
     def __setitem__(self, index, value):
         self._board[index] = value
+        self._hash = self._compute_hash()
+
+    def __hash__(self):
+        return self._hash
+
+    def __eq__(self, other):
+        if not isinstance(other, Board):
+            return NotImplemented
+        return self._hash == other._hash and self._board == other._board
 
     def __iter__(self):
         return iter(self._board)
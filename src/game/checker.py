@@ -0,0 +1,63 @@
+from typing import Optional
+
+from src.game.engine import BitmaskSearch
+from src.game.state import GameState, UndoNode
+
+# search nodes per position; a search that runs out counts as solvable
+CHECK_BUDGET = 200_000
+
+
+class SolvabilityCheck:
+    def __init__(self, state: GameState):
+        self.node = state.current_node
+        self.length = state.current.length
+        self.cancelled = False
+        self._search: Optional[BitmaskSearch] = None
+
+        # only entries of the line still on the board can be to blame; the base is the
+        # board without them, which agrees with the solution wherever it has a value
+        latest: dict[int, tuple[UndoNode, int]] = {}
+        for node in state.off_solution_line():
+            for move in node.moves:
+                index = move.row * self.length + move.col
+                latest.pop(index, None)
+                if move.new_value:
+                    latest[index] = (node, move.new_value)
+        self._entries = [(index, node, value) for index, (node, value) in latest.items()]
+
+        cells = bytearray(state.current.to_compact_bytes()[1:])
+        for index in latest:
+            cells[index] = 0
+        self._base = bytes(cells)
+
+    def cancel(self):
+        self.cancelled = True
+        search = self._search
+        if search is not None:
+            search.cancel()
+
+    def run(self) -> Optional[UndoNode]:
+        if not self._entries or self._solvable(len(self._entries)):
+            return None
+
+        # entries are added back in the order they were made, and each one can only
+        # take solutions away, so the first dead position is found by bisection
+        low, high = 0, len(self._entries) - 1
+        while low < high and not self.cancelled:
+            middle = (low + high) // 2
+            if self._solvable(middle + 1):
+                low = middle + 1
+            else:
+                high = middle
+        return self._entries[low][1]
+
+    def _solvable(self, entries: int) -> bool:
+        cells = bytearray(self._base)
+        for index, _, value in self._entries[:entries]:
+            cells[index] = value
+
+        search = BitmaskSearch(self.length, bytes(cells), CHECK_BUDGET)
+        self._search = search
+        if self.cancelled:
+            return True
+        return next(search.solutions(), None) is not None or search.stats.exhausted
@@ -0,0 +1,88 @@
+PACKED_MAGIC = 0xF5
+PACKED_VERSION = 1
+PACKED_HEADER_SIZE = 4
+
+LAYOUT_FULL = 0
+LAYOUT_CLUES = 1
+LAYOUTS = {'full': LAYOUT_FULL, 'clues': LAYOUT_CLUES}
+
+_HEX = b'0123456789abcdef'
+_TO_HEX = bytes.maketrans(bytes(range(16)), _HEX)
+_FROM_HEX = bytes.maketrans(_HEX, bytes(range(16)))
+
+
+def cell_width(length: int) -> int:
+    return length.bit_length()
+
+
+def digit_width(length: int) -> int:
+    return (length - 1).bit_length()
+
+
+def pack_values(values: bytes, width: int) -> bytes:
+    if width == 4:
+        digits = values.translate(_TO_HEX)
+        if len(digits) % 2:
+            digits += b'0'
+        return bytes.fromhex(digits.decode('ascii'))
+
+    number = 0
+    for value in values:
+        number = (number << width) | value
+
+    bits = len(values) * width
+    padding = -bits % 8
+    return (number << padding).to_bytes((bits + padding) // 8, 'big')
+
+
+def unpack_values(data: bytes, count: int, width: int) -> bytes:
+    if width == 4:
+        return data.hex().encode('ascii')[:count].translate(_FROM_HEX)
+
+    bits = count * width
+    number = int.from_bytes(data[:(bits + 7) // 8], 'big') >> (-bits % 8)
+    mask = (1 << width) - 1
+    return bytes((number >> (width * (count - 1 - i))) & mask for i in range(count))
+
+
+def packed_size(length: int, layout: int, clues: int = 0) -> int:
+    cells = length * length
+    if layout == LAYOUT_FULL:
+        return (cells * cell_width(length) + 7) // 8
+    return (cells + 7) // 8 + (clues * digit_width(length) + 7) // 8
+
+
+def encode_cells(length: int, cells: bytes, layout: int = LAYOUT_FULL) -> bytes:
+    if layout == LAYOUT_FULL:
+        return pack_values(cells, cell_width(length))
+
+    bitmap = pack_values(bytes(1 if cell else 0 for cell in cells), 1)
+    digits = bytes(cell - 1 for cell in cells if cell)
+    return bitmap + pack_values(digits, digit_width(length))
+
+
+def decode_cells(length: int, payload: bytes, layout: int = LAYOUT_FULL) -> bytes:
+    count = length * length
+    if layout == LAYOUT_FULL:
+        return unpack_values(payload, count, cell_width(length))
+
+    bitmap_size = (count + 7) // 8
+    clues = unpack_values(payload[:bitmap_size], count, 1)
+    digits = iter(unpack_values(payload[bitmap_size:], sum(clues), digit_width(length)))
+    return bytes(next(digits) + 1 if clue else 0 for clue in clues)
+
+
+def encode_packed(length: int, cells: bytes, layout: int = LAYOUT_FULL) -> bytes:
+    return bytes((PACKED_MAGIC, PACKED_VERSION, length, layout)) + encode_cells(length, cells, layout)
+
+
+def is_packed(data: bytes) -> bool:
+    return len(data) >= PACKED_HEADER_SIZE and data[0] == PACKED_MAGIC and \
+        len(data) != 1 + PACKED_MAGIC ** 2
+
+
+def decode_packed(data: bytes) -> tuple[int, bytes]:
+    magic, version, length, layout = data[:PACKED_HEADER_SIZE]
+    if magic != PACKED_MAGIC or version != PACKED_VERSION or layout not in LAYOUTS.values():
+        raise ValueError(f"Unsupported packed board (version {version}, layout {layout})")
+    return length, decode_cells(length, data[PACKED_HEADER_SIZE:], layout)
@@ -0,0 +1,256 @@
+import math
+import mmap
+import os
+import struct
+from array import array
+from typing import Iterator, Optional
+
+from src.game.archive import ArchiveWriter, BoardArchive, is_archive
+from src.game.board import Board, SYMBOLS, EMPTY_SYMBOLS
+
+INDEX_SUFFIX = '.idx'
+INDEX_MAGIC = b'VSIX'
+INDEX_VERSION = 1
+_INDEX_HEADER = struct.Struct('<4sHQQQ')
+
+GRID_FORMATS = ('.sdk',)
+COMMENT_PREFIXES = (b'#', b'[')
+GRID_SEPARATORS = (b'-', b'=', b'+')
+PACKED_LENGTHS = (4, 9, 16, 25)
+
+_INVALID = 0xFF
+_COMPACT_TABLE = bytearray([_INVALID]) * 256
+for _value, _symbol in enumerate(SYMBOLS, start=1):
+    _COMPACT_TABLE[ord(_symbol)] = _value
+    _COMPACT_TABLE[ord(_symbol.lower())] = _value
+for _symbol in EMPTY_SYMBOLS:
+    _COMPACT_TABLE[ord(_symbol)] = 0
+_COMPACT_TABLE = bytes(_COMPACT_TABLE)
+
+
+def line_to_compact(token: bytes) -> bytes:
+    length = math.isqrt(len(token))
+    cells = token.translate(_COMPACT_TABLE)
+    if length * length != len(token) or length not in PACKED_LENGTHS or \
+            _INVALID in cells or max(cells) > length:
+        raise ValueError(f"Invalid puzzle {token[:40]!r}")
+    return bytes([length]) + cells
+
+
+class PuzzleCollection:
+    def __init__(self, filepath: str, fmt: Optional[str] = None):
+        self.filepath = filepath
+        self.fmt = fmt or ('sdk' if os.path.splitext(filepath)[1].lower() in GRID_FORMATS else 'line')
+
+        self._file = open(filepath, 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+        self._offsets: Optional[array] = None
+
+    def __enter__(self) -> 'PuzzleCollection':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if isinstance(self._mm, mmap.mmap):
+            self._mm.close()
+        self._file.close()
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def __getitem__(self, index: int) -> Board:
+        return Board.from_compact_bytes(self.record(index))
+
+    def __iter__(self) -> Iterator[Board]:
+        for record in self.records():
+            yield Board.from_compact_bytes(record)
+
+    def record(self, index: int) -> bytes:
+        offsets = self.offsets
+        if index < 0:
+            index += len(offsets)
+        if not 0 <= index < len(offsets):
+            raise IndexError('puzzle index out of range')
+        return self._parse_at(offsets[index])[0]
+
+    def records(self) -> Iterator[bytes]:
+        for offset in self._scan():
+            yield self._parse_at(offset)[0]
+
+    @property
+    def offsets(self) -> array:
+        if self._offsets is None:
+            self._offsets = self._load_index()
+            if self._offsets is None:
+                self._offsets = array('Q', self._scan())
+                self._save_index()
+        return self._offsets
+
+    def _scan(self) -> Iterator[int]:
+        mm = self._mm
+        end = len(mm)
+        pos = 0
+
+        while pos < end:
+            if self.fmt == 'sdk':
+                board_and_next = self._parse_at(pos, required=False)
+                if board_and_next[0] is not None:
+                    yield pos
+                pos = board_and_next[1]
+                continue
+
+            line_end = mm.find(b'\n', pos)
+            if line_end == -1:
+                line_end = end
+            line = mm[pos:line_end].strip()
+            if line and not line.startswith(COMMENT_PREFIXES):
+                yield pos
+            pos = line_end + 1
+
+    def _parse_at(self, offset: int, required: bool = True) -> tuple[Optional[bytes], int]:
+        mm = self._mm
+        end = len(mm)
+        pos = offset
+
+        if self.fmt != 'sdk':
+            line_end = mm.find(b'\n', pos)
+            if line_end == -1:
+                line_end = end
+            token = mm[pos:line_end].split(None, 1)[0]
+            return line_to_compact(token), line_end + 1
+
+        rows: list[bytes] = []
+        while pos < end:
+            line_end = mm.find(b'\n', pos)
+            if line_end == -1:
+                line_end = end
+            line = mm[pos:line_end].strip()
+            pos = line_end + 1
+
+            if not line or line.startswith(COMMENT_PREFIXES) or line.startswith(GRID_SEPARATORS):
+                continue
+
+            rows.append(line.replace(b' ', b'').replace(b'|', b''))
+            if len(rows) == len(rows[0]):
+                break
+
+        if not rows:
+            if required:
+                raise ValueError(f"{self.filepath}: no puzzle at offset {offset}")
+            return None, pos
+
+        return line_to_compact(b''.join(rows)), pos
+
+    def _index_path(self) -> str:
+        return self.filepath + INDEX_SUFFIX
+
+    def _source_signature(self) -> tuple[int, int]:
+        stat = os.stat(self.filepath)
+        return stat.st_size, stat.st_mtime_ns
+
+    def _load_index(self) -> Optional[array]:
+        try:
+            with open(self._index_path(), 'rb') as f:
+                header = f.read(_INDEX_HEADER.size)
+                if len(header) != _INDEX_HEADER.size:
+                    return None
+
+                magic, version, size, mtime_ns, count = _INDEX_HEADER.unpack(header)
+                if (magic, version) != (INDEX_MAGIC, INDEX_VERSION) or \
+                        (size, mtime_ns) != self._source_signature():
+                    return None
+
+                offsets = array('Q')
+                offsets.fromfile(f, count)
+                return offsets
+        except (OSError, EOFError):
+            return None
+
+    def _save_index(self):
+        size, mtime_ns = self._source_signature()
+        try:
+            with open(self._index_path(), 'wb') as f:
+                f.write(_INDEX_HEADER.pack(INDEX_MAGIC, INDEX_VERSION, size, mtime_ns, len(self._offsets)))
+                self._offsets.tofile(f)
+        except OSError:
+            pass
+
+
+class PackedCollection:
+    def __init__(self, filepath: str):
+        self.filepath = filepath
+        self._file = open(filepath, 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+
+        self.stride = 1 + self._mm[0] ** 2 if size else 1
+        if size % self.stride:
+            self.close()
+            raise ValueError(f"{filepath}: size is not a multiple of the {self.stride}-byte record")
+
+    def __enter__(self) -> 'PackedCollection':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if isinstance(self._mm, mmap.mmap):
+            self._mm.close()
+        self._file.close()
+
+    def __len__(self) -> int:
+        return len(self._mm) // self.stride
+
+    def record(self, index: int) -> bytes:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('puzzle index out of range')
+        start = index * self.stride
+        return self._mm[start:start + self.stride]
+
+    def __getitem__(self, index: int) -> Board:
+        return Board.from_compact_bytes(self.record(index))
+
+    def __iter__(self) -> Iterator[Board]:
+        for record in self.records():
+            yield Board.from_compact_bytes(record)
+
+    def records(self) -> Iterator[bytes]:
+        for start in range(0, len(self._mm), self.stride):
+            yield self._mm[start:start + self.stride]
+
+
+def pack_collection(source: str, destination: str, fmt: Optional[str] = None) -> int:
+    with PuzzleCollection(source, fmt) as collection:
+        records = collection.records()
+        first = next(records, None)
+        length = first[0] if first is not None else 9
+
+        with ArchiveWriter(destination, length) as archive:
+            if first is not None:
+                archive.write_cells(first[1:])
+            for record in records:
+                if record[0] != length:
+                    raise ValueError(f"{source}: puzzle #{archive.count} is {record[0]}x{record[0]}, "
+                                     f"expected {length}x{length}")
+                archive.write_cells(record[1:])
+
+            return archive.count
+
+
+def open_collection(filepath: str):
+    if is_archive(filepath):
+        return BoardArchive(filepath)
+
+    with open(filepath, 'rb') as f:
+        head = f.read(1)
+        size = os.fstat(f.fileno()).st_size
+
+    if head and head[0] in PACKED_LENGTHS and size % (1 + head[0] ** 2) == 0:
+        return PackedCollection(filepath)
+    return PuzzleCollection(filepath)
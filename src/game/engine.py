@@ -0,0 +1,183 @@
+import time
+from functools import lru_cache
+from typing import Iterator, Optional
+
+from src.game.board import Board
+from src.game.logic import unit_geometry
+from src.game.model import SearchStats
+
+
+@lru_cache(maxsize=None)
+def cell_units(length: int) -> tuple[tuple[int, ...], tuple[int, ...], tuple[int, ...]]:
+    size = int(length ** 0.5)
+    cells = range(length * length)
+    return (tuple(i // length for i in cells),
+            tuple(i % length for i in cells),
+            tuple((i // length // size) * size + i % length // size for i in cells))
+
+
+class BitmaskSearch:
+    def __init__(self, length: int, cells: bytes, budget: Optional[int] = None,
+                 stats: Optional[SearchStats] = None):
+        self.length = length
+        self.cells = bytearray(cells)
+        self.budget = budget
+        self.stats = stats if stats is not None else SearchStats()
+
+        self.full = (1 << length) - 1
+        self.row_of, self.col_of, self.box_of = cell_units(length)
+        self.units = unit_geometry(length)[0]
+        self.rows = [0] * length
+        self.cols = [0] * length
+        self.boxes = [0] * length
+        self.excluded: dict[int, int] = {}
+        self.empty: list[int] = []
+        self.consistent = True
+
+        for index, value in enumerate(self.cells):
+            if not value:
+                self.empty.append(index)
+                continue
+            bit = 1 << (value - 1)
+            r, c, b = self.row_of[index], self.col_of[index], self.box_of[index]
+            if (self.rows[r] | self.cols[c] | self.boxes[b]) & bit:
+                self.consistent = False
+            self.rows[r] |= bit
+            self.cols[c] |= bit
+            self.boxes[b] |= bit
+
+    @classmethod
+    def from_board(cls, board: Board, budget: Optional[int] = None,
+                   stats: Optional[SearchStats] = None) -> 'BitmaskSearch':
+        return cls(board.length, board.to_compact_bytes()[1:], budget, stats)
+
+    def cancel(self):
+        # safe from another thread: the search stops at its next node as if out of budget
+        self.budget = 0
+
+    def exclude(self, index: int, value: int):
+        self.excluded[index] = self.excluded.get(index, 0) | 1 << (value - 1)
+
+    def solutions(self) -> Iterator[bytes]:
+        if not self.consistent:
+            return
+        start = time.perf_counter()
+        try:
+            yield from self._search(0)
+        finally:
+            self.stats.elapsed += time.perf_counter() - start
+
+    def _search(self, depth: int) -> Iterator[bytes]:
+        empty = self.empty
+        if depth == len(empty):
+            self.stats.solutions += 1
+            yield bytes(self.cells)
+            return
+
+        stats = self.stats
+        if depth > stats.max_depth:
+            stats.max_depth = depth
+
+        rows, cols, boxes = self.rows, self.cols, self.boxes
+        row_of, col_of, box_of = self.row_of, self.col_of, self.box_of
+        excluded = self.excluded
+        full = self.full
+
+        best = depth
+        best_mask = 0
+        best_count = self.length + 1
+        for k in range(depth, len(empty)):
+            index = empty[k]
+            mask = full & ~(rows[row_of[index]] | cols[col_of[index]] | boxes[box_of[index]])
+            if excluded:
+                mask &= ~excluded.get(index, 0)
+            count = mask.bit_count()
+            if count < best_count:
+                best, best_mask, best_count = k, mask, count
+                if count <= 1:
+                    break
+        stats.placements += k - depth + 1
+
+        if best_count > 1:
+            # a digit with a single place left in some unit (a hidden single)
+            # beats branching on the cell, and a digit with no place is a dead end
+            forced = self._hidden_single()
+            if forced is None:
+                stats.backtracks += 1
+                return
+            if forced:
+                index, best_mask = forced
+                best = empty.index(index, depth)
+                best_count = 1
+
+        if best_count == 0:
+            stats.backtracks += 1
+            return
+        if best_count == 1:
+            stats.propagations += 1
+
+        empty[depth], empty[best] = empty[best], empty[depth]
+        index = empty[depth]
+        r, c, b = row_of[index], col_of[index], box_of[index]
+
+        mask = best_mask
+        while mask:
+            if self.budget is not None and stats.nodes >= self.budget:
+                stats.exhausted = True
+                return
+
+            bit = mask & -mask
+            mask ^= bit
+            stats.nodes += 1
+
+            rows[r] |= bit
+            cols[c] |= bit
+            boxes[b] |= bit
+            self.cells[index] = bit.bit_length()
+
+            yield from self._search(depth + 1)
+
+            rows[r] ^= bit
+            cols[c] ^= bit
+            boxes[b] ^= bit
+            self.cells[index] = 0
+
+            if stats.exhausted:
+                return
+
+        stats.backtracks += 1
+
+
+    def _hidden_single(self) -> Optional[tuple[int, int]]:
+        cells = self.cells
+        full = self.full
+        excluded = self.excluded
+        row_of, col_of, box_of = self.row_of, self.col_of, self.box_of
+        rows, cols, boxes = self.rows, self.cols, self.boxes
+
+        for unit, placed in zip(self.units, (*rows, *cols, *boxes)):
+            once = 0
+            more = 0
+            for index in unit:
+                if cells[index]:
+                    continue
+                mask = full & ~(rows[row_of[index]] | cols[col_of[index]] | boxes[box_of[index]])
+                if excluded:
+                    mask &= ~excluded.get(index, 0)
+                more |= once & mask
+                once |= mask
+
+            needed = full & ~placed
+            if needed & ~once:
+                return None
+
+            singles = needed & ~more
+            if singles:
+                bit = singles & -singles
+                for index in unit:
+                    if not cells[index] and \
+                            full & ~(rows[row_of[index]] | cols[col_of[index]] | boxes[box_of[index]]) & bit and \
+                            not excluded.get(index, 0) & bit:
+                        return index, bit
+
+        return ()
@@ -1,104 +1,446 @@
+import math
 import random
-
-from src.consts import Difficulty
+import statistics
+import time
+import zlib
+from collections import Counter
+from concurrent.futures import Executor
+from typing import Optional
+
+from src.consts import Difficulty, Symmetry, Technique
 from src.game.board import Board
-from src.game.model import DifficultyScore
-from src.game.solver import is_valid_placement
-from src.game.utils import get_valid_numbers, find_empty_cell_smart, find_empty_cell
-
+from src.game.backends import get_backend
+from src.game.logic import candidate_masks, logical_trace
+from src.game.model import DifficultyScore, SearchStats
 
-def generate_puzzle(difficulty: Difficulty = Difficulty.MEDIUM) -> Board:
-    board = Board()
-    _generate_solved_board_random(board)
 
 # todo: hacerlo dinamico
-    removal_targets = {
-        Difficulty.EASY: 34,
-        Difficulty.MEDIUM: 45,
-        Difficulty.HARD: 52,
-        Difficulty.EXPERT: 58
-    }
+REMOVAL_TARGETS = {
+    Difficulty.EASY: 34,
+    Difficulty.MEDIUM: 45,
+    Difficulty.HARD: 52,
+    Difficulty.EXPERT: 58
+}
+
+# larger boards need proportionally more clues before uniqueness gets expensive
+REMOVAL_FRACTIONS = {
+    Difficulty.EASY: 0.40,
+    Difficulty.MEDIUM: 0.46,
+    Difficulty.HARD: 0.52,
+    Difficulty.EXPERT: 0.56
+}
+
+SYMMETRIC_TIME_BUDGET = 2.0
+# seconds spent on fresh grids when a puzzle lands outside the requested band
+BAND_TIME_BUDGET = 3.0
+IMPROVE_ATTEMPTS = 40
+GRID_SEARCH_BUDGET = 100_000
+# search nodes per uniqueness check; a clue whose removal can't be proven safe
+# within the budget is kept, so the puzzle stays unique either way
+UNIQUENESS_BUDGET = {9: None, 16: 20_000, 25: 2_000}
+# seconds spent removing clues before settling for the puzzle reached so far
+REMOVAL_TIME_BUDGET = {9: None, 16: 3.0, 25: 5.0}
+
+
+def removal_target(difficulty: Difficulty, length: int = 9) -> int:
+    if length == 9:
+        return REMOVAL_TARGETS[difficulty]
+    return round(REMOVAL_FRACTIONS[difficulty] * length * length)
+
+
+def generate_puzzle(difficulty: Difficulty = Difficulty.MEDIUM, length: int = 9,
+                    stats: Optional[SearchStats] = None) -> Board:
+    band_deadline = time.monotonic() + BAND_TIME_BUDGET
+    best, best_distance = None, None
+
+    while True:
+        solution = _random_solution(length, stats)
+        cells = bytearray(solution)
+        orbits = symmetry_orbits(length)
+        random.shuffle(orbits)
+
+        time_budget = REMOVAL_TIME_BUDGET.get(length)
+        deadline = time.monotonic() + time_budget if time_budget is not None else None
+
+        _remove_clues(length, cells, solution, orbits, removal_target(difficulty, length), deadline=deadline,
+                      stats=stats)
+        distance = _band_distance(_fit_band(length, cells, solution, orbits, difficulty, deadline, stats), difficulty)
+
+        if best is None or distance < best_distance:
+            best, best_distance = cells, distance
+        if distance == 0 or time.monotonic() >= band_deadline:
+            return Board.from_compact_bytes(bytes((length,)) + bytes(best))
+
+
+def generate_puzzle_symmetric(difficulty: Difficulty = Difficulty.MEDIUM,
+                              symmetry: Symmetry = Symmetry.ROTATIONAL,
+                              time_budget: float = SYMMETRIC_TIME_BUDGET, length: int = 9,
+                              stats: Optional[SearchStats] = None) -> Board:
+    orbits = symmetry_orbits(length, symmetry)
+    # whole orbits are removed at once, so the last one may overshoot the target
+    target = removal_target(difficulty, length)
+    deadline = time.monotonic() + time_budget
+    best, best_rank = None, None
+
+    while True:
+        solution = _random_solution(length, stats)
+        cells = bytearray(solution)
+
+        _shuffle_orbits(orbits)
+        removed = _remove_clues(length, cells, solution, orbits, target, deadline=deadline, stats=stats)
+        cells, removed = _improve_removal(length, cells, solution, orbits, target, removed, deadline, stats)
+        band = _fit_band(length, cells, solution, orbits, difficulty, deadline, stats)
+        removed = cells.count(0)
+
+        # a grid short of the target loses to one that reaches it, whatever its band
+        rank = (removed < target, _band_distance(band, difficulty), -removed)
+        if best is None or rank < best_rank:
+            best, best_rank = cells, rank
+        if rank[:2] == (False, 0) or time.monotonic() >= deadline:
+            return Board.from_compact_bytes(bytes((length,)) + bytes(best))
+
+
+def _remove_clues(length: int, cells: bytearray, solution: bytes, orbits: list[tuple[int, ...]],
+                  target: int, removed: int = 0, deadline: Optional[float] = None,
+                  stats: Optional[SearchStats] = None) -> int:
+    for orbit in orbits:
+        if removed >= target or (deadline is not None and time.monotonic() >= deadline):
+            break
+        if not cells[orbit[0]]:
+            continue
 
-    cells_to_remove = removal_targets.get(difficulty)
+        for index in orbit:
+            cells[index] = 0
+        if _has_other_solution(length, cells, solution, orbit, stats):
+            for index in orbit:
+                cells[index] = solution[index]
+        else:
+            removed += len(orbit)
 
-    removed = 0
-    all_cells = [(i, j) for i in range(board.length) for j in range(board.length)]
-    random.shuffle(all_cells)
+    return removed
 
-    for row, col in all_cells:
-        if removed >= cells_to_remove:
-            break
 
-        backup = board.get_cell(row, col)
-        board.set_cell(row, col, None)
+def _fit_band(length: int, cells: bytearray, solution: bytes, orbits: list[tuple[int, ...]],
+              difficulty: Difficulty, deadline: Optional[float] = None,
+              stats: Optional[SearchStats] = None) -> Difficulty:
+    # the removal target is only a starting point: clues keep coming off while the
+    # techniques the puzzle needs stay below the requested band, and go back on
+    # while they are above it
+    band = _score_cells(length, cells).difficulty
+    for orbit in orbits:
+        if _band_rank(band) >= _band_rank(difficulty) or (deadline is not None and time.monotonic() >= deadline):
+            break
+        if not cells[orbit[0]]:
+            continue
 
-        if _count_solutions(board, limit=2) == 1:
-            removed += 1
+        for index in orbit:
+            cells[index] = 0
+        if _has_other_solution(length, cells, solution, orbit, stats):
+            for index in orbit:
+                cells[index] = solution[index]
         else:
-            board.set_cell(row, col, backup)
+            band = _score_cells(length, cells).difficulty
 
-    return board
+    removed = [orbit for orbit in orbits if not cells[orbit[0]]]
+    random.shuffle(removed)
+    for orbit in removed:
+        if _band_rank(band) <= _band_rank(difficulty):
+            break
+        for index in orbit:
+            cells[index] = solution[index]
+        band = _score_cells(length, cells).difficulty
 
+    return band
 
-def generate_puzzle_symmetric(difficulty: Difficulty = Difficulty.MEDIUM) -> Board:
-    board = Board()
-    _generate_solved_board_random(board)
 
-    removal_targets = {
-        Difficulty.EASY: 1,
-        Difficulty.MEDIUM: 44,
-        Difficulty.HARD: 52,
-        Difficulty.EXPERT: 58
-    }
+def _score_cells(length: int, cells: bytearray) -> DifficultyScore:
+    return _score_once(Board.from_compact_bytes(bytes((length,)) + bytes(cells)))
 
-    target = removal_targets.get(difficulty)
 
-    removed = 0
-    attempts = 0
-    max_attempts = target * 3
+def _shuffle_orbits(orbits: list[tuple[int, ...]]):
+    # the largest orbits go first so the smaller ones are left to fill the
+    # remainder once the count gets close to the target
+    random.shuffle(orbits)
+    orbits.sort(key=len, reverse=True)
 
-    while removed < target and attempts < max_attempts:
-        attempts += 1
 
-        row = random.randint(0, board.length - 1)
-        col = random.randint(0, board.length - 1)
+def _improve_removal(length: int, cells: bytearray, solution: bytes, orbits: list[tuple[int, ...]],
+                     target: int, removed: int, deadline: float,
+                     stats: Optional[SearchStats] = None) -> tuple[bytearray, int]:
+    # put one removed orbit back and strip clues again in a new order; a grid
+    # that stops improving is dropped so the caller can start over
+    misses = 0
+    while removed < target and misses < IMPROVE_ATTEMPTS and time.monotonic() < deadline:
+        removable = [orbit for orbit in orbits if not cells[orbit[0]]]
+        if not removable:
+            break
 
-        if board.is_empty(row, col):
+        trial = bytearray(cells)
+        orbit = random.choice(removable)
+        for index in orbit:
+            trial[index] = solution[index]
+
+        _shuffle_orbits(orbits)
+        trial_removed = _remove_clues(length, trial, solution, orbits, target, removed - len(orbit),
+                                      deadline=deadline, stats=stats)
+        misses = 0 if trial_removed > removed else misses + 1
+        if trial_removed >= removed:
+            cells, removed = trial, trial_removed
+
+    return cells, removed
+
+
+_SYMMETRY_GENERATORS = {
+    Symmetry.NONE: (),
+    Symmetry.ROTATIONAL: (lambda r, c, last: (last - r, last - c),),
+    Symmetry.QUARTER_TURN: (lambda r, c, last: (c, last - r),),
+    Symmetry.DIAGONAL: (lambda r, c, last: (c, r),),
+    Symmetry.ANTI_DIAGONAL: (lambda r, c, last: (last - c, last - r),),
+    Symmetry.HORIZONTAL: (lambda r, c, last: (r, last - c),),
+    Symmetry.VERTICAL: (lambda r, c, last: (last - r, c),),
+    Symmetry.DIHEDRAL: (lambda r, c, last: (c, last - r), lambda r, c, last: (c, r)),
+}
+
+
+def symmetry_orbits(length: int, symmetry: Optional[Symmetry] = None) -> list[tuple[int, ...]]:
+    generators = _SYMMETRY_GENERATORS[symmetry or Symmetry.NONE]
+    last = length - 1
+    seen = set()
+    orbits = []
+
+    for row in range(length):
+        for col in range(length):
+            if (row, col) in seen:
+                continue
+
+            orbit = {(row, col)}
+            frontier = [(row, col)]
+            while frontier:
+                r, c = frontier.pop()
+                for transform in generators:
+                    image = transform(r, c, last)
+                    if image not in orbit:
+                        orbit.add(image)
+                        frontier.append(image)
+
+            seen.update(orbit)
+            orbits.append(tuple(sorted(r * length + c for r, c in orbit)))
+
+    return orbits
+
+
+def minimize(board: Board, symmetry: Optional[Symmetry] = None, stats: Optional[SearchStats] = None) -> Board:
+    length = board.length
+    cells = bytearray(board.to_compact_bytes()[1:])
+
+    solutions = get_backend(length).iter_solutions(length, bytes(cells), stats=stats)
+    solution = next(solutions, None)
+    if solution is None or next(solutions, None) is not None:
+        raise ValueError("Only puzzles with a unique solution can be minimized")
+
+    # a clue that is needed now stays needed as more clues are removed,
+    # so a single pass over the orbits leaves a minimal puzzle
+    for orbit in symmetry_orbits(length, symmetry):
+        clues = [index for index in orbit if cells[index]]
+        if not clues:
             continue
 
-        sym_row = board.length - 1 - row
-        sym_col = board.length - 1 - col
-
-        backup1 = board.get_cell(row, col)
-        backup2 = board.get_cell(sym_row, sym_col)
-
-        board.set_cell(row, col, None)
+        for index in clues:
+            cells[index] = 0
+        if _has_other_solution(length, cells, solution, clues, stats):
+            for index in clues:
+                cells[index] = solution[index]
+
+    return Board.from_compact_bytes(bytes((length,)) + bytes(cells))
+
+
+def _has_other_solution(length: int, cells: bytearray, solution: bytes, freed: list[int],
+                        stats: Optional[SearchStats] = None) -> bool:
+    # any other solution has to differ from the known one in a freed cell;
+    # each search keeps its own stats because the node budget is per search
+    backend = get_backend(length)
+    for index in freed:
+        search_stats = SearchStats()
+        solutions = backend.iter_solutions(length, bytes(cells), UNIQUENESS_BUDGET.get(length), search_stats,
+                                           exclude={index: solution[index]})
+        found = next(solutions, None) is not None or search_stats.exhausted
+        if stats is not None:
+            stats.merge(search_stats)
+        if found:
+            return True
+    return False
 
-        if row == sym_row and col == sym_col:
-            if _count_solutions(board, limit=2) == 1:
-                removed += 1
-            else:
-                board.set_cell(row, col, backup1)
-        else:
-            board.set_cell(sym_row, sym_col, None)
 
-            if _count_solutions(board, limit=2) == 1:
-                removed += 2
-            else:
-                board.set_cell(row, col, backup1)
-                board.set_cell(sym_row, sym_col, backup2)
+def _random_solution(length: int, stats: Optional[SearchStats] = None) -> bytes:
+    size = int(length ** 0.5)
+
+    # the diagonal boxes don't constrain each other, so they can be filled at
+    # random and the engine completes the rest
+    while True:
+        cells = bytearray(length * length)
+        for box in range(size):
+            values = iter(random.sample(range(1, length + 1), length))
+            for row in range(box * size, (box + 1) * size):
+                for col in range(box * size, (box + 1) * size):
+                    cells[row * length + col] = next(values)
+
+        search_stats = SearchStats()
+        solution = next(get_backend(length).iter_solutions(length, bytes(cells), GRID_SEARCH_BUDGET, search_stats),
+                        None)
+        if stats is not None:
+            stats.merge(search_stats)
+        if solution is not None:
+            return solution
+
+
+# points per deduction, in hundredths of a backtrack; the empty cells add one
+# point each, which is never enough to leave the easy band on its own
+TECHNIQUE_WEIGHTS = {
+    Technique.NAKED_SINGLE: 0,
+    Technique.HIDDEN_SINGLE: 15,
+    Technique.POINTING: 75,
+    Technique.BOX_LINE: 75,
+    Technique.NAKED_PAIR: 100,
+    Technique.NAKED_TRIPLE: 150,
+    Technique.X_WING: 250,
+}
+BACKTRACK_WEIGHT = 100
+# scores are scaled to this many cells, so larger boards share the 9x9 bands
+REFERENCE_CELLS = 81
+
+# puzzles the technique set cannot finish are scored at least this high
+UNSOLVED_LOGIC_SCORE = 600
+# upper score limit of each band; anything above the last one is expert
+DIFFICULTY_BANDS = ((100, Difficulty.EASY), (300, Difficulty.MEDIUM), (600, Difficulty.HARD))
+BAND_ORDER = (Difficulty.EASY, Difficulty.MEDIUM, Difficulty.HARD, Difficulty.EXPERT)
+
+# randomized scoring runs this many searches at a time and stops once the 95%
+# interval of the mean sits inside one band and within SCORE_TOLERANCE of it;
+# fewer than SCORING_MIN_RUNS samples only settle if they all agree
+SCORING_BATCH = 4
+SCORING_MIN_RUNS = 8
+SCORE_CONFIDENCE_Z = 1.96
+SCORE_TOLERANCE = 0.1
+
+
+def difficulty_band(total_score: float) -> Difficulty:
+    for limit, difficulty in DIFFICULTY_BANDS:
+        if total_score < limit:
+            return difficulty
+    return Difficulty.EXPERT
+
+
+def _band_rank(difficulty: Difficulty) -> int:
+    return BAND_ORDER.index(difficulty) if difficulty in BAND_ORDER else len(BAND_ORDER)
+
+
+def _band_distance(band: Difficulty, difficulty: Difficulty) -> int:
+    return abs(_band_rank(band) - _band_rank(difficulty))
+
+
+def calculate_difficulty_score(board: Board, stats: Optional[SearchStats] = None, runs: int = 1,
+                               executor: Optional[Executor] = None, workers: int = SCORING_BATCH) -> DifficultyScore:
+    if runs <= 1:
+        return _score_once(board, stats)
+
+    # every run scores a relabelled, reshuffled copy, so the result does not depend
+    # on the order the solver happens to try values and cells in
+    record = board.to_compact_bytes()
+    seed = zlib.crc32(record)
+    scores: list[DifficultyScore] = []
+    # an executor gets a run per worker each round, so none of them sits idle
+    batch = max(SCORING_BATCH, workers) if executor is not None else SCORING_BATCH
+
+    while len(scores) < runs:
+        tasks = [(record, seed + i) for i in range(len(scores), min(runs, len(scores) + batch))]
+        for score, run_stats in (executor.map if executor is not None else map)(_randomized_score, tasks):
+            if stats is not None:
+                stats.merge(run_stats)
+            if score.difficulty == Difficulty.INHUMAN:
+                return score
+            scores.append(score)
+
+        if _band_settled([score.total_score for score in scores]):
+            break
 
-    return board
+    totals = [score.total_score for score in scores]
+    mean = round(statistics.fmean(totals))
+    median = sorted(scores, key=lambda score: score.total_score)[len(scores) // 2]
+    return DifficultyScore(
+        branch_score=round(statistics.fmean(score.branch_score for score in scores)),
+        total_score=mean,
+        steps=round(statistics.fmean(score.steps for score in scores)),
+        max_candidates=median.max_candidates,
+        empty_cells=median.empty_cells,
+        difficulty=difficulty_band(mean),
+        techniques=median.techniques,
+        score_variance=statistics.variance(totals),
+        runs=len(scores)
+    )
 
 
-def calculate_difficulty_score(board: Board) -> DifficultyScore:
-    branch_score_result = [0]
-    steps_result = [0]
-    max_candidates_result = [0]
+def _band_settled(totals: list[float]) -> bool:
+    if len(totals) < SCORING_BATCH:
+        return False
+    if len(set(totals)) == 1:
+        return True
+    if len(totals) < SCORING_MIN_RUNS:
+        return False
+
+    mean = statistics.fmean(totals)
+    margin = SCORE_CONFIDENCE_Z * math.sqrt(statistics.variance(totals) / len(totals))
+    return difficulty_band(mean - margin) == difficulty_band(mean + margin) and margin <= SCORE_TOLERANCE * mean
+
+
+def _randomized_score(task: tuple[bytes, int]) -> tuple[DifficultyScore, SearchStats]:
+    record, seed = task
+    stats = SearchStats()
+    board = _isomorphic_copy(Board.from_compact_bytes(record), random.Random(seed))
+    return _score_once(board, stats), stats
+
+
+def _isomorphic_copy(board: Board, rng: random.Random) -> Board:
+    # relabelled symbols, shuffled bands, stacks, rows and columns and an optional
+    # transpose give an equivalent puzzle whose cells and values come in another order
+    length = board.length
+    size = board.chunk_size
+    rows = [band * size + offset for band in rng.sample(range(size), size)
+            for offset in rng.sample(range(size), size)]
+    cols = [stack * size + offset for stack in rng.sample(range(size), size)
+            for offset in rng.sample(range(size), size)]
+    labels = [0, *rng.sample(range(1, length + 1), length)]
+    transpose = rng.random() < 0.5
+
+    source = board.to_compact_bytes()
+    cells = bytearray(length * length)
+    for row in range(length):
+        for col in range(length):
+            index = rows[col] * length + cols[row] if transpose else rows[row] * length + cols[col]
+            cells[row * length + col] = labels[source[1 + index]]
+    return Board.from_compact_bytes(bytes((length,)) + bytes(cells))
+
+
+def _score_once(board: Board, stats: Optional[SearchStats] = None) -> DifficultyScore:
     empty_count = len(board.empty_cells)
-
-    board_copy = board.copy()
-    success = _solve_with_scoring(board_copy, branch_score_result, steps_result, max_candidates_result)
+    trace, remaining = logical_trace(board)
+    if stats is not None:
+        stats.propagations += len(trace)
+    techniques = Counter(deduction.technique for deduction in trace)
+
+    branch_score = sum(TECHNIQUE_WEIGHTS[deduction.technique] for deduction in trace)
+    steps = len(trace)
+    max_candidates = max((mask.bit_count() for mask in candidate_masks(board)), default=0)
+
+    # only the part the techniques could not finish is searched
+    solved_logically = remaining.is_solved
+    success = solved_logically
+    if not solved_logically and not remaining.is_full:
+        search_stats = SearchStats()
+        success = get_backend(remaining.length).solve(remaining, search_stats) is not None
+        branch_score += search_stats.backtracks * BACKTRACK_WEIGHT
+        steps += search_stats.nodes
+        if stats is not None:
+            stats.merge(search_stats)
 
     if not success:
         return DifficultyScore(
@@ -110,106 +452,21 @@ def calculate_difficulty_score(board: Board) -> DifficultyScore:
             difficulty=Difficulty.INHUMAN
         )
 
-    branch_score = branch_score_result[0]
-    total_score = branch_score * 100 + empty_count
-
-    if total_score < 100:
-        difficulty_label = Difficulty.EASY
-    elif total_score < 300:
-        difficulty_label = Difficulty.MEDIUM
-    elif total_score < 600:
-        difficulty_label = Difficulty.HARD
-    else:
-        difficulty_label = Difficulty.EXPERT
+    total_score = round((branch_score + empty_count) * REFERENCE_CELLS / (board.length * board.length))
+    if not solved_logically:
+        total_score = max(total_score, UNSOLVED_LOGIC_SCORE)
 
     return DifficultyScore(
         branch_score=branch_score,
         total_score=total_score,
-        steps=steps_result[0],
-        max_candidates=max_candidates_result[0],
+        steps=steps,
+        max_candidates=max_candidates,
         empty_cells=empty_count,
-        difficulty=difficulty_label
+        difficulty=difficulty_band(total_score),
+        techniques=dict(techniques)
     )
 
 
-def _generate_solved_board_random(board: Board) -> bool:
-    empty_cell = find_empty_cell(board)
-
-    if empty_cell is None:
-        return True
-
-    row, col = empty_cell
-
-    numbers = list(range(1, board.length + 1))
-    random.shuffle(numbers)
-
-    for num in numbers:
-        if is_valid_placement(board, row, col, num):
-            board.set_cell(row, col, num)
-
-            if _generate_solved_board_random(board):
-                return True
-
-            board.set_cell(row, col, None)
-
-    return False
-
-
-def _count_solutions(board: Board, limit: int = 2) -> int:
-    count = [0]
-
-    def solve_count(b: Board):
-        if count[0] >= limit:
-            return
-
-        empty = find_empty_cell(b)
-        if empty is None:
-            count[0] += 1
-            return
-
-        row, col = empty
-        for num in range(1, b.length + 1):
-            if is_valid_placement(b, row, col, num):
-                b.set_cell(row, col, num)
-                solve_count(b)
-                b.set_cell(row, col, None)
-
-                if count[0] >= limit:
-                    return
-
-    board_copy = board.copy()
-    solve_count(board_copy)
-    return count[0]
-
-
-def _solve_with_scoring(board: Board, branch_score: list, steps: list, max_candidates: list) -> bool:
-    empty = find_empty_cell_smart(board)
-
-    if empty is None:
-        return True
-
-    row, col = empty
-    valid_nums = get_valid_numbers(board, row, col)
-
-    steps[0] += 1
-
-    num_candidates = len(valid_nums)
-    if num_candidates > max_candidates[0]:
-        max_candidates[0] = num_candidates
-
-    if num_candidates > 1:
-        branch_score[0] += (num_candidates - 1) ** 2
-
-    for num in valid_nums:
-        board.set_cell(row, col, num)
-
-        if _solve_with_scoring(board, branch_score, steps, max_candidates):
-            return True
-
-        board.set_cell(row, col, None)
-
-    return False
-
 # #%%
 # puzzle_easy = generate_puzzle(Difficulty.EASY)
 # puzzle_medium = generate_puzzle(Difficulty.MEDIUM)
@@ -0,0 +1,212 @@
+import hashlib
+import operator
+import os
+import sqlite3
+from datetime import datetime
+from functools import lru_cache
+from itertools import islice
+from typing import Iterable, Iterator, Optional
+
+from src.consts import Difficulty
+from src.game.board import Board
+from src.game.model import DifficultyScore, LibraryPuzzle
+
+BATCH_SIZE = 10_000
+_LABELS = bytes(range(26))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS puzzles (
+    id INTEGER PRIMARY KEY,
+    puzzle BLOB NOT NULL,
+    solution BLOB,
+    canonical_hash BLOB NOT NULL UNIQUE,
+    length INTEGER NOT NULL,
+    empty_cells INTEGER NOT NULL,
+    difficulty TEXT,
+    total_score REAL,
+    branch_score REAL,
+    steps INTEGER,
+    max_candidates INTEGER,
+    times_played INTEGER NOT NULL DEFAULT 0,
+    times_won INTEGER NOT NULL DEFAULT 0,
+    best_seconds REAL,
+    last_played TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_puzzles_band ON puzzles (length, difficulty, times_played);
+CREATE INDEX IF NOT EXISTS idx_puzzles_score ON puzzles (total_score);
+CREATE INDEX IF NOT EXISTS idx_puzzles_empty ON puzzles (empty_cells);
+"""
+
+_COLUMNS = ("id, puzzle, solution, difficulty, total_score, branch_score, steps, max_candidates, "
+            "empty_cells, times_played, times_won")
+
+
+@lru_cache(maxsize=None)
+def _symmetry_getters(length: int) -> tuple[operator.itemgetter, ...]:
+    last = length - 1
+    transforms = (
+        lambda r, c: (r, c), lambda r, c: (c, r),
+        lambda r, c: (last - r, c), lambda r, c: (r, last - c),
+        lambda r, c: (last - r, last - c), lambda r, c: (c, last - r),
+        lambda r, c: (last - c, r), lambda r, c: (last - c, last - r),
+    )
+    cells = [(r, c) for r in range(length) for c in range(length)]
+    # index 0 always picks a zero byte so every form starts with the empty label
+    return tuple(operator.itemgetter(0, *[1 + a * length + b for a, b in (t(r, c) for r, c in cells)])
+                 for t in transforms)
+
+
+def canonical_hash(compact: bytes) -> bytes:
+    cells = b'\0' + compact[1:]
+    forms = []
+
+    for getter in _symmetry_getters(compact[0]):
+        form = bytes(getter(cells))
+        order = bytes(dict.fromkeys(form))
+        forms.append(form.translate(bytes.maketrans(order, _LABELS[:len(order)])))
+
+    return hashlib.blake2b(min(forms), digest_size=16).digest()
+
+
+class PuzzleLibrary:
+    def __init__(self, filepath: str):
+        self.filepath = filepath
+        directory = os.path.dirname(filepath)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(filepath)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(SCHEMA)
+
+    def __enter__(self) -> 'PuzzleLibrary':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._conn.close()
+
+    def __len__(self) -> int:
+        return self._conn.execute('SELECT COUNT(*) FROM puzzles').fetchone()[0]
+
+    def add(self, puzzle: Board, solution: Optional[Board] = None,
+            score: Optional[DifficultyScore] = None) -> Optional[int]:
+        row = library_row((puzzle.to_compact_bytes(), solution.to_compact_bytes() if solution else None, score))
+        with self._conn:
+            cursor = self._conn.execute(_INSERT, row)
+        return cursor.lastrowid if cursor.rowcount else None
+
+    def add_many(self, entries: Iterable[tuple[bytes, Optional[bytes], Optional[DifficultyScore]]],
+                 batch_size: int = BATCH_SIZE) -> int:
+        return self.add_rows(map(library_row, entries), batch_size)
+
+    def add_rows(self, rows: Iterable[tuple], batch_size: int = BATCH_SIZE) -> int:
+        inserted = 0
+        rows = iter(rows)
+
+        while batch := list(islice(rows, batch_size)):
+            with self._conn:
+                before = self._conn.total_changes
+                self._conn.executemany(_INSERT, batch)
+                inserted += self._conn.total_changes - before
+
+        return inserted
+
+    def pick_unplayed(self, difficulty: Difficulty, length: int = 9) -> Optional[LibraryPuzzle]:
+        row = self._conn.execute(
+            f"SELECT {_COLUMNS} FROM puzzles "
+            "WHERE length = ? AND difficulty = ? AND times_played = 0 LIMIT 1",
+            (length, difficulty.value)
+        ).fetchone()
+        return _entry(row) if row else None
+
+    def query(self, difficulty: Optional[Difficulty] = None, min_score: Optional[float] = None,
+              max_score: Optional[float] = None, max_empty: Optional[int] = None,
+              limit: int = 100) -> Iterator[LibraryPuzzle]:
+        clauses, params = [], []
+        if difficulty is not None:
+            clauses.append('difficulty = ?')
+            params.append(difficulty.value)
+        if min_score is not None:
+            clauses.append('total_score >= ?')
+            params.append(min_score)
+        if max_score is not None:
+            clauses.append('total_score <= ?')
+            params.append(max_score)
+        if max_empty is not None:
+            clauses.append('empty_cells <= ?')
+            params.append(max_empty)
+
+        where = f"WHERE {' AND '.join(clauses)} " if clauses else ''
+        for row in self._conn.execute(f"SELECT {_COLUMNS} FROM puzzles {where}LIMIT ?", (*params, limit)):
+            yield _entry(row)
+
+    def record_started(self, puzzle_id: int):
+        with self._conn:
+            self._conn.execute(
+                "UPDATE puzzles SET times_played = times_played + 1, last_played = ? WHERE id = ?",
+                (datetime.now().isoformat(timespec='seconds'), puzzle_id)
+            )
+
+    def record_won(self, puzzle_id: int, seconds: float):
+        with self._conn:
+            self._conn.execute(
+                "UPDATE puzzles SET times_won = times_won + 1, "
+                "best_seconds = MIN(COALESCE(best_seconds, ?), ?) WHERE id = ?",
+                (seconds, seconds, puzzle_id)
+            )
+
+
+_INSERT = ("INSERT OR IGNORE INTO puzzles (puzzle, solution, canonical_hash, length, empty_cells, "
+           "difficulty, total_score, branch_score, steps, max_candidates) "
+           "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)")
+
+
+def library_row(entry: tuple[bytes, Optional[bytes], Optional[DifficultyScore]]) -> tuple:
+    compact, solution, score = entry
+    empty_cells = compact.count(0, 1)
+
+    if score is None:
+        return (compact, solution, canonical_hash(compact), compact[0], empty_cells,
+                None, None, None, None, None)
+
+    return (compact, solution, canonical_hash(compact), compact[0], empty_cells,
+            score.difficulty.value, score.total_score, score.branch_score, score.steps,
+            score.max_candidates)
+
+
+def _entry(row: tuple) -> LibraryPuzzle:
+    (puzzle_id, puzzle, solution, difficulty, total_score, branch_score, steps, max_candidates,
+     empty_cells, times_played, times_won) = row
+
+    score = None
+    if difficulty is not None:
+        score = DifficultyScore(
+            branch_score=branch_score,
+            total_score=total_score,
+            steps=steps,
+            max_candidates=max_candidates,
+            empty_cells=empty_cells,
+            difficulty=Difficulty(difficulty)
+        )
+
+    return LibraryPuzzle(
+        id=puzzle_id,
+        puzzle=Board.from_compact_bytes(puzzle),
+        solution=Board.from_compact_bytes(solution) if solution else None,
+        score=score,
+        times_played=times_played,
+        times_won=times_won
+    )
+
+
+def open_library(filepath: str, create: bool = False) -> Optional[PuzzleLibrary]:
+    if not create and not os.path.exists(filepath):
+        return None
+    try:
+        return PuzzleLibrary(filepath)
+    except sqlite3.Error:
+        return None
@@ -0,0 +1,321 @@
+from functools import lru_cache
+from itertools import combinations
+from typing import Optional
+
+from src.consts import Technique
+from src.game.board import Board
+from src.game.model import Deduction
+
+
+@lru_cache(maxsize=None)
+def unit_geometry(length: int) -> tuple[tuple[tuple[int, ...], ...], tuple[tuple[int, ...], ...]]:
+    size = int(length ** 0.5)
+    units: list[tuple[int, ...]] = []
+
+    for i in range(length):
+        units.append(tuple(i * length + j for j in range(length)))
+    for j in range(length):
+        units.append(tuple(i * length + j for i in range(length)))
+    for box_row in range(size):
+        for box_col in range(size):
+            units.append(tuple((box_row * size + r) * length + box_col * size + c
+                               for r in range(size) for c in range(size)))
+
+    peers: list[set[int]] = [set() for _ in range(length * length)]
+    for unit in units:
+        for index in unit:
+            peers[index].update(unit)
+    for index, cell_peers in enumerate(peers):
+        cell_peers.discard(index)
+
+    return tuple(units), tuple(tuple(sorted(p)) for p in peers)
+
+
+def candidate_masks(board: Board) -> list[int]:
+    length = board.length
+    units, _ = unit_geometry(length)
+    full = (1 << length) - 1
+    values = [cell for row in board for cell in row]
+
+    used = []
+    for unit in units:
+        mask = 0
+        for index in unit:
+            if values[index] is not None:
+                mask |= 1 << (values[index] - 1)
+        used.append(mask)
+
+    size = board.chunk_size
+    masks = [0] * (length * length)
+    for index, value in enumerate(values):
+        if value is not None:
+            continue
+        row, col = divmod(index, length)
+        box = (row // size) * size + col // size
+        masks[index] = full & ~(used[row] | used[length + col] | used[2 * length + box])
+
+    return masks
+
+
+def find_forced_placements(board: Board) -> list[tuple[int, int, int]]:
+    length = board.length
+    units, peers = unit_geometry(length)
+    values = [cell for row in board for cell in row]
+    masks = candidate_masks(board)
+    placements: list[tuple[int, int, int]] = []
+
+    def place(index: int, bit: int):
+        values[index] = bit.bit_length()
+        masks[index] = 0
+        for peer in peers[index]:
+            masks[peer] &= ~bit
+        placements.append((index // length, index % length, values[index]))
+
+    progress = True
+    while progress:
+        progress = False
+
+        for index, value in enumerate(values):
+            if value is not None:
+                continue
+            mask = masks[index]
+            if mask == 0:
+                return placements
+            if mask & (mask - 1) == 0:
+                place(index, mask)
+                progress = True
+
+        for unit in units:
+            once = 0
+            more = 0
+            for index in unit:
+                mask = masks[index]
+                more |= once & mask
+                once |= mask
+
+            singles = once & ~more
+            while singles:
+                bit = singles & -singles
+                singles ^= bit
+                for index in unit:
+                    if masks[index] & bit:
+                        place(index, bit)
+                        progress = True
+                        break
+
+    return placements
+
+
+def find_hint(board: Board) -> Optional[list[Deduction]]:
+    length = board.length
+    values, masks = _flat_state(board)
+
+    chain = []
+    while (deduction := next_deduction(length, values, masks)) is not None:
+        chain.append(deduction)
+        if deduction.placements:
+            return chain
+        _eliminate(length, masks, deduction)
+
+    return None
+
+
+def logical_trace(board: Board) -> tuple[list[Deduction], Board]:
+    length = board.length
+    _, peers = unit_geometry(length)
+    values, masks = _flat_state(board)
+
+    trace = []
+    while (deduction := next_deduction(length, values, masks)) is not None:
+        trace.append(deduction)
+        for row, col, value in deduction.placements:
+            index = row * length + col
+            values[index] = value
+            masks[index] = 0
+            for peer in peers[index]:
+                masks[peer] &= ~(1 << (value - 1))
+        _eliminate(length, masks, deduction)
+
+    return trace, Board(length=length, board=[values[i:i + length] for i in range(0, length * length, length)])
+
+
+def next_deduction(length: int, values: list[Optional[int]], masks: list[int]) -> Optional[Deduction]:
+    for index, value in enumerate(values):
+        if value is None and masks[index] == 0:
+            return None
+
+    for technique in _TECHNIQUES:
+        deduction = technique(length, values, masks)
+        if deduction is not None:
+            return deduction
+    return None
+
+
+def _flat_state(board: Board) -> tuple[list[Optional[int]], list[int]]:
+    return [cell for row in board for cell in row], candidate_masks(board)
+
+
+def _eliminate(length: int, masks: list[int], deduction: Deduction):
+    for row, col, value in deduction.eliminations:
+        masks[row * length + col] &= ~(1 << (value - 1))
+
+
+def _cell(length: int, index: int) -> tuple[int, int]:
+    return index // length, index % length
+
+
+def _naked_single(length: int, values: list[Optional[int]], masks: list[int]) -> Optional[Deduction]:
+    _, peers = unit_geometry(length)
+
+    for index, mask in enumerate(masks):
+        if values[index] is not None or mask & (mask - 1):
+            continue
+
+        seen = 0
+        cells = []
+        for peer in peers[index]:
+            value = values[peer]
+            if value is not None and not seen >> (value - 1) & 1:
+                seen |= 1 << (value - 1)
+                cells.append(_cell(length, peer))
+
+        return Deduction(Technique.NAKED_SINGLE, placements=[(*_cell(length, index), mask.bit_length())],
+                         cells=cells)
+    return None
+
+
+def _hidden_single(length: int, values: list[Optional[int]], masks: list[int]) -> Optional[Deduction]:
+    units, _ = unit_geometry(length)
+
+    for unit in units:
+        once = 0
+        more = 0
+        for index in unit:
+            more |= once & masks[index]
+            once |= masks[index]
+
+        singles = once & ~more
+        if not singles:
+            continue
+
+        bit = singles & -singles
+        for index in unit:
+            if masks[index] & bit:
+                return Deduction(Technique.HIDDEN_SINGLE,
+                                 placements=[(*_cell(length, index), bit.bit_length())],
+                                 cells=[_cell(length, i) for i in unit if i != index])
+    return None
+
+
+def _pointing(length: int, values: list[Optional[int]], masks: list[int]) -> Optional[Deduction]:
+    units, _ = unit_geometry(length)
+
+    for box in units[2 * length:]:
+        for value in range(1, length + 1):
+            bit = 1 << (value - 1)
+            holders = [index for index in box if masks[index] & bit]
+            if len(holders) < 2:
+                continue
+
+            rows = {index // length for index in holders}
+            cols = {index % length for index in holders}
+            if len(rows) == 1:
+                line = units[rows.pop()]
+            elif len(cols) == 1:
+                line = units[length + cols.pop()]
+            else:
+                continue
+
+            targets = [index for index in line if masks[index] & bit and index not in box]
+            if targets:
+                return Deduction(Technique.POINTING,
+                                 eliminations=[(*_cell(length, index), value) for index in targets],
+                                 cells=[_cell(length, index) for index in holders])
+    return None
+
+
+def _box_line(length: int, values: list[Optional[int]], masks: list[int]) -> Optional[Deduction]:
+    units, _ = unit_geometry(length)
+    size = int(length ** 0.5)
+
+    for line in units[:2 * length]:
+        for value in range(1, length + 1):
+            bit = 1 << (value - 1)
+            holders = [index for index in line if masks[index] & bit]
+            if len(holders) < 2:
+                continue
+
+            boxes = {(index // length // size) * size + index % length // size for index in holders}
+            if len(boxes) != 1:
+                continue
+
+            box = units[2 * length + boxes.pop()]
+            targets = [index for index in box if masks[index] & bit and index not in line]
+            if targets:
+                return Deduction(Technique.BOX_LINE,
+                                 eliminations=[(*_cell(length, index), value) for index in targets],
+                                 cells=[_cell(length, index) for index in holders])
+    return None
+
+
+def _naked_subset(size: int, technique: Technique):
+    def find(length: int, values: list[Optional[int]], masks: list[int]) -> Optional[Deduction]:
+        units, _ = unit_geometry(length)
+
+        for unit in units:
+            small = [index for index in unit if 2 <= masks[index].bit_count() <= size]
+            for subset in combinations(small, size):
+                union = 0
+                for index in subset:
+                    union |= masks[index]
+                if union.bit_count() != size:
+                    continue
+
+                eliminations = [(*_cell(length, index), value)
+                                for index in unit if index not in subset
+                                for value in range(1, length + 1) if (masks[index] & union) >> (value - 1) & 1]
+                if eliminations:
+                    return Deduction(technique, eliminations=eliminations,
+                                     cells=[_cell(length, index) for index in subset])
+        return None
+
+    return find
+
+
+def _x_wing(length: int, values: list[Optional[int]], masks: list[int]) -> Optional[Deduction]:
+    units, _ = unit_geometry(length)
+
+    for value in range(1, length + 1):
+        bit = 1 << (value - 1)
+
+        for base, cover in ((0, length), (length, 0)):
+            seen: dict[tuple[int, int], int] = {}
+            for line in range(length):
+                positions = tuple(k for k, index in enumerate(units[base + line]) if masks[index] & bit)
+                if len(positions) != 2:
+                    continue
+
+                if positions not in seen:
+                    seen[positions] = line
+                    continue
+
+                lines = (seen[positions], line)
+                corners = [units[base + l][k] for l in lines for k in positions]
+                targets = [index for k in positions for index in units[cover + k]
+                           if masks[index] & bit and index not in corners]
+                if targets:
+                    return Deduction(Technique.X_WING,
+                                     eliminations=[(*_cell(length, index), value) for index in targets],
+                                     cells=[_cell(length, index) for index in corners])
+    return None
+
+
+_TECHNIQUES = (
+    _naked_single,
+    _hidden_single,
+    _pointing,
+    _box_line,
+    _naked_subset(2, Technique.NAKED_PAIR),
+    _naked_subset(3, Technique.NAKED_TRIPLE),
+    _x_wing,
+)
@@ -1,6 +1,8 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from typing import Optional
 
-from src.consts import Difficulty
+from src.consts import Difficulty, Technique
+from src.game.board import Board
 
 
 @dataclass
@@ -11,3 +13,56 @@ class DifficultyScore:
     max_candidates: int
     empty_cells: int
     difficulty: Difficulty
+    techniques: dict[Technique, int] = field(default_factory=dict)
+    # spread of the total score over randomized scoring runs (0 for a single run)
+    score_variance: float = 0.0
+    runs: int = 1
+
+
+@dataclass
+class LibraryPuzzle:
+    id: int
+    puzzle: Board
+    solution: Optional[Board]
+    score: Optional[DifficultyScore]
+    times_played: int
+    times_won: int
+
+
+@dataclass
+class SearchStats:
+    nodes: int = 0
+    backtracks: int = 0
+    max_depth: int = 0
+    solutions: int = 0
+    placements: int = 0
+    propagations: int = 0
+    elapsed: float = 0.0
+    exhausted: bool = False
+
+    def merge(self, other: 'SearchStats'):
+        self.nodes += other.nodes
+        self.backtracks += other.backtracks
+        self.max_depth = max(self.max_depth, other.max_depth)
+        self.solutions += other.solutions
+        self.placements += other.placements
+        self.propagations += other.propagations
+        self.elapsed += other.elapsed
+        self.exhausted = self.exhausted or other.exhausted
+
+
+@dataclass
+class SolutionAnalysis:
+    count: int
+    complete: bool
+    solution: Optional[Board]
+    backbone: list[tuple[int, int, int]]
+    stats: SearchStats = field(default_factory=SearchStats)
+
+
+@dataclass
+class Deduction:
+    technique: Technique
+    placements: list[tuple[int, int, int]] = field(default_factory=list)
+    eliminations: list[tuple[int, int, int]] = field(default_factory=list)
+    cells: list[tuple[int, int]] = field(default_factory=list)
@@ -0,0 +1,147 @@
+import hashlib
+import os
+from collections import OrderedDict
+from typing import Optional
+
+from src.config import SOLUTION_CACHE_PATH, SOLUTION_CACHE_MAX_ENTRIES
+from src.game.board import Board
+
+KEY_SIZE = 16
+# dead records allowed in the file, relative to the cap, before it is rewritten
+COMPACTION_FACTOR = 2
+
+
+def puzzle_key(puzzle: Board) -> bytes:
+    return hashlib.blake2b(puzzle.to_compact_bytes(), digest_size=KEY_SIZE).digest()
+
+
+class SolutionCache:
+    def __init__(self, filepath: str, max_entries: int = SOLUTION_CACHE_MAX_ENTRIES):
+        self.filepath = filepath
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+        self._index: Optional[OrderedDict[bytes, bytes]] = None
+        self._records = 0
+
+    def get(self, puzzle: Board) -> Optional[Board]:
+        index = self._load()
+        key = puzzle_key(puzzle)
+
+        cells = index.get(key)
+        if cells is None:
+            self.misses += 1
+            return None
+
+        if not _matches(puzzle, cells):
+            del index[key]
+            self.misses += 1
+            return None
+
+        index.move_to_end(key)
+        self.hits += 1
+        return _board_from_cells(puzzle.length, cells)
+
+    def put(self, puzzle: Board, solution: Board):
+        index = self._load()
+        key = puzzle_key(puzzle)
+        cells = solution.to_compact_bytes()[1:]
+
+        if index.get(key) == cells:
+            index.move_to_end(key)
+            return
+
+        index[key] = cells
+        try:
+            self._append(key, cells)
+        except OSError:
+            return
+
+        while len(index) > self.max_entries:
+            index.popitem(last=False)
+
+        if self._records > self.max_entries * COMPACTION_FACTOR:
+            self._compact()
+
+    def _load(self) -> OrderedDict:
+        if self._index is not None:
+            return self._index
+
+        self._index = OrderedDict()
+        try:
+            with open(self.filepath, 'rb') as f:
+                data = f.read()
+        except OSError:
+            return self._index
+
+        pos = 0
+        while pos + KEY_SIZE + 1 <= len(data):
+            key = data[pos:pos + KEY_SIZE]
+            length = data[pos + KEY_SIZE]
+            start = pos + KEY_SIZE + 1
+            end = start + length * length
+            if length == 0 or end > len(data):
+                break
+
+            self._index[key] = data[start:end]
+            self._index.move_to_end(key)
+            self._records += 1
+            pos = end
+
+        while len(self._index) > self.max_entries:
+            self._index.popitem(last=False)
+
+        return self._index
+
+    def _append(self, key: bytes, cells: bytes):
+        directory = os.path.dirname(self.filepath)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        length = int(len(cells) ** 0.5)
+        with open(self.filepath, 'ab') as f:
+            f.write(key + bytes((length,)) + cells)
+        self._records += 1
+
+    def _compact(self):
+        tmp_path = self.filepath + '.tmp'
+        try:
+            with open(tmp_path, 'wb') as f:
+                for key, cells in self._index.items():
+                    f.write(key + bytes((int(len(cells) ** 0.5),)) + cells)
+            os.replace(tmp_path, self.filepath)
+        except OSError:
+            return
+        self._records = len(self._index)
+
+
+def _matches(puzzle: Board, cells: bytes) -> bool:
+    length = puzzle.length
+    if len(cells) != length * length:
+        return False
+
+    for i, row in enumerate(puzzle):
+        for j, given in enumerate(row):
+            if given is not None and cells[i * length + j] != given:
+                return False
+
+    solution = _board_from_cells(length, cells)
+    return solution.is_solved
+
+
+def _board_from_cells(length: int, cells: bytes) -> Board:
+    return Board(length=length, board=[[cell or None for cell in cells[i:i + length]]
+                                       for i in range(0, length * length, length)])
+
+
+_default_cache: Optional[SolutionCache] = None
+
+
+def get_solution_cache() -> Optional[SolutionCache]:
+    global _default_cache
+    if not SOLUTION_CACHE_PATH:
+        return None
+    if _default_cache is None:
+        _default_cache = SolutionCache(SOLUTION_CACHE_PATH)
+    return _default_cache
@@ -1,35 +1,77 @@
-from typing import Optional
+from itertools import islice
+from typing import Iterator, Optional
 from src.game.board import Board
-from src.game.utils import is_valid_placement, find_empty_cell
+from src.game.backends import get_backend
+from src.game.model import SearchStats, SolutionAnalysis
+from src.game.solution_cache import get_solution_cache
 
 
-def solve_board(board: Board) -> Optional[Board]:
-    board_copy = board.copy()
+def solve_board(board: Board, use_cache: bool = False, stats: Optional[SearchStats] = None) -> Optional[Board]:
+    cache = get_solution_cache() if use_cache else None
+    if cache is not None:
+        cached = cache.get(board)
+        if cached is not None:
+            return cached
 
-    if solve_recursive(board_copy):
-        return board_copy
+    solution = get_backend(board.length).solve(board, stats)
+    if solution is None:
+        return None
 
-    return None
+    if cache is not None:
+        cache.put(board, solution)
+    return solution
 
 
-def solve_recursive(board: Board) -> bool:
-    empty_cell = find_empty_cell(board)
+def iter_solutions(board: Board, limit: Optional[int] = None, budget: Optional[int] = None,
+                   stats: Optional[SearchStats] = None) -> Iterator[Board]:
+    header = bytes((board.length,))
+    solutions = get_backend(board.length).iter_solutions(board.length, board.to_compact_bytes()[1:], budget, stats)
+    for cells in islice(solutions, limit):
+        yield Board.from_compact_bytes(header + cells)
 
-    if empty_cell is None:
-        return True
 
-    row, col = empty_cell
+def count_solutions(board: Board, limit: int = 2, budget: Optional[int] = None,
+                    stats: Optional[SearchStats] = None) -> int:
+    return get_backend(board.length).count(board, limit, budget, stats)
 
-    for num in range(1, board.length + 1):
-        if is_valid_placement(board, row, col, num):
-            board.set_cell(row, col, num)
 
-            if solve_recursive(board):
-                return True
+def is_unique(length: int, cells: bytes, budget: Optional[int] = None,
+              stats: Optional[SearchStats] = None) -> bool:
+    search_stats = SearchStats()
+    solutions = get_backend(length).iter_solutions(length, cells, budget, search_stats)
+    unique = sum(1 for _ in islice(solutions, 2)) == 1 and not search_stats.exhausted
+    if stats is not None:
+        stats.merge(search_stats)
+    return unique
 
-            board.set_cell(row, col, None)
 
-    return False
+def analyze(board: Board, limit: Optional[int] = None, budget: Optional[int] = None) -> SolutionAnalysis:
+    stats = SearchStats()
+    length = board.length
+    cells = board.to_compact_bytes()[1:]
+
+    first: Optional[bytes] = None
+    fixed: list[int] = []
+    count = 0
+    for solution in islice(get_backend(length).iter_solutions(length, cells, budget, stats), limit):
+        count += 1
+        if first is None:
+            first = solution
+            fixed = [index for index, value in enumerate(cells) if not value]
+        else:
+            fixed = [index for index in fixed if solution[index] == first[index]]
+
+    complete = not stats.exhausted and (limit is None or count < limit)
+    backbone = sorted((index // length, index % length, first[index]) for index in fixed)
+
+    return SolutionAnalysis(
+        count=count,
+        complete=complete,
+        solution=Board.from_compact_bytes(bytes((length,)) + first) if first else None,
+        backbone=backbone,
+        stats=stats
+    )
+
 
 # #%%
 # b = Board(board=[
@@ -1,6 +1,20 @@
-from typing import Optional
+import bisect
+import struct
+from typing import Optional, Union
 from datetime import datetime, timedelta
 from src.game.board import Board
+from src.game.cache import LRUCache
+from src.game.logic import find_forced_placements, candidate_masks, find_hint
+from src.game.model import Deduction
+from src.game.solver import solve_board
+
+POSITION_CACHE_SIZE = 256
+# rebuilding the board from a snapshot costs about as much as this many single steps
+SNAPSHOT_RESTORE_STEPS = 32
+# length, errors, hints, elapsed seconds, paused, cursor, number of changes and the current change
+_PACK_HEADER = struct.Struct('<BIIdBBBII')
+# parent change, move count, flags
+_PACK_ENTRY = struct.Struct('<IHB')
 
 
 class Move:
@@ -10,6 +24,42 @@ class Move:
         self.old_value = old_value
         self.new_value = new_value
         self.timestamp = datetime.now()
+        self.counted_error = False
+
+
+class MoveGroup:
+    def __init__(self, moves: list[Move]):
+        self.moves = moves
+        self.timestamp = datetime.now()
+        self.counted_error = False
+
+
+HistoryEntry = Union[Move, MoveGroup]
+
+
+def _moves_of(entry: HistoryEntry) -> list[Move]:
+    return entry.moves if isinstance(entry, MoveGroup) else [entry]
+
+
+class UndoNode:
+    # one change in the undo tree; the board at a node is the puzzle plus the
+    # moves on the path from the root, so branches share everything above them.
+    # Branch points also keep the board itself, so a jump between branches
+    # replays only the moves below the nearest one
+    def __init__(self, entry: Optional[HistoryEntry], parent: Optional['UndoNode'], seq: int):
+        self.entry = entry
+        self.parent = parent
+        self.seq = seq
+        self.depth = parent.depth + 1 if parent is not None else 0
+        self.children: list[UndoNode] = []
+        self.redo_child: Optional[UndoNode] = None
+        # filled cells that disagree with the solution after this change
+        self.mismatches = 0
+        self.snapshot: Optional[bytes] = None
+
+    @property
+    def moves(self) -> list[Move]:
+        return _moves_of(self.entry) if self.entry is not None else []
 
 
 class GameState:
@@ -21,8 +71,20 @@ class GameState:
         self.fixed_cells: set[tuple[int, int]] = set()
         self._populate_fixed_cells()
 
-        self.history: list[Move] = []
-        self.redo_stack: list[Move] = []
+        self.undo_root = UndoNode(None, None, 0)
+        self.undo_root.snapshot = self.puzzle.to_compact_bytes()
+        self._undo_nodes: list[UndoNode] = [self.undo_root]
+        self._node = self.undo_root
+
+        self._build_indexes()
+
+        self.candidate_cache = LRUCache(POSITION_CACHE_SIZE)
+        self.solvable_cache = LRUCache(POSITION_CACHE_SIZE)
+        self.hint_cache = LRUCache(POSITION_CACHE_SIZE)
+        self.solvability_cache = LRUCache(POSITION_CACHE_SIZE)
+
+        self._hint: Optional[list[Deduction]] = None
+        self._hint_key: Optional[int] = None
 
         self.cursor_row = 0
         self.cursor_col = 0
@@ -49,15 +111,93 @@ class GameState:
                     self.cursor_col = j
                     return
 
+    def _build_indexes(self):
+        length = self.current.length
+        size = self.current.chunk_size
+
+        self._row_counts = [[0] * (length + 1) for _ in range(length)]
+        self._col_counts = [[0] * (length + 1) for _ in range(length)]
+        self._box_counts = [[0] * (length + 1) for _ in range(length)]
+
+        self._empty: list[int] = []
+        self._by_value: dict[int, list[int]] = {num: [] for num in range(1, length + 1)}
+        self._errors: list[int] = []
+
+        for i in range(length):
+            for j in range(length):
+                value = self.current.get_cell(i, j)
+                if value is None:
+                    self._empty.append(i * length + j)
+                else:
+                    self._by_value[value].append(i * length + j)
+                    self._row_counts[i][value] += 1
+                    self._col_counts[j][value] += 1
+                    self._box_counts[(i // size) * size + j // size][value] += 1
+
+        for value, indexes in self._by_value.items():
+            for index in indexes:
+                if self.is_cell_error(index // length, index % length):
+                    self._errors.append(index)
+        self._errors.sort()
+
+    def _apply(self, row: int, col: int, value: Optional[int]):
+        length = self.current.length
+        size = self.current.chunk_size
+        index = row * length + col
+        box = (row // size) * size + col // size
+
+        old_value = self.current.get_cell(row, col)
+        if old_value is None:
+            _remove_sorted(self._empty, index)
+        else:
+            _remove_sorted(self._by_value[old_value], index)
+            self._row_counts[row][old_value] -= 1
+            self._col_counts[col][old_value] -= 1
+            self._box_counts[box][old_value] -= 1
+
+        self.current.set_cell(row, col, value)
+
+        if value is None:
+            bisect.insort(self._empty, index)
+        else:
+            bisect.insort(self._by_value[value], index)
+            self._row_counts[row][value] += 1
+            self._col_counts[col][value] += 1
+            self._box_counts[box][value] += 1
+
+        for changed in (old_value, value):
+            if changed is None:
+                continue
+            for peer in self._by_value[changed]:
+                self._refresh_error(peer)
+        if value is None:
+            self._refresh_error(index)
+
+    def _refresh_error(self, index: int):
+        length = self.current.length
+        is_error = self.is_cell_error(index // length, index % length)
+        position = bisect.bisect_left(self._errors, index)
+        indexed = position < len(self._errors) and self._errors[position] == index
+
+        if is_error and not indexed:
+            self._errors.insert(position, index)
+        elif indexed and not is_error:
+            del self._errors[position]
+
     def is_cell_fixed(self, row: int, col: int) -> bool:
         return (row, col) in self.fixed_cells
 
     def is_cell_error(self, row: int, col: int) -> bool:
-        current_value = self.current.get_cell(row, col)
-        if current_value is None:
+        value = self.current.get_cell(row, col)
+        if value is None:
             return False
 
-        return len(self.get_conflicts(row, col)) > 0
+        size = self.current.chunk_size
+        box = (row // size) * size + col // size
+
+        return (self._row_counts[row][value] > 1 or
+                self._col_counts[col][value] > 1 or
+                self._box_counts[box][value] > 1)
 
     def get_conflicts(self, row: int, col: int) -> list[tuple[int, int]]:
         conflicts = []
@@ -95,36 +235,202 @@ class GameState:
             return False
 
         move = Move(row, col, old_value, value)
-        self.history.append(move)
-        self.redo_stack.clear()
+        self._record(move)
+        self._apply(row, col, value)
 
-        self.current.set_cell(row, col, value)
-
-        if value is not None and len(self.get_conflicts(row, col)) > 0:
+        if self.is_cell_error(row, col):
             self.errors_count += 1
+            move.counted_error = True
 
         return True
 
-    def undo(self) -> bool:
-        if not self.history:
+    def set_values(self, placements: list[tuple[int, int, Optional[int]]]) -> int:
+        moves = []
+        for row, col, value in placements:
+            old_value = self.current.get_cell(row, col)
+            if self.is_cell_fixed(row, col) or old_value == value:
+                continue
+            moves.append(Move(row, col, old_value, value))
+            self._apply(row, col, value)
+
+        if not moves:
+            return 0
+
+        group = MoveGroup(moves)
+        self._record(group)
+
+        if any(self.is_cell_error(move.row, move.col) for move in moves):
+            self.errors_count += 1
+            group.counted_error = True
+
+        return len(moves)
+
+    def fill_forced_cells(self) -> int:
+        return self.set_values(find_forced_placements(self.current))
+
+    def _record(self, entry: HistoryEntry):
+        parent = self._node
+        node = UndoNode(entry, parent, len(self._undo_nodes))
+        node.mismatches = parent.mismatches + self._mismatch_delta(entry)
+        parent.children.append(node)
+        parent.redo_child = node
+        self._undo_nodes.append(node)
+        self._node = node
+
+        if len(parent.children) == 2 and parent.snapshot is None:
+            parent.snapshot = self._parent_snapshot(entry)
+
+    def _parent_snapshot(self, entry: HistoryEntry) -> bytes:
+        # the entry may already be on the board, so its old values are put back
+        cells = bytearray(self.current.to_compact_bytes())
+        length = self.current.length
+        for move in reversed(_moves_of(entry)):
+            cells[1 + move.row * length + move.col] = move.old_value or 0
+        return bytes(cells)
+
+    def _mismatch_delta(self, entry: HistoryEntry) -> int:
+        delta = 0
+        for move in _moves_of(entry):
+            expected = self.solution.get_cell(move.row, move.col)
+            delta += (move.new_value not in (None, expected)) - (move.old_value not in (None, expected))
+        return delta
+
+    def _step_back(self):
+        node = self._node
+        for move in reversed(_moves_of(node.entry)):
+            self._apply(move.row, move.col, move.old_value)
+        node.parent.redo_child = node
+        self._node = node.parent
+
+    def _step_forward(self, node: UndoNode):
+        for move in _moves_of(node.entry):
+            self._apply(move.row, move.col, move.new_value)
+        node.parent.redo_child = node
+        self._node = node
+
+    def undo(self, count: int = 1) -> bool:
+        if self._node.parent is None:
             return False
 
-        move = self.history.pop()
-        self.redo_stack.append(move)
+        for _ in range(count):
+            if self._node.parent is None:
+                break
+            self._step_back()
 
-        self.current.set_cell(move.row, move.col, move.old_value)
         return True
 
-    def redo(self) -> bool:
-        if not self.redo_stack:
+    def redo(self, count: int = 1) -> bool:
+        if self._node.redo_child is None:
             return False
 
-        move = self.redo_stack.pop()
-        self.history.append(move)
+        for _ in range(count):
+            if self._node.redo_child is None:
+                break
+            self._step_forward(self._node.redo_child)
+
+        return True
+
+    def goto_change(self, seq: int) -> bool:
+        target = self._undo_nodes[max(0, min(seq, len(self._undo_nodes) - 1))]
+        if target is self._node:
+            return False
 
-        self.current.set_cell(move.row, move.col, move.new_value)
+        # the common ancestor splits the way into moves to undo and moves to redo
+        climb, path = [], []
+        node, down = self._node, target
+        while down.depth > node.depth:
+            path.append(down)
+            down = down.parent
+        while node.depth > down.depth:
+            climb.append(node)
+            node = node.parent
+        while node is not down:
+            climb.append(node)
+            node = node.parent
+            path.append(down)
+            down = down.parent
+
+        # a long way round is cheaper from the nearest snapshot above the target
+        base, replay = target, []
+        while base.snapshot is None:
+            replay.append(base)
+            base = base.parent
+
+        if len(replay) + SNAPSHOT_RESTORE_STEPS < len(climb) + len(path):
+            for node in climb + path:
+                node.parent.redo_child = node
+            self._restore(base)
+            path = replay
+        else:
+            for _ in climb:
+                self._step_back()
+
+        for node in reversed(path):
+            self._step_forward(node)
         return True
 
+    def _restore(self, node: UndoNode):
+        self.current = Board.from_compact_bytes(node.snapshot)
+        self._build_indexes()
+        self._node = node
+
+    def earlier(self, count: int = 1) -> bool:
+        return self.goto_change(self._node.seq - count)
+
+    def later(self, count: int = 1) -> bool:
+        return self.goto_change(self._node.seq + count)
+
+    def undo_leaves(self) -> list[UndoNode]:
+        return [node for node in self._undo_nodes[1:] if not node.children]
+
+    @property
+    def current_node(self) -> UndoNode:
+        return self._node
+
+    def off_solution_line(self) -> list[UndoNode]:
+        # the moves since the board last agreed with the solution, oldest first
+        line = []
+        node = self._node
+        while node.mismatches > 0:
+            line.append(node)
+            node = node.parent
+        line.reverse()
+        return line
+
+    def solvability_known(self) -> bool:
+        return self._node.mismatches == 0 or self._node in self.solvability_cache
+
+    def record_solvability(self, node: UndoNode, culprit: Optional[UndoNode]):
+        self.solvability_cache.put(node, culprit)
+
+    def unsolvable_since(self) -> Optional[UndoNode]:
+        # the move that left the board without a solution, once the background check found it
+        if self._node.mismatches == 0:
+            return None
+        return self.solvability_cache.get(self._node)
+
+    @property
+    def history(self) -> list[HistoryEntry]:
+        entries = []
+        node = self._node
+        while node.parent is not None:
+            entries.append(node.entry)
+            node = node.parent
+        entries.reverse()
+        return entries
+
+    @property
+    def move_count(self) -> int:
+        return self._node.depth
+
+    @property
+    def change_number(self) -> int:
+        return self._node.seq
+
+    @property
+    def change_count(self) -> int:
+        return len(self._undo_nodes) - 1
+
     def move_cursor(self, delta_row: int, delta_col: int):
         new_row = (self.cursor_row + delta_row) % self.current.length
         new_col = (self.cursor_col + delta_col) % self.current.length
@@ -132,54 +438,92 @@ class GameState:
         self.cursor_row = new_row
         self.cursor_col = new_col
 
+    def next_empty_cell(self, forward: bool = True, count: int = 1) -> Optional[tuple[int, int]]:
+        return self._jump(self._empty, forward, count)
+
+    def next_error_cell(self, forward: bool = True, count: int = 1) -> Optional[tuple[int, int]]:
+        return self._jump(self._errors, forward, count)
+
+    def next_cell_with_value(self, value: int, forward: bool = True,
+                             count: int = 1) -> Optional[tuple[int, int]]:
+        return self._jump(self._by_value.get(value, []), forward, count)
+
+    def jump_cursor(self, target: Optional[tuple[int, int]]) -> bool:
+        if target is None:
+            return False
+
+        self.cursor_row, self.cursor_col = target
+        return True
+
+    def _jump(self, indexes: list[int], forward: bool, count: int) -> Optional[tuple[int, int]]:
+        if not indexes:
+            return None
+
+        length = self.current.length
+        cursor = self.cursor_row * length + self.cursor_col
+
+        if forward:
+            position = bisect.bisect_right(indexes, cursor) + count - 1
+        else:
+            position = bisect.bisect_left(indexes, cursor) - count
+
+        index = indexes[position % len(indexes)]
+        return index // length, index % length
+
     def get_hint(self) -> bool:
-        if self.current.is_empty(self.cursor_row, self.cursor_col):
-            solution_value = self.solution.get_cell(self.cursor_row, self.cursor_col)
-            self.set_value(self.cursor_row, self.cursor_col, solution_value)
-            self.hints_used += 1
-            return True
-        return False
+        # the first press shows the next deduction, a second press on the
+        # same position applies it
+        hint = self.current_hint()
+        if hint is not None:
+            self._hint = None
+            row, col, value = hint[-1].placements[0]
+            return self.set_value(row, col, value)
+
+        key = self.current.state_key
+        chain = self.hint_cache.get_or_compute(key, lambda: find_hint(self.current))
+        if chain is None or not self._agrees_with_solution(chain[-1]):
+            return self._reveal_cursor_cell()
+
+        self._hint = chain
+        self._hint_key = key
+        self.cursor_row, self.cursor_col = chain[-1].placements[0][:2]
+        self.hints_used += 1
+        return True
+
+    def current_hint(self) -> Optional[list[Deduction]]:
+        if self._hint is not None and self._hint_key == self.current.state_key:
+            return self._hint
+        return None
+
+    def _agrees_with_solution(self, deduction: Deduction) -> bool:
+        return all(self.solution.get_cell(row, col) == value for row, col, value in deduction.placements)
+
+    def _reveal_cursor_cell(self) -> bool:
+        if not self.current.is_empty(self.cursor_row, self.cursor_col) and \
+                not self.jump_cursor(self.next_empty_cell()):
+            return False
+
+        solution_value = self.solution.get_cell(self.cursor_row, self.cursor_col)
+        self.set_value(self.cursor_row, self.cursor_col, solution_value)
+        self.hints_used += 1
+        return True
 
     def get_candidates(self, row: int, col: int) -> list[int]:
-        if not self.current.is_empty(row, col):
-            return []
+        return list(self.candidate_grid()[row * self.current.length + col])
 
-        candidates = []
-        for num in range(1, self.current.length + 1):
-            valid = True
+    def candidate_grid(self) -> tuple[tuple[int, ...], ...]:
+        return self.candidate_cache.get_or_compute(self.current.state_key, self._compute_candidate_grid)
 
-            for j in range(self.current.length):
-                if self.current.get_cell(row, j) == num:
-                    valid = False
-                    break
-
-            if valid:
-                for i in range(self.current.length):
-                    if self.current.get_cell(i, col) == num:
-                        valid = False
-                        break
-
-            if valid:
-                chunk_row = row // self.current.chunk_size
-                chunk_col = col // self.current.chunk_size
-                start_row = chunk_row * self.current.chunk_size
-                start_col = chunk_col * self.current.chunk_size
-
-                for i in range(start_row, start_row + self.current.chunk_size):
-                    for j in range(start_col, start_col + self.current.chunk_size):
-                        if self.current.get_cell(i, j) == num:
-                            valid = False
-                            break
-                    if not valid:
-                        break
-
-            if valid:
-                candidates.append(num)
-
-        return candidates
+    def _compute_candidate_grid(self) -> tuple[tuple[int, ...], ...]:
+        return tuple(tuple(num for num in range(1, self.current.length + 1) if mask >> (num - 1) & 1)
+                     for mask in candidate_masks(self.current))
+
+    def is_solvable(self) -> bool:
+        return self.solvable_cache.get_or_compute(self.current.state_key,
+                                                  lambda: solve_board(self.current) is not None)
 
     def is_complete(self) -> bool:
-        return self.current.is_full
+        return not self._empty
 
     def is_won(self) -> bool:
         if not self.is_complete():
@@ -195,6 +539,65 @@ class GameState:
 
         return True
 
+    def pack(self) -> bytes:
+        length = self.current.length
+        parts = [_PACK_HEADER.pack(length, self.errors_count, self.hints_used,
+                                   self.get_elapsed_time().total_seconds(), self.paused,
+                                   self.cursor_row, self.cursor_col, self.change_count, self._node.seq),
+                 self.puzzle.to_compact_bytes()[1:], self.solution.to_compact_bytes()[1:],
+                 self.current.to_compact_bytes()[1:]]
+
+        for node in self._undo_nodes[1:]:
+            moves = _moves_of(node.entry)
+            flags = (node.entry.counted_error | isinstance(node.entry, MoveGroup) << 1 |
+                     (node.parent.redo_child is node) << 2)
+            parts.append(_PACK_ENTRY.pack(node.parent.seq, len(moves), flags))
+            parts.append(bytes(value for move in moves
+                               for value in (move.row, move.col, move.old_value or 0, move.new_value or 0)))
+
+        return b''.join(parts)
+
+    @classmethod
+    def unpack(cls, data: bytes) -> 'GameState':
+        length, errors, hints, elapsed, paused, cursor_row, cursor_col, change_count, current_seq = \
+            _PACK_HEADER.unpack_from(data)
+        header = bytes((length,))
+        cells = length * length
+        offset = _PACK_HEADER.size
+
+        puzzle, solution, current = (Board.from_compact_bytes(header + data[start:start + cells])
+                                     for start in range(offset, offset + 3 * cells, cells))
+        offset += 3 * cells
+
+        state = cls(puzzle, solution)
+        state.current = current
+        state._build_indexes()
+
+        for seq in range(1, change_count + 1):
+            parent_seq, count, flags = _PACK_ENTRY.unpack_from(data, offset)
+            offset += _PACK_ENTRY.size
+            moves = [Move(data[i], data[i + 1], data[i + 2] or None, data[i + 3] or None)
+                     for i in range(offset, offset + 4 * count, 4)]
+            offset += 4 * count
+
+            entry = MoveGroup(moves) if flags & 2 else moves[0]
+            entry.counted_error = bool(flags & 1)
+            parent = state._undo_nodes[parent_seq]
+            node = UndoNode(entry, parent, seq)
+            node.mismatches = parent.mismatches + state._mismatch_delta(entry)
+            parent.children.append(node)
+            if flags & 4:
+                parent.redo_child = node
+            state._undo_nodes.append(node)
+
+        state._node = state._undo_nodes[current_seq]
+        state.errors_count = errors
+        state.hints_used = hints
+        state.cursor_row, state.cursor_col = cursor_row, cursor_col
+        state.elapsed_time = timedelta(seconds=elapsed)
+        state.paused = bool(paused)
+        return state
+
     def get_elapsed_time(self) -> timedelta:
         if self.paused:
             return self.elapsed_time
@@ -212,7 +615,7 @@ class GameState:
 
     def get_progress_percentage(self) -> float:
         total_cells = self.current.length ** 2
-        filled_cells = total_cells - len(self.current.empty_cells)
+        filled_cells = total_cells - len(self._empty)
         fixed_cells_count = len(self.fixed_cells)
 
         user_filled = filled_cells - fixed_cells_count
@@ -221,4 +624,10 @@ class GameState:
         if user_total == 0:
             return 100.0
 
-        return (user_filled / user_total) * 100.0
\ No newline at end of file
+        return (user_filled / user_total) * 100.0
+
+
+def _remove_sorted(indexes: list[int], index: int):
+    position = bisect.bisect_left(indexes, index)
+    if position < len(indexes) and indexes[position] == index:
+        del indexes[position]
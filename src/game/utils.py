@@ -1,9 +1,28 @@
+from collections import Counter
 from typing import Optional
 
+from src.config import HOT_PATH_COUNTERS
 from src.game.board import Board
 
+# call counts per helper; None keeps the check to a single global lookup
+counters: Optional[Counter] = Counter() if HOT_PATH_COUNTERS else None
+
+
+def enable_counters() -> Counter:
+    global counters
+    counters = Counter()
+    return counters
+
+
+def disable_counters() -> Optional[Counter]:
+    global counters
+    previous, counters = counters, None
+    return previous
+
 
 def find_empty_cell(board: Board) -> Optional[tuple[int, int]]:
+    if counters is not None:
+        counters['find_empty_cell'] += 1
     for i in range(board.length):
         for j in range(board.length):
             if board.is_empty(i, j):
@@ -12,6 +31,8 @@ def find_empty_cell(board: Board) -> Optional[tuple[int, int]]:
 
 
 def find_empty_cell_smart(board: Board) -> Optional[tuple[int, int]]:
+    if counters is not None:
+        counters['find_empty_cell_smart'] += 1
     min_candidates = board.length + 1
     best_cell = None
 
@@ -34,6 +55,8 @@ def find_empty_cell_smart(board: Board) -> Optional[tuple[int, int]]:
 
 
 def get_valid_numbers(board: Board, row: int, col: int) -> list[int]:
+    if counters is not None:
+        counters['get_valid_numbers'] += 1
     valid = []
     for num in range(1, board.length + 1):
         if is_valid_placement(board, row, col, num):
@@ -41,6 +64,8 @@ def get_valid_numbers(board: Board, row: int, col: int) -> list[int]:
     return valid
 
 def is_valid_placement(board: Board, row: int, col: int, num: int) -> bool:
+    if counters is not None:
+        counters['is_valid_placement'] += 1
     for j in range(board.length):
         if board.get_cell(row, j) == num:
             return False
@@ -0,0 +1,183 @@
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import statistics
+import sys
+import time
+from typing import Optional
+
+from src.server.service import DEFAULT_HOST, DEFAULT_PORT
+
+DEFAULT_SESSIONS = 1000
+DEFAULT_CONNECTIONS = 50
+DEFAULT_DURATION = 10.0
+DEFAULT_PUZZLES = 4
+# relative weight of each session operation in the mix
+OPERATIONS = (('session.set', 6), ('session.get', 2), ('session.undo', 1), ('session.redo', 1),
+              ('session.hint', 1))
+
+
+class Connection:
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+        self._ids = itertools.count()
+        self._pending: dict[int, asyncio.Future] = {}
+        self._reader_task = asyncio.create_task(self._read_responses())
+
+    @classmethod
+    async def open(cls, host: str, port: int, unix_path: Optional[str] = None) -> 'Connection':
+        if unix_path:
+            reader, writer = await asyncio.open_unix_connection(unix_path, limit=1 << 20)
+        else:
+            reader, writer = await asyncio.open_connection(host, port, limit=1 << 20)
+        return cls(reader, writer)
+
+    async def call(self, op: str, **fields) -> dict:
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        self.writer.write(json.dumps({'id': request_id, 'op': op, **fields}).encode() + b'\n')
+        await self.writer.drain()
+        return await future
+
+    async def close(self):
+        self.writer.close()
+        self._reader_task.cancel()
+
+    async def _read_responses(self):
+        try:
+            while line := await self.reader.readline():
+                response = json.loads(line)
+                future = self._pending.pop(response.get('id'), None)
+                if future is not None and not future.done():
+                    future.set_result(response)
+        finally:
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("connection closed"))
+
+
+def percentile(samples: list[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+async def _session_worker(connection: Connection, session_id: str, board: str, length: int,
+                          deadline: float, latencies: list[float], errors: list[str]):
+    operations, weights = zip(*OPERATIONS)
+    empty = [index for index, symbol in enumerate(board) if symbol == '.']
+    while time.perf_counter() < deadline:
+        op = random.choices(operations, weights)[0]
+        fields: dict = {'session': session_id}
+        if op == 'session.set' and empty:
+            index = random.choice(empty)
+            fields.update(row=index // length, col=index % length, value=random.randint(1, length))
+
+        start = time.perf_counter()
+        response = await connection.call(op, **fields)
+        latencies.append(time.perf_counter() - start)
+        if not response['ok']:
+            errors.append(response['error'])
+
+
+async def run_load(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, unix_path: Optional[str] = None,
+                   sessions: int = DEFAULT_SESSIONS, connections: int = DEFAULT_CONNECTIONS,
+                   duration: float = DEFAULT_DURATION, puzzles: int = DEFAULT_PUZZLES,
+                   difficulty: str = 'medium', size: int = 9) -> dict:
+    pool = [await Connection.open(host, port, unix_path) for _ in range(connections)]
+    try:
+        # a handful of generated puzzles is shared by every session so setup stays cheap
+        generated = await asyncio.gather(*(pool[i % connections].call('generate', difficulty=difficulty, size=size)
+                                           for i in range(puzzles)))
+        lines = [response['result']['puzzle'] for response in generated]
+
+        setup_start = time.perf_counter()
+        created = await asyncio.gather(*(pool[i % connections].call('session.new', puzzle=lines[i % puzzles])
+                                         for i in range(sessions)))
+        setup_seconds = time.perf_counter() - setup_start
+
+        latencies: list[float] = []
+        errors: list[str] = []
+        start = time.perf_counter()
+        deadline = start + duration
+        await asyncio.gather(*(_session_worker(pool[i % connections], response['result']['session'],
+                                               lines[i % puzzles], size, deadline, latencies, errors)
+                               for i, response in enumerate(created)))
+        elapsed = time.perf_counter() - start
+
+        server = (await pool[0].call('stats'))['result']
+    finally:
+        for connection in pool:
+            await connection.close()
+
+    return {
+        'sessions': sessions,
+        'connections': connections,
+        'setup_seconds': setup_seconds,
+        'requests': len(latencies),
+        'errors': len(errors),
+        'seconds': elapsed,
+        'requests_per_second': len(latencies) / elapsed if elapsed > 0 else 0.0,
+        'latency_ms': {
+            'mean': statistics.fmean(latencies) * 1000 if latencies else None,
+            'p50': percentile(latencies, 0.50) * 1000 if latencies else None,
+            'p90': percentile(latencies, 0.90) * 1000 if latencies else None,
+            'p99': percentile(latencies, 0.99) * 1000 if latencies else None,
+            'max': max(latencies) * 1000 if latencies else None,
+        },
+        'server': server,
+    }
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument('--host', default=DEFAULT_HOST, help=f'service address (default: {DEFAULT_HOST})')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f'service port (default: {DEFAULT_PORT})')
+    parser.add_argument('--unix', dest='unix_path', help='connect to this Unix socket instead of TCP')
+    parser.add_argument('--sessions', type=int, default=DEFAULT_SESSIONS,
+                        help=f'concurrent game sessions (default: {DEFAULT_SESSIONS})')
+    parser.add_argument('--connections', type=int, default=DEFAULT_CONNECTIONS,
+                        help=f'sockets the sessions are spread over (default: {DEFAULT_CONNECTIONS})')
+    parser.add_argument('--duration', type=float, default=DEFAULT_DURATION,
+                        help=f'seconds to run the session mix (default: {DEFAULT_DURATION})')
+    parser.add_argument('--puzzles', type=int, default=DEFAULT_PUZZLES,
+                        help=f'distinct puzzles shared by the sessions (default: {DEFAULT_PUZZLES})')
+    parser.add_argument('--json', action='store_true', help='print the results as JSON')
+
+
+def run(args: argparse.Namespace) -> int:
+    try:
+        result = asyncio.run(run_load(args.host, args.port, args.unix_path, args.sessions,
+                                      max(1, args.connections), args.duration, max(1, args.puzzles)))
+    except ConnectionError as e:
+        print(f"loadgen: {e}", file=sys.stderr)
+        return 1
+
+    if args.json:
+        json.dump(result, sys.stdout, indent=2)
+        print()
+        return 0
+
+    latency = result['latency_ms']
+    print(f"sessions   {result['sessions']} over {result['connections']} connections "
+          f"(created in {result['setup_seconds']:.2f}s)")
+    print(f"requests   {result['requests']} in {result['seconds']:.2f}s "
+          f"({result['requests_per_second']:.0f} req/s, {result['errors']} errors)")
+    if latency['p50'] is not None:
+        print(f"latency    p50 {latency['p50']:.2f}ms  p90 {latency['p90']:.2f}ms  "
+              f"p99 {latency['p99']:.2f}ms  max {latency['max']:.2f}ms")
+    print(f"server     {result['server']['sessions']} sessions, {result['server']['live']} live, "
+          f"{result['server']['packed_bytes']} packed bytes")
+    return 0
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='vi-sudoku loadgen',
+                                     description='Drive a running puzzle service with concurrent game sessions')
+    add_arguments(parser)
+    return run(parser.parse_args(argv))
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,418 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import secrets
+import sys
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+
+from src.consts import SIZES, Difficulty, Symmetry
+from src.game.board import Board
+from src.game.generator import calculate_difficulty_score, generate_puzzle, generate_puzzle_symmetric
+from src.game.logic import find_hint
+from src.game.solver import solve_board
+from src.game.state import GameState
+from src.game.validator import is_valid_board
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+# engine calls allowed to wait for a worker before new requests stop being read
+QUEUE_PER_WORKER = 8
+MAX_IN_FLIGHT_PER_CONNECTION = 32
+MAX_LINE_BYTES = 64 * 1024
+MAX_GRADE_RUNS = 32
+MAX_LIVE_SESSIONS = 2048
+PACK_AFTER_SECONDS = 60.0
+EVICT_AFTER_SECONDS = 30 * 60.0
+SWEEP_INTERVAL = 5.0
+
+
+class RequestError(Exception):
+    pass
+
+
+def _generate(difficulty: str, size: int, symmetry: str) -> str:
+    if Symmetry(symmetry) != Symmetry.NONE:
+        return generate_puzzle_symmetric(Difficulty(difficulty), Symmetry(symmetry), length=size).to_line()
+    return generate_puzzle(Difficulty(difficulty), size).to_line()
+
+
+def _solve(line: str) -> Optional[str]:
+    solution = solve_board(Board.from_line(line))
+    return solution.to_line() if solution is not None else None
+
+
+def _grade(line: str, runs: int) -> dict:
+    score = calculate_difficulty_score(Board.from_line(line), runs=runs)
+    return {
+        'score': score.total_score if score.total_score != float('inf') else None,
+        'difficulty': score.difficulty.value,
+        'empty_cells': score.empty_cells,
+        'techniques': {technique.value: count for technique, count in score.techniques.items()},
+        'score_deviation': score.score_variance ** 0.5,
+        'runs': score.runs,
+    }
+
+
+def _new_game(line: Optional[str], difficulty: str, size: int) -> tuple[str, str]:
+    puzzle = Board.from_line(line) if line else generate_puzzle(Difficulty(difficulty), size)
+    solution = solve_board(puzzle)
+    if solution is None:
+        raise ValueError("puzzle has no solution")
+    return puzzle.to_line(), solution.to_line()
+
+
+def _hint(line: str):
+    return find_hint(Board.from_line(line))
+
+
+def _reseed():
+    random.seed(os.urandom(16))
+
+
+@dataclass
+class Session:
+    state: Optional[GameState]
+    packed: Optional[bytes]
+    last_used: float
+
+
+class SessionStore:
+    def __init__(self, max_live: int = MAX_LIVE_SESSIONS):
+        self.max_live = max_live
+        self.sessions: dict[str, Session] = {}
+        # live GameState objects, least recently used first
+        self._live: OrderedDict[str, None] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self.sessions)
+
+    def create(self, state: GameState) -> str:
+        session_id = secrets.token_hex(8)
+        self.sessions[session_id] = Session(state, None, time.monotonic())
+        self._touch(session_id)
+        return session_id
+
+    def get(self, session_id: str) -> GameState:
+        session = self.sessions.get(session_id)
+        if session is None:
+            raise RequestError(f"unknown session {session_id!r}")
+
+        if session.state is None:
+            session.state = GameState.unpack(session.packed)
+            session.packed = None
+        session.last_used = time.monotonic()
+        self._touch(session_id)
+        return session.state
+
+    def close(self, session_id: str) -> bool:
+        self._live.pop(session_id, None)
+        return self.sessions.pop(session_id, None) is not None
+
+    def sweep(self, pack_after: float = PACK_AFTER_SECONDS, evict_after: float = EVICT_AFTER_SECONDS) -> int:
+        now = time.monotonic()
+        evicted = 0
+        for session_id, session in list(self.sessions.items()):
+            idle = now - session.last_used
+            if idle >= evict_after:
+                self.close(session_id)
+                evicted += 1
+            elif idle >= pack_after and session.state is not None:
+                self._pack(session_id)
+        return evicted
+
+    def stats(self) -> dict:
+        return {
+            'sessions': len(self.sessions),
+            'live': len(self._live),
+            'packed_bytes': sum(len(s.packed) for s in self.sessions.values() if s.packed is not None),
+        }
+
+    def _touch(self, session_id: str):
+        self._live[session_id] = None
+        self._live.move_to_end(session_id)
+        while len(self._live) > self.max_live:
+            self._pack(next(iter(self._live)))
+
+    def _pack(self, session_id: str):
+        session = self.sessions[session_id]
+        session.packed = session.state.pack()
+        session.state = None
+        self._live.pop(session_id, None)
+
+
+class PuzzleService:
+    def __init__(self, workers: Optional[int] = None, queue_per_worker: int = QUEUE_PER_WORKER,
+                 max_live: int = MAX_LIVE_SESSIONS):
+        self.workers = workers or os.cpu_count() or 1
+        self.pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_reseed)
+        self.slots = asyncio.Semaphore(self.workers * queue_per_worker)
+        self.store = SessionStore(max_live)
+        self.requests = 0
+
+        self._handlers: dict[str, Callable] = {
+            'generate': self.generate,
+            'solve': self.solve,
+            'grade': self.grade,
+            'validate': self.validate,
+            'stats': self.stats,
+            'session.new': self.session_new,
+            'session.get': self.session_get,
+            'session.set': self.session_set,
+            'session.undo': self.session_undo,
+            'session.redo': self.session_redo,
+            'session.hint': self.session_hint,
+            'session.close': self.session_close,
+        }
+
+    def close(self):
+        self.pool.shutdown(cancel_futures=True)
+
+    async def run_in_pool(self, func: Callable, *args) -> Any:
+        # the semaphore bounds the work queued behind the pool; callers wait here
+        async with self.slots:
+            return await asyncio.get_running_loop().run_in_executor(self.pool, func, *args)
+
+    async def handle(self, request: dict) -> dict:
+        self.requests += 1
+        response: dict[str, Any] = {'id': request.get('id')}
+        try:
+            op = request.get('op')
+            handler = self._handlers.get(op) if isinstance(op, str) else None
+            if handler is None:
+                raise RequestError(f"unknown op {op!r}")
+            response['result'] = await handler(request)
+            response['ok'] = True
+        except (RequestError, ValueError, KeyError, TypeError) as e:
+            response['ok'] = False
+            response['error'] = str(e)
+        except Exception as e:
+            # anything else (a broken pool, a bug) still answers, so the client never waits forever
+            response['ok'] = False
+            response['error'] = f"internal error: {type(e).__name__}: {e}"
+        return response
+
+    async def generate(self, request: dict) -> dict:
+        difficulty, size = _difficulty(request), _size(request)
+        symmetry = request.get('symmetry', Symmetry.NONE.value)
+        return {'puzzle': await self.run_in_pool(_generate, difficulty, size, Symmetry(symmetry).value)}
+
+    async def solve(self, request: dict) -> dict:
+        return {'solution': await self.run_in_pool(_solve, _board_line(request, 'puzzle'))}
+
+    async def grade(self, request: dict) -> dict:
+        runs = int(request.get('runs', 1))
+        if not 1 <= runs <= MAX_GRADE_RUNS:
+            raise RequestError(f"runs must be between 1 and {MAX_GRADE_RUNS}")
+        return await self.run_in_pool(_grade, _board_line(request, 'puzzle'), runs)
+
+    async def validate(self, request: dict) -> dict:
+        return {'valid': is_valid_board(Board.from_line(_board_line(request, 'board')))}
+
+    async def stats(self, request: dict) -> dict:
+        return {'requests': self.requests, 'workers': self.workers, **self.store.stats()}
+
+    async def session_new(self, request: dict) -> dict:
+        line = request.get('puzzle')
+        if line is not None:
+            line = _board_line(request, 'puzzle')
+        puzzle, solution = await self.run_in_pool(_new_game, line, _difficulty(request), _size(request))
+        state = GameState(Board.from_line(puzzle), Board.from_line(solution))
+        return {'session': self.store.create(state), **_describe(state)}
+
+    async def session_get(self, request: dict) -> dict:
+        return _describe(self.store.get(_session_id(request)))
+
+    async def session_set(self, request: dict) -> dict:
+        state = self.store.get(_session_id(request))
+        row, col = _integer(request, 'row'), _integer(request, 'col')
+        value = _integer(request, 'value') if request.get('value') is not None else None
+        length = state.current.length
+        if not (0 <= row < length and 0 <= col < length) or (value is not None and not 1 <= value <= length):
+            raise RequestError("row, col or value out of range")
+        return {'changed': state.set_value(row, col, value), **_describe(state)}
+
+    async def session_undo(self, request: dict) -> dict:
+        state = self.store.get(_session_id(request))
+        return {'changed': state.undo(_count(request)), **_describe(state)}
+
+    async def session_redo(self, request: dict) -> dict:
+        state = self.store.get(_session_id(request))
+        return {'changed': state.redo(_count(request)), **_describe(state)}
+
+    async def session_hint(self, request: dict) -> dict:
+        session_id = _session_id(request)
+        state = self.store.get(session_id)
+        key = state.current.state_key
+        if state.current_hint() is None and key not in state.hint_cache:
+            chain = await self.run_in_pool(_hint, state.current.to_line())
+            # the session may have been packed or closed while the worker ran
+            state = self.store.get(session_id)
+            state.hint_cache.put(key, chain)
+
+        changed = state.get_hint()
+        result = {'changed': changed, **_describe(state)}
+        hint = state.current_hint()
+        if hint is not None:
+            row, col, value = hint[-1].placements[0]
+            result['hint'] = {'technique': hint[-1].technique.value, 'row': row, 'col': col, 'value': value,
+                              'steps': [deduction.technique.value for deduction in hint[:-1]]}
+        return result
+
+    async def session_close(self, request: dict) -> dict:
+        return {'closed': self.store.close(_session_id(request))}
+
+    async def sweep_forever(self, interval: float = SWEEP_INTERVAL):
+        while True:
+            await asyncio.sleep(interval)
+            self.store.sweep()
+
+    async def serve_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        in_flight = asyncio.Semaphore(MAX_IN_FLIGHT_PER_CONNECTION)
+        tasks: set[asyncio.Task] = set()
+
+        async def answer(request: dict):
+            try:
+                response = await self.handle(request)
+                writer.write(json.dumps(response).encode() + b'\n')
+                await writer.drain()
+            except ConnectionError:
+                pass
+            finally:
+                in_flight.release()
+
+        try:
+            while True:
+                # stop reading once this connection has too many requests in flight
+                await in_flight.acquire()
+                try:
+                    line = await reader.readline()
+                except (ConnectionError, ValueError):
+                    in_flight.release()
+                    break
+                if not line:
+                    in_flight.release()
+                    break
+
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError("request must be a JSON object")
+                except ValueError as e:
+                    writer.write(json.dumps({'id': None, 'ok': False, 'error': f"bad request: {e}"}).encode() + b'\n')
+                    in_flight.release()
+                    continue
+
+                task = asyncio.create_task(answer(request))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            writer.close()
+
+
+def _difficulty(request: dict) -> str:
+    difficulty = Difficulty(request.get('difficulty', Difficulty.MEDIUM.value))
+    if difficulty == Difficulty.INHUMAN:
+        raise RequestError("inhuman puzzles can't be generated")
+    return difficulty.value
+
+
+def _size(request: dict) -> int:
+    size = int(request.get('size', 9))
+    if size not in SIZES:
+        raise RequestError(f"size must be one of {', '.join(map(str, SIZES))}")
+    return size
+
+
+def _board_line(request: dict, field: str) -> str:
+    line = request.get(field)
+    if not isinstance(line, str):
+        raise RequestError(f"{field!r} must be a board line")
+    return Board.from_line(line).to_line()
+
+
+def _count(request: dict) -> int:
+    count = int(request.get('count', 1))
+    if count < 1:
+        raise RequestError("'count' must be a positive integer")
+    return count
+
+
+def _integer(request: dict, field: str) -> int:
+    value = request.get(field)
+    # true and false are ints to Python, but not to a client
+    if not isinstance(value, int) or isinstance(value, bool):
+        raise RequestError(f"{field!r} must be an integer")
+    return value
+
+
+def _session_id(request: dict) -> str:
+    session_id = request.get('session')
+    if not isinstance(session_id, str):
+        raise RequestError("'session' is required")
+    return session_id
+
+
+def _describe(state: GameState) -> dict:
+    return {
+        'board': state.current.to_line(),
+        'errors': state.errors_count,
+        'hints': state.hints_used,
+        'moves': state.move_count,
+        'won': state.is_won(),
+    }
+
+
+async def serve(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, unix_path: Optional[str] = None,
+                workers: Optional[int] = None, ready: Optional[Callable[[], None]] = None):
+    service = PuzzleService(workers)
+    if unix_path:
+        server = await asyncio.start_unix_server(service.serve_connection, unix_path, limit=MAX_LINE_BYTES)
+    else:
+        server = await asyncio.start_server(service.serve_connection, host, port, limit=MAX_LINE_BYTES)
+
+    sweeper = asyncio.create_task(service.sweep_forever())
+    try:
+        async with server:
+            if ready is not None:
+                ready()
+            await server.serve_forever()
+    finally:
+        sweeper.cancel()
+        service.close()
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument('--host', default=DEFAULT_HOST, help=f'address to listen on (default: {DEFAULT_HOST})')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f'TCP port (default: {DEFAULT_PORT})')
+    parser.add_argument('--unix', dest='unix_path', help='listen on this Unix socket instead of TCP')
+    parser.add_argument('--workers', type=int, help='engine processes (default: one per CPU)')
+
+
+def run(args: argparse.Namespace) -> int:
+    where = args.unix_path or f"{args.host}:{args.port}"
+    try:
+        asyncio.run(serve(args.host, args.port, args.unix_path, args.workers,
+                          ready=lambda: print(f"serve: listening on {where}", file=sys.stderr, flush=True)))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='vi-sudoku serve',
+                                     description='Serve puzzles and game sessions as newline-delimited JSON')
+    add_arguments(parser)
+    return run(parser.parse_args(argv))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
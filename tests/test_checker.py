@@ -0,0 +1,47 @@
+import unittest
+
+from src.game.board import Board
+from src.game.checker import SolvabilityCheck
+from src.game.solver import solve_board
+from src.game.state import GameState
+
+PUZZLE = '53..7....6..195....98....6.8...6...34..8.3..17...2...6.6....28....419..5....8..79'
+
+
+class SolvabilityCheckTest(unittest.TestCase):
+    def setUp(self):
+        puzzle = Board.from_line(PUZZLE)
+        self.state = GameState(puzzle, solve_board(puzzle))
+        self.solution = self.state.solution
+
+    def _enter_wrong(self, row: int, col: int):
+        value = self.solution.get_cell(row, col) % 9 + 1
+        self.state.set_value(row, col, value)
+        return self.state.current_node
+
+    def test_solvable_board_has_no_culprit(self):
+        self.state.set_value(0, 2, self.solution.get_cell(0, 2))
+        self.assertIsNone(SolvabilityCheck(self.state).run())
+
+    def test_first_wrong_entry_is_the_culprit(self):
+        self.state.set_value(0, 2, self.solution.get_cell(0, 2))
+        first = self._enter_wrong(0, 3)
+        self._enter_wrong(4, 4)
+        self.state.set_value(8, 0, self.solution.get_cell(8, 0))
+        self.assertIs(SolvabilityCheck(self.state).run(), first)
+
+    def test_erased_entry_is_not_the_culprit(self):
+        self._enter_wrong(0, 3)
+        second = self._enter_wrong(4, 4)
+        self.state.set_value(0, 3, None)
+        self.assertIs(SolvabilityCheck(self.state).run(), second)
+
+    def test_overwritten_entry_is_not_the_culprit(self):
+        self._enter_wrong(0, 3)
+        second = self._enter_wrong(4, 4)
+        self.state.set_value(0, 3, self.solution.get_cell(0, 3))
+        self.assertIs(SolvabilityCheck(self.state).run(), second)
+
+
+if __name__ == '__main__':
+    unittest.main()
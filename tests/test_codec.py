@@ -0,0 +1,92 @@
+import os
+import random
+import tempfile
+import unittest
+
+from src.game.archive import ArchiveWriter, BoardArchive, is_archive
+from src.game.board import Board
+from src.game.codec import LAYOUT_CLUES, LAYOUT_FULL, PACKED_VERSION, decode_packed, encode_packed
+
+PUZZLE = '53..7....6..195....98....6.8...6...34..8.3..17...2...6.6....28....419..5....8..79'
+
+
+def _random_cells(length: int, rng: random.Random) -> bytes:
+    return bytes(rng.choice((0, rng.randint(1, length))) for _ in range(length * length))
+
+
+class PackedCodecTest(unittest.TestCase):
+    def test_packed_round_trip_for_every_size_and_layout(self):
+        rng = random.Random(7)
+        for length in (4, 9, 16, 25):
+            for layout in (LAYOUT_FULL, LAYOUT_CLUES):
+                cells = _random_cells(length, rng)
+                with self.subTest(length=length, layout=layout):
+                    self.assertEqual(decode_packed(encode_packed(length, cells, layout)), (length, cells))
+
+    def test_board_round_trip_through_packed_and_compact_bytes(self):
+        board = Board.from_line(PUZZLE)
+        for layout in ('full', 'clues'):
+            with self.subTest(layout=layout):
+                self.assertEqual(Board.from_compact_bytes(board.to_packed_bytes(layout)).to_line(), PUZZLE)
+        self.assertEqual(Board.from_compact_bytes(board.to_compact_bytes()).to_line(), PUZZLE)
+
+    def test_unknown_version_is_rejected(self):
+        data = bytearray(encode_packed(9, Board.from_line(PUZZLE).to_compact_bytes()[1:]))
+        data[1] = PACKED_VERSION + 1
+        with self.assertRaises(ValueError):
+            decode_packed(bytes(data))
+
+
+class BoardArchiveTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'boards.vsar')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_archive_round_trip(self):
+        rng = random.Random(11)
+        records = [_random_cells(16, rng) for _ in range(20)]
+        for layout in (LAYOUT_FULL, LAYOUT_CLUES):
+            with self.subTest(layout=layout):
+                with ArchiveWriter(self.path, 16, layout) as writer:
+                    for cells in records:
+                        writer.write_cells(cells)
+
+                self.assertTrue(is_archive(self.path))
+                with BoardArchive(self.path) as archive:
+                    self.assertEqual(len(archive), len(records))
+                    self.assertTrue(archive.verify())
+                    self.assertEqual([archive.cells(i) for i in range(len(archive))], records)
+                    self.assertEqual(archive.cells(-1), records[-1])
+                    with self.assertRaises(IndexError):
+                        archive.cells(len(records))
+
+    def test_board_records_decode_to_the_same_boards(self):
+        with ArchiveWriter(self.path) as writer:
+            writer.write_board(Board.from_line(PUZZLE))
+
+        with BoardArchive(self.path) as archive:
+            self.assertEqual([board.to_line() for board in archive], [PUZZLE])
+
+    def test_clue_layout_rejects_boards_over_the_clue_limit(self):
+        with ArchiveWriter(self.path, 9, LAYOUT_CLUES, max_clues=20) as writer:
+            with self.assertRaises(ValueError):
+                writer.write_board(Board.from_line(PUZZLE))
+
+    def test_corrupted_records_fail_verification(self):
+        with ArchiveWriter(self.path) as writer:
+            writer.write_board(Board.from_line(PUZZLE))
+        with open(self.path, 'r+b') as f:
+            f.seek(-1, os.SEEK_END)
+            last = f.read(1)
+            f.seek(-1, os.SEEK_END)
+            f.write(bytes((last[0] ^ 0xFF,)))
+
+        with BoardArchive(self.path) as archive:
+            self.assertFalse(archive.verify())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+import os
+import tempfile
+import unittest
+
+from src.game.archive import BoardArchive
+from src.game.collection import PackedCollection, PuzzleCollection, open_collection, pack_collection
+from src.game.board import Board
+
+PUZZLES = [
+    '53..7....6..195....98....6.8...6...34..8.3..17...2...6.6....28....419..5....8..79',
+    '..3.2.6..9..3.5..1..18.64....81.29..7.......8..67.82....26.95..8..2.3..9..5.1.3..',
+]
+
+
+class CollectionTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory.name, name)
+
+    def _write(self, name: str, data: bytes) -> str:
+        path = self._path(name)
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path
+
+    def test_line_collection_skips_comments_and_blank_lines(self):
+        path = self._write('puzzles.txt', f"# two puzzles\n{PUZZLES[0]}\n\n{PUZZLES[1]}".encode())
+        with open_collection(path) as collection:
+            self.assertIsInstance(collection, PuzzleCollection)
+            self.assertEqual(len(collection), 2)
+            self.assertEqual(collection[-1].to_line(), PUZZLES[1])
+            self.assertEqual([board.to_line() for board in collection], PUZZLES)
+
+    def test_sdk_grid_is_read(self):
+        grid = '\n'.join(PUZZLES[0][row * 9:row * 9 + 9] for row in range(9))
+        path = self._write('puzzle.sdk', f"[Puzzle]\n{grid}\n".encode())
+        with open_collection(path) as collection:
+            self.assertEqual([board.to_line() for board in collection], PUZZLES[:1])
+
+    def test_pack_round_trip(self):
+        source = self._write('puzzles.txt', '\n'.join(PUZZLES).encode())
+        destination = self._path('puzzles.vsar')
+        self.assertEqual(pack_collection(source, destination), 2)
+
+        with open_collection(destination) as archive:
+            self.assertIsInstance(archive, BoardArchive)
+            self.assertEqual([board.to_line() for board in archive], PUZZLES)
+
+    def test_compact_records_are_read_as_packed_collection(self):
+        path = self._write('puzzles.bin', b''.join(Board.from_line(line).to_compact_bytes() for line in PUZZLES))
+        with open_collection(path) as collection:
+            self.assertIsInstance(collection, PackedCollection)
+            self.assertEqual([board.to_line() for board in collection], PUZZLES)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import os
+import tempfile
+import unittest
+
+from src.consts import Difficulty
+from src.game.board import Board
+from src.game.generator import calculate_difficulty_score
+from src.game.library import PuzzleLibrary, canonical_hash
+from src.game.solver import solve_board
+
+PUZZLE = '53..7....6..195....98....6.8...6...34..8.3..17...2...6.6....28....419..5....8..79'
+
+
+def _transposed(line: str) -> str:
+    return ''.join(line[col * 9 + row] for row in range(9) for col in range(9))
+
+
+def _relabelled(line: str) -> str:
+    return line.translate(str.maketrans('123456789', '912345678'))
+
+
+class PuzzleLibraryTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.library = PuzzleLibrary(os.path.join(self.directory.name, 'library.sqlite3'))
+
+    def tearDown(self):
+        self.library.close()
+        self.directory.cleanup()
+
+    def test_equivalent_puzzles_share_a_canonical_hash(self):
+        compact = Board.from_line(PUZZLE).to_compact_bytes()
+        for variant in (_transposed(PUZZLE), _relabelled(PUZZLE), _transposed(_relabelled(PUZZLE))):
+            with self.subTest(variant=variant):
+                self.assertEqual(canonical_hash(Board.from_line(variant).to_compact_bytes()), canonical_hash(compact))
+        other = '.' + PUZZLE[1:]
+        self.assertNotEqual(canonical_hash(Board.from_line(other).to_compact_bytes()), canonical_hash(compact))
+
+    def test_duplicates_are_ignored(self):
+        self.assertIsNotNone(self.library.add(Board.from_line(PUZZLE)))
+        self.assertIsNone(self.library.add(Board.from_line(_transposed(PUZZLE))))
+        self.assertEqual(len(self.library), 1)
+
+    def test_graded_puzzle_is_picked_until_played(self):
+        puzzle = Board.from_line(PUZZLE)
+        score = calculate_difficulty_score(puzzle)
+        puzzle_id = self.library.add(puzzle, solve_board(puzzle), score)
+
+        entry = self.library.pick_unplayed(score.difficulty)
+        self.assertEqual(entry.id, puzzle_id)
+        self.assertEqual(entry.puzzle.to_line(), PUZZLE)
+        self.assertEqual(entry.score.difficulty, score.difficulty)
+        self.assertEqual([found.id for found in self.library.query(max_empty=PUZZLE.count('.'))], [puzzle_id])
+
+        self.library.record_started(puzzle_id)
+        self.assertIsNone(self.library.pick_unplayed(score.difficulty))
+        self.assertIsNone(self.library.pick_unplayed(Difficulty.EXPERT, length=16))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,31 @@
+import unittest
+
+from src.consts import Technique
+from src.game.board import Board
+from src.game.logic import find_hint, logical_trace
+
+PUZZLE = '53..7....6..195....98....6.8...6...34..8.3..17...2...6.6....28....419..5....8..79'
+SOLUTION = '534678912672195348198342567859761423426853791713924856961537284287419635345286179'
+
+
+class LogicTest(unittest.TestCase):
+    def test_hint_places_a_solution_value(self):
+        chain = find_hint(Board.from_line(PUZZLE))
+        row, col, value = chain[-1].placements[0]
+        self.assertEqual(int(SOLUTION[row * 9 + col]), value)
+        self.assertEqual(PUZZLE[row * 9 + col], '.')
+
+    def test_trace_solves_a_singles_puzzle(self):
+        trace, board = logical_trace(Board.from_line(PUZZLE))
+        self.assertEqual(board.to_line(), SOLUTION)
+        self.assertTrue({deduction.technique for deduction in trace} <=
+                        {Technique.NAKED_SINGLE, Technique.HIDDEN_SINGLE})
+
+    def test_trace_stops_when_logic_runs_out(self):
+        trace, board = logical_trace(Board(9))
+        self.assertEqual(trace, [])
+        self.assertEqual(board.to_line(), '.' * 81)
+
+
+if __name__ == '__main__':
+    unittest.main()
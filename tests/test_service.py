@@ -0,0 +1,70 @@
+import unittest
+
+from src.game.board import Board
+from src.game.solver import solve_board
+from src.game.state import GameState
+from src.server.service import PuzzleService
+
+PUZZLE = '53..7....6..195....98....6.8...6...34..8.3..17...2...6.6....28....419..5....8..79'
+
+
+class ServiceErrorTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.service = PuzzleService(workers=1)
+        puzzle = Board.from_line(PUZZLE)
+        self.session = self.service.store.create(GameState(puzzle, solve_board(puzzle)))
+
+    def tearDown(self):
+        self.service.close()
+
+    async def _error(self, request: dict) -> str:
+        response = await self.service.handle({'id': 7, **request})
+        self.assertEqual(response['id'], 7)
+        self.assertFalse(response['ok'], response)
+        self.assertNotIn('result', response)
+        return response['error']
+
+    async def test_unknown_and_non_string_ops(self):
+        self.assertIn('unknown op', await self._error({'op': 'nope'}))
+        self.assertIn('unknown op', await self._error({'op': ['session.get']}))
+        self.assertIn('unknown op', await self._error({}))
+
+    async def test_session_is_required_and_must_exist(self):
+        self.assertIn("'session' is required", await self._error({'op': 'session.get'}))
+        self.assertIn('unknown session', await self._error({'op': 'session.get', 'session': 'missing'}))
+
+    async def test_set_rejects_non_integer_cells(self):
+        for field, value in (('row', 1.5), ('row', True), ('col', '3'), ('value', False), ('value', [4])):
+            request = {'op': 'session.set', 'session': self.session, 'row': 0, 'col': 2, 'value': 4, field: value}
+            with self.subTest(field=field, value=value):
+                self.assertIn(f"'{field}' must be an integer", await self._error(request))
+
+        response = await self.service.handle({'op': 'session.get', 'session': self.session})
+        self.assertEqual(response['result']['moves'], 0)
+
+    async def test_set_rejects_out_of_range_cells(self):
+        for row, col, value in ((9, 0, 1), (0, -1, 1), (0, 2, 10), (0, 2, 0)):
+            request = {'op': 'session.set', 'session': self.session, 'row': row, 'col': col, 'value': value}
+            with self.subTest(row=row, col=col, value=value):
+                self.assertIn('out of range', await self._error(request))
+
+    async def test_undo_count_must_be_positive(self):
+        self.assertIn("'count' must be a positive integer",
+                      await self._error({'op': 'session.undo', 'session': self.session, 'count': 0}))
+
+    async def test_bad_board_lines_and_sizes(self):
+        self.assertIn("'puzzle' must be a board line", await self._error({'op': 'solve', 'puzzle': 5}))
+        self.assertIn('Invalid board line', await self._error({'op': 'validate', 'board': '123'}))
+        self.assertIn('size must be one of', await self._error({'op': 'generate', 'size': 10}))
+        self.assertIn("inhuman", await self._error({'op': 'generate', 'difficulty': 'inhuman'}))
+
+    async def test_valid_set_still_answers(self):
+        response = await self.service.handle({'op': 'session.set', 'session': self.session,
+                                              'row': 0, 'col': 2, 'value': 4})
+        self.assertTrue(response['ok'], response)
+        self.assertTrue(response['result']['changed'])
+        self.assertEqual(response['result']['moves'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
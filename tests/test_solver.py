@@ -0,0 +1,87 @@
+import unittest
+
+from src.consts import Symmetry
+from src.game.board import Board
+from src.game.generator import minimize
+from src.game.solver import analyze, count_solutions, is_unique, iter_solutions, solve_board
+
+PUZZLE = '53..7....6..195....98....6.8...6...34..8.3..17...2...6.6....28....419..5....8..79'
+SOLUTION = '534678912672195348198342567859761423426853791713924856961537284287419635345286179'
+
+
+def _without(line: str, index: int) -> str:
+    return line[:index] + '.' + line[index + 1:]
+
+
+class SolutionCountTest(unittest.TestCase):
+    def test_unique_puzzle(self):
+        board = Board.from_line(PUZZLE)
+        self.assertEqual(count_solutions(board), 1)
+        self.assertTrue(is_unique(9, board.to_compact_bytes()[1:]))
+        self.assertEqual(solve_board(board).to_line(), SOLUTION)
+
+    def test_every_4x4_grid_is_found(self):
+        solutions = {solution.to_line() for solution in iter_solutions(Board(4))}
+        self.assertEqual(len(solutions), 288)
+
+    def test_limit_stops_the_count(self):
+        self.assertEqual(count_solutions(Board(9), limit=5), 5)
+        self.assertFalse(is_unique(9, bytes(81)))
+
+
+class AnalyzeTest(unittest.TestCase):
+    def test_unique_puzzle_fixes_every_empty_cell(self):
+        analysis = analyze(Board.from_line(PUZZLE))
+        self.assertEqual(analysis.count, 1)
+        self.assertTrue(analysis.complete)
+        self.assertEqual(analysis.solution.to_line(), SOLUTION)
+        self.assertEqual(len(analysis.backbone), PUZZLE.count('.'))
+        for row, col, value in analysis.backbone:
+            self.assertEqual(int(SOLUTION[row * 9 + col]), value)
+
+    def test_backbone_leaves_out_cells_that_differ_between_solutions(self):
+        # the 6s and 7s at rows 0 and 3, columns 3 and 4 can swap once they are cleared
+        line = SOLUTION
+        for index in (3, 4, 30, 31):
+            line = _without(line, index)
+        analysis = analyze(Board.from_line(line))
+
+        self.assertEqual(analysis.count, 2)
+        self.assertTrue(analysis.complete)
+        self.assertEqual(analysis.backbone, [])
+
+    def test_limited_analysis_is_incomplete(self):
+        analysis = analyze(Board(9), limit=3)
+        self.assertEqual(analysis.count, 3)
+        self.assertFalse(analysis.complete)
+
+
+class MinimizeTest(unittest.TestCase):
+    def _assert_minimal(self, line: str):
+        self.assertEqual(count_solutions(Board.from_line(line)), 1)
+        for index, char in enumerate(line):
+            if char != '.':
+                self.assertEqual(count_solutions(Board.from_line(_without(line, index))), 2, index)
+
+    def test_minimized_puzzle_is_unique_and_minimal(self):
+        minimal = minimize(Board.from_line(PUZZLE)).to_line()
+        self.assertTrue(all(char in ('.', original) for char, original in zip(minimal, PUZZLE)))
+        self._assert_minimal(minimal)
+
+    def test_minimizing_a_solution_keeps_it_unique(self):
+        minimal = minimize(Board.from_line(SOLUTION)).to_line()
+        self._assert_minimal(minimal)
+
+    def test_symmetric_minimize_keeps_the_pattern(self):
+        minimal = minimize(Board.from_line(SOLUTION), Symmetry.ROTATIONAL).to_line()
+        self.assertEqual(count_solutions(Board.from_line(minimal)), 1)
+        for index in range(81):
+            self.assertEqual(minimal[index] == '.', minimal[80 - index] == '.')
+
+    def test_puzzle_without_a_unique_solution_is_rejected(self):
+        with self.assertRaises(ValueError):
+            minimize(Board(9))
+
+
+if __name__ == '__main__':
+    unittest.main()
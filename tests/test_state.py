@@ -0,0 +1,106 @@
+import unittest
+
+from src.game.board import Board
+from src.game.solver import solve_board
+from src.game.state import SNAPSHOT_RESTORE_STEPS, GameState
+
+PUZZLE = '53..7....6..195....98....6.8...6...34..8.3..17...2...6.6....28....419..5....8..79'
+
+
+class UndoTreeTest(unittest.TestCase):
+    def setUp(self):
+        puzzle = Board.from_line(PUZZLE)
+        self.state = GameState(puzzle, solve_board(puzzle))
+        self.solution = self.state.solution
+        self.empty = [(index // 9, index % 9) for index, char in enumerate(PUZZLE) if char == '.']
+
+    def _line_with(self, placements) -> str:
+        cells = list(PUZZLE)
+        for row, col, value in placements:
+            cells[row * 9 + col] = str(value)
+        return ''.join(cells)
+
+    def _right(self, count: int, start: int = 0):
+        return [(row, col, self.solution.get_cell(row, col)) for row, col in self.empty[start:start + count]]
+
+    def _wrong(self, count: int, start: int = 0):
+        return [(row, col, value % 9 + 1) for row, col, value in self._right(count, start)]
+
+    def _play(self, placements):
+        for row, col, value in placements:
+            self.assertTrue(self.state.set_value(row, col, value))
+
+    def test_fixed_cells_cannot_be_changed(self):
+        self.assertFalse(self.state.set_value(0, 0, 1))
+        self.assertEqual(self.state.change_count, 0)
+
+    def test_undo_and_redo_follow_the_latest_branch(self):
+        first, second = self._right(1), self._wrong(1, 1)
+        self._play(first + second)
+        self.state.undo()
+        third = self._wrong(1, 2)
+        self._play(third)
+
+        self.assertEqual(self.state.change_count, 3)
+        self.assertEqual(self.state.move_count, 2)
+        self.state.undo(2)
+        self.assertEqual(self.state.current.to_line(), PUZZLE)
+        self.state.redo(2)
+        self.assertEqual(self.state.current.to_line(), self._line_with(first + third))
+
+    def test_earlier_and_later_walk_changes_in_time_order(self):
+        first, second, third = self._right(1), self._wrong(1, 1), self._wrong(1, 2)
+        self._play(first + second)
+        self.state.undo()
+        self._play(third)
+
+        self.assertTrue(self.state.earlier())
+        self.assertEqual(self.state.change_number, 2)
+        self.assertEqual(self.state.current.to_line(), self._line_with(first + second))
+        self.assertTrue(self.state.earlier(2))
+        self.assertEqual(self.state.current.to_line(), PUZZLE)
+        self.assertFalse(self.state.earlier())
+
+        self.assertTrue(self.state.later(3))
+        self.assertEqual(self.state.current.to_line(), self._line_with(first + third))
+        self.assertFalse(self.state.later())
+
+    def test_goto_change_between_long_branches(self):
+        steps = SNAPSHOT_RESTORE_STEPS + 8
+        right, wrong = self._right(steps), self._wrong(steps)
+        self._play(right)
+        self.state.undo(steps)
+        self._play(wrong)
+
+        self.assertTrue(self.state.goto_change(steps))
+        self.assertEqual(self.state.current.to_line(), self._line_with(right))
+        self.assertEqual(self.state.move_count, steps)
+
+        self.assertTrue(self.state.goto_change(steps // 2))
+        self.assertEqual(self.state.current.to_line(), self._line_with(right[:steps // 2]))
+
+        self.assertTrue(self.state.goto_change(2 * steps))
+        self.assertEqual(self.state.current.to_line(), self._line_with(wrong))
+        replayed = GameState(self.state.puzzle, self.solution)
+        for row, col, value in wrong:
+            replayed.set_value(row, col, value)
+        self.assertEqual([cell for cell in self.empty if self.state.is_cell_error(*cell)],
+                         [cell for cell in self.empty if replayed.is_cell_error(*cell)])
+
+        # after jumping, undo and redo still follow the branch that was visited last
+        self.state.undo(steps)
+        self.assertEqual(self.state.current.to_line(), PUZZLE)
+        self.state.redo(steps)
+        self.assertEqual(self.state.current.to_line(), self._line_with(wrong))
+
+    def test_goto_change_clamps_out_of_range_numbers(self):
+        self._play(self._right(3))
+        self.assertTrue(self.state.goto_change(-5))
+        self.assertEqual(self.state.current.to_line(), PUZZLE)
+        self.assertTrue(self.state.goto_change(99))
+        self.assertEqual(self.state.change_number, 3)
+        self.assertFalse(self.state.goto_change(3))
+
+
+if __name__ == '__main__':
+    unittest.main()
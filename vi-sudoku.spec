@@ -11,24 +11,42 @@ a = Analysis(
         'curses',
         'src',
         'src.cli',
+        'src.cli.batch',
         'src.cli.colors',
+        'src.cli.event_loop',
         'src.cli.input_handler',
+        'src.cli.profiler',
         'src.cli.renderer',
+        'src.cli.replay',
         'src.game',
+        'src.game.archive',
+        'src.game.backends',
         'src.game.board',
+        'src.game.cache',
+        'src.game.checker',
+        'src.game.codec',
+        'src.game.collection',
+        'src.game.engine',
         'src.game.generator',
+        'src.game.library',
+        'src.game.logic',
         'src.game.model',
+        'src.game.solution_cache',
         'src.game.solver',
         'src.game.state',
         'src.game.utils',
         'src.game.validator',
+        'src.server',
+        'src.server.loadgen',
+        'src.server.service',
         'src.config',
         'src.consts',
     ],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
-    excludes=[],
+    # stdlib packages the game never imports; fewer files to unpack on start-up
+    excludes=['tkinter', 'unittest', 'pydoc', 'doctest', 'lib2to3', 'idlelib', 'test'],
     win_no_prefer_redirects=False,
     win_private_assemblies=False,
     cipher=block_cipher,